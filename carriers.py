@@ -1,6 +1,7 @@
 from solvers import constants as cs
 from solvers.quantum import fermiDirac, gc, boltzmann
-from sympy import symbols, integrate, sqrt
+from sympy import symbols, integrate
+from solvers.numeric import sqrt
 
 def n_thermal_eq_quantum(Ec=symbols('Ec'), EF=symbols('EF'), Evac=symbols('Evac'), numerical=True):
     '''
@@ -115,13 +116,14 @@ def mu_n_min(Na):
     '''
     return 232 + 1180/(1 + (Na/(8e16))**0.9)
 
-def diffusivity(mu):
+def diffusivity(mu, KbToq=cs.KbToq):
     '''
     calculates diffusivity (D) based on mobility (mu)
     
     - mu = µ = mobility
+    - KbToq = kT/q, the thermal voltage
     '''
-    return cs.KbToq * mu
+    return KbToq * mu
 
 def diffusion_length(D, tau):
     return sqrt(D*tau)
@@ -164,6 +166,63 @@ def J_drift_p(mu, p, E):
     '''
     
     return cs.q * mu * p * E
+
+def mu_high_field(mu, E, vsat, beta):
+    '''
+    Caughey-Thomas field-dependent mobility, µ / (1 + (µ|E|/v_sat)^β)^(1/β)
+    
+    - mu = µ = low-field mobility
+    - E = electric field strength
+    - vsat = saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return mu / (1 + (mu*abs(E)/vsat)**beta)**(1/beta)
+
+def v_drift_n_high_field(mu, E, vsat=cs.electron_sat_vel_300K, beta=cs.caughey_thomas_beta_n):
+    '''
+    electron drift velocity with velocity saturation
+    
+    - mu = µ_n = low-field electron mobility
+    - E = electric field strength
+    - vsat = electron saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return -mu_high_field(mu, E, vsat, beta)*E
+
+def v_drift_p_high_field(mu, E, vsat=cs.hole_sat_vel_300K, beta=cs.caughey_thomas_beta_p):
+    '''
+    hole drift velocity with velocity saturation
+    
+    - mu = µ_p = low-field hole mobility
+    - E = electric field strength
+    - vsat = hole saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return mu_high_field(mu, E, vsat, beta)*E
+
+def J_drift_n_high_field(mu, n, E, vsat=cs.electron_sat_vel_300K, beta=cs.caughey_thomas_beta_n):
+    '''
+    electron drift current density with velocity saturation
+    
+    - mu = µ_n = low-field electron mobility
+    - n = electron concentration
+    - E = electric field strength
+    - vsat = electron saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return cs.q * mu_high_field(mu, E, vsat, beta) * n * E
+
+def J_drift_p_high_field(mu, p, E, vsat=cs.hole_sat_vel_300K, beta=cs.caughey_thomas_beta_p):
+    '''
+    hole drift current density with velocity saturation
+    
+    - mu = µ_p = low-field hole mobility
+    - p = hole concentration
+    - E = electric field strength
+    - vsat = hole saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return cs.q * mu_high_field(mu, E, vsat, beta) * p * E
     
 def hole_diffusion_flux(D, dp):
     '''
@@ -0,0 +1,475 @@
+import numpy as np
+from scipy.special import erf
+from solvers import constants as cs
+
+def _arr(x):
+    '''converts x to a float64 ndarray (or numpy scalar) without copying when possible'''
+    return np.asarray(x, dtype=np.float64)
+
+def n_thermal_eq_quantum(Ec, EF, Evac):
+    '''
+    calculates electron concentration n◦ at thermal equilibrium in a silicon region using Boltzmann approximation
+
+    closed form of the integral of gc(E) * boltzmann(E) from Ec to Evac
+
+    - Ec = conduction band energy
+    - EF = Fermi energy
+    - Evac = vacuum energy
+    '''
+    Ec, EF, Evac = _arr(Ec), _arr(EF), _arr(Evac)
+    kT = cs.KbToq
+    A = (1/(2*np.pi**2)) * (2*cs.m_ndos_300K/(cs.hbar**2))**(3/2)
+    x = (Evac - Ec) / kT
+    lower_gamma = (np.sqrt(np.pi)/2) * erf(np.sqrt(x)) - np.sqrt(x) * np.exp(-x)
+    return A * kT**(3/2) * np.exp(-(Ec - EF)/kT) * lower_gamma
+
+def n_thermal_eq_nc(Nc, Ec, EF):
+    '''
+    calculates electron concentration n◦ at thermal equilibrium in a silicon region using classical approximation
+
+    - Nc = conduction band effective density of states (cs.Nc at 300 K)
+    - Ec = conduction band energy
+    - EF = Fermi energy
+    '''
+    return _arr(Nc) * np.exp(-(_arr(Ec) - _arr(EF))/cs.KbToq)
+
+def p_thermal_eq_nc(Nv, EF, Ev):
+    '''
+    calculates hole concentration p◦ at thermal equilibrium in a silicon region using classical approximation
+
+    - Nv = valence band effective density of states (cs.Nv at 300 K)
+    - EF = Fermi energy
+    - Ev = valence band edge
+    '''
+    return _arr(Nv) * np.exp(-(_arr(EF) - _arr(Ev))/cs.KbToq)
+
+def rec_life_p(Na):
+    '''
+    minority recombination lifetime of electrons
+
+    (τ_rec,P or τ_n,P)
+
+    - Na = acceptor concentration
+    '''
+    Na = _arr(Na)
+    return 1/(3.45e-12 * Na + 9.5e-32 * (Na**2))
+
+def rec_life_n(Nd):
+    '''
+    minority recombination lifetime of holes
+
+    (τ_rec_N or τ_p,N)
+
+    - Nd = donor concentration
+    '''
+    Nd = _arr(Nd)
+    return 1/(7.8e-13 * Nd + 1.8e-31 * (Nd**2))
+
+def gen_life_p(Na):
+    '''
+    minority generation lifetime of holes
+
+    (τ_gen,P)
+
+    - Na = acceptor concentration
+    '''
+    return 75*rec_life_p(Na)
+
+def gen_life_n(Nd):
+    '''
+    minority generation lifetime of electrons
+
+    (τ_gen,N or τ_p,N)
+
+    - Nd = donor concentration
+    '''
+    return 75*rec_life_n(Nd)
+
+def mu_p_maj(Na):
+    '''
+    hole mobility (µ_p) in p-type region
+
+    - Na = acceptor concentration
+    '''
+    return 49.7 + 418.3/(1 + (_arr(Na)/(1.6e17))**0.7)
+
+def mu_p_min(Nd):
+    '''
+    hole mobility (µ_p) in n-type region
+
+    - Nd = donor concentration
+    '''
+    return 130 + 370/(1 + (_arr(Nd)/(8e17))**1.25)
+
+def mu_p_min_log_slope(Nd):
+    '''
+    dµ_p/d(ln Nd) of the hole mobility in n-type region, for fitting in log doping
+
+    - Nd = donor concentration
+    '''
+    x = (_arr(Nd)/(8e17))**1.25
+    return -370*1.25*x/(1 + x)**2
+
+def mu_n_maj(Nd):
+    '''
+    electron mobility (µ_n) in n-type region
+
+    - Nd = donor concentration
+    '''
+    return 92 + 1268/(1 + (_arr(Nd)/(1.3e17))**0.91)
+
+def mu_n_min(Na):
+    '''
+    electron mobility (µ_n) in p-type region
+
+    - Na = acceptor concentration
+    '''
+    return 232 + 1180/(1 + (_arr(Na)/(8e16))**0.9)
+
+def mu_n_min_log_slope(Na):
+    '''
+    dµ_n/d(ln Na) of the electron mobility in p-type region, for fitting in log doping
+
+    - Na = acceptor concentration
+    '''
+    x = (_arr(Na)/(8e16))**0.9
+    return -1180*0.9*x/(1 + x)**2
+
+def diffusivity(mu, KbToq=cs.KbToq):
+    '''
+    calculates diffusivity (D) based on mobility (mu)
+
+    - mu = µ = mobility
+    - KbToq = kT/q, the thermal voltage
+    '''
+    return _arr(KbToq) * _arr(mu)
+
+def diffusion_length(D, tau):
+    '''
+    calculates the diffusion length (L) based on diffusivity (D) and lifetime (tau)
+
+    - D = diffusion coefficient
+    - tau = carrier lifetime
+    '''
+    return np.sqrt(_arr(D) * _arr(tau))
+
+def v_drift_n(mu, E):
+    '''
+    low-field bulk electron drift velocity
+
+    - mu = µ_n = electron mobility
+    - E = electric field strength
+    '''
+    return -_arr(mu) * _arr(E)
+
+def v_drift_p(mu, E):
+    '''
+    low-field bulk hole drift velocity
+
+    - mu = µ_p = hole mobility
+    - E = electric field strength
+    '''
+    return _arr(mu) * _arr(E)
+
+def J_drift_n(mu, n, E):
+    '''
+    low-field bulk electron drift current density
+
+    - mu = µ_n = electron mobility
+    - n = electron concentration
+    - E = electric field strength
+    '''
+    return cs.q * _arr(mu) * _arr(n) * _arr(E)
+
+def J_drift_p(mu, p, E):
+    '''
+    low-field bulk hole drift current density
+
+    - mu = µ_p = hole mobility
+    - p = hole concentration
+    - E = electric field strength
+    '''
+    return cs.q * _arr(mu) * _arr(p) * _arr(E)
+
+def mu_high_field(mu, E, vsat, beta):
+    '''
+    Caughey-Thomas field-dependent mobility, µ / (1 + (µ|E|/v_sat)^β)^(1/β)
+
+    - mu = µ = low-field mobility
+    - E = electric field strength
+    - vsat = saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    mu, beta = _arr(mu), _arr(beta)
+    return mu / (1 + (mu*np.abs(_arr(E))/_arr(vsat))**beta)**(1/beta)
+
+def alpha_n_impact(E, gamma=1):
+    '''
+    electron impact-ionization coefficient (α_n), van Overstraeten-de Man, a_n γ exp(-b_n γ/|E|)
+
+    - E = electric field strength
+    - gamma = γ = temperature factor of the coefficients
+    '''
+    gamma = _arr(gamma)
+    with np.errstate(divide='ignore'):
+        return gamma*cs.impact_ionization_a_n_si * np.exp(-gamma*cs.impact_ionization_b_n_si/np.abs(_arr(E)))
+
+def alpha_p_impact(E, gamma=1):
+    '''
+    hole impact-ionization coefficient (α_p), van Overstraeten-de Man, a_p γ exp(-b_p γ/|E|) with the
+    low- and high-field parameters switching at 4e5 V/cm
+
+    - E = electric field strength
+    - gamma = γ = temperature factor of the coefficients
+    '''
+    E, gamma = np.abs(_arr(E)), _arr(gamma)
+    high = E > 4e5
+    a = np.where(high, cs.impact_ionization_a_p_si[1], cs.impact_ionization_a_p_si[0])
+    b = np.where(high, cs.impact_ionization_b_p_si[1], cs.impact_ionization_b_p_si[0])
+    with np.errstate(divide='ignore'):
+        return gamma*a * np.exp(-gamma*b/E)
+
+def v_drift_n_high_field(mu, E, vsat=cs.electron_sat_vel_300K, beta=cs.caughey_thomas_beta_n):
+    '''
+    electron drift velocity with velocity saturation
+
+    - mu = µ_n = low-field electron mobility
+    - E = electric field strength
+    - vsat = electron saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return -mu_high_field(mu, E, vsat, beta) * _arr(E)
+
+def v_drift_p_high_field(mu, E, vsat=cs.hole_sat_vel_300K, beta=cs.caughey_thomas_beta_p):
+    '''
+    hole drift velocity with velocity saturation
+
+    - mu = µ_p = low-field hole mobility
+    - E = electric field strength
+    - vsat = hole saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return mu_high_field(mu, E, vsat, beta) * _arr(E)
+
+def J_drift_n_high_field(mu, n, E, vsat=cs.electron_sat_vel_300K, beta=cs.caughey_thomas_beta_n):
+    '''
+    electron drift current density with velocity saturation
+
+    - mu = µ_n = low-field electron mobility
+    - n = electron concentration
+    - E = electric field strength
+    - vsat = electron saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return cs.q * mu_high_field(mu, E, vsat, beta) * _arr(n) * _arr(E)
+
+def J_drift_p_high_field(mu, p, E, vsat=cs.hole_sat_vel_300K, beta=cs.caughey_thomas_beta_p):
+    '''
+    hole drift current density with velocity saturation
+
+    - mu = µ_p = low-field hole mobility
+    - p = hole concentration
+    - E = electric field strength
+    - vsat = hole saturation velocity
+    - beta = β = Caughey-Thomas exponent
+    '''
+    return cs.q * mu_high_field(mu, E, vsat, beta) * _arr(p) * _arr(E)
+
+def hole_diffusion_flux(D, dp):
+    '''
+    hole diffusion flux
+
+    - D = hole diffusion coefficient
+    - dp = hole concentration gradient
+    '''
+    return -_arr(D) * _arr(dp)
+
+def electron_diffusion_flux(D, dn):
+    '''
+    electron diffusion flux
+
+    - D = electron diffusion coefficient
+    - dn = electron concentration gradient
+    '''
+    return _arr(D) * _arr(dn)
+
+def J_diffusion_p(D, dp):
+    '''
+    hole diffusion current density
+
+    - D = hole diffusion coefficient
+    - dp = hole concentration gradient
+    '''
+    return cs.q * hole_diffusion_flux(D, dp)
+
+def J_diffusion_n(D, dn):
+    '''
+    electron diffusion current density
+
+    - D = electron diffusion coefficient
+    - dn = electron concentration gradient
+    '''
+    return cs.q * electron_diffusion_flux(D, dn)
+
+def J_n(mu, n, E, D, dn):
+    '''
+    total electron current density
+
+    - mu = µ_n = electron mobility
+    - n = electron concentration
+    - E = electric field strength
+    - D = electron diffusion coefficient
+    - dn = electron concentration gradient
+    '''
+    return J_drift_n(mu, n, E) + J_diffusion_n(D, dn)
+
+def J_p(mu, p, E, D, dp):
+    '''
+    total hole current density
+
+    - mu = µ_p = hole mobility
+    - p = hole concentration
+    - E = electric field strength
+    - D = hole diffusion coefficient
+    - dp = hole concentration gradient
+    '''
+    return J_drift_p(mu, p, E) + J_diffusion_p(D, dp)
+
+def _profile_slice(value, start, stop):
+    '''value[start:stop] for per-point arrays, value itself for scalars'''
+    return _arr(value if np.ndim(value) == 0 else value[start:stop])
+
+def _profile_gradient(x, f, start, stop):
+    '''
+    gradient of f over points start:stop of the profile, reading one neighbour on each side so the
+    result matches np.gradient over the whole profile
+    '''
+    lo, hi = max(start - 1, 0), min(stop + 1, len(f))
+    spacing = x if np.ndim(x) == 0 else _arr(x[lo:hi])
+    return np.gradient(_arr(f[lo:hi]), spacing)[start - lo:stop - lo]
+
+def iter_J_profile(x, n, p, E, mu_n, mu_p, Dn=None, Dp=None, KbToq=cs.KbToq, chunk_size=1 << 20):
+    '''
+    streams the electron and hole current densities along a 1D profile in chunks
+
+    yields (start, stop, J_n, J_p) for each block of chunk_size points. Inputs can be np.memmap arrays,
+    so profiles larger than memory are only read one chunk at a time.
+
+    - x = grid positions, or the spacing of a uniform grid. units = cm
+    - n = electron concentration at each point
+    - p = hole concentration at each point
+    - E = electric field strength at each point
+    - mu_n = µ_n = electron mobility, per point or constant
+    - mu_p = µ_p = hole mobility, per point or constant
+    - Dn = electron diffusion coefficient, per point or constant; kT/q µ_n when omitted
+    - Dp = hole diffusion coefficient, per point or constant; kT/q µ_p when omitted
+    - KbToq = kT/q, the thermal voltage used for the omitted diffusion coefficients
+    - chunk_size = number of points per chunk
+    '''
+    size = len(n)
+    if size == 1:
+        raise ValueError('a current profile needs at least 2 points to take the concentration gradients')
+    for start in range(0, size, chunk_size):
+        stop = min(start + chunk_size, size)
+        E_chunk = _profile_slice(E, start, stop)
+        mu_n_chunk = _profile_slice(mu_n, start, stop)
+        mu_p_chunk = _profile_slice(mu_p, start, stop)
+        Dn_chunk = diffusivity(mu_n_chunk, KbToq) if Dn is None else _profile_slice(Dn, start, stop)
+        Dp_chunk = diffusivity(mu_p_chunk, KbToq) if Dp is None else _profile_slice(Dp, start, stop)
+
+        J_n_chunk = J_n(mu_n_chunk, _profile_slice(n, start, stop), E_chunk, Dn_chunk, _profile_gradient(x, n, start, stop))
+        J_p_chunk = J_p(mu_p_chunk, _profile_slice(p, start, stop), E_chunk, Dp_chunk, _profile_gradient(x, p, start, stop))
+        yield start, stop, J_n_chunk, J_p_chunk
+
+def J_profile(x, n, p, E, mu_n, mu_p, Dn=None, Dp=None, KbToq=cs.KbToq, chunk_size=None, out=None):
+    '''
+    total electron and hole current densities along a 1D profile, with the concentration gradients
+    taken from n(x) and p(x)
+
+    returns (J_n, J_p)
+
+    - x = grid positions, or the spacing of a uniform grid. units = cm
+    - n = electron concentration at each point
+    - p = hole concentration at each point
+    - E = electric field strength at each point
+    - mu_n = µ_n = electron mobility, per point or constant
+    - mu_p = µ_p = hole mobility, per point or constant
+    - Dn = electron diffusion coefficient, per point or constant; kT/q µ_n when omitted
+    - Dp = hole diffusion coefficient, per point or constant; kT/q µ_p when omitted
+    - KbToq = kT/q, the thermal voltage used for the omitted diffusion coefficients
+    - chunk_size = evaluate chunk_size points at a time to bound temporary memory; all at once when omitted
+    - out = (J_n, J_p) arrays to write into, e.g. np.memmap outputs for profiles larger than memory
+    '''
+    size = len(n)
+    if out is None:
+        out = (np.empty(size), np.empty(size))
+    for start, stop, J_n_chunk, J_p_chunk in iter_J_profile(x, n, p, E, mu_n, mu_p, Dn, Dp, KbToq, chunk_size or max(size, 1)):
+        out[0][start:stop] = J_n_chunk
+        out[1][start:stop] = J_p_chunk
+    return out
+
+def J_n_from_drift_and_diffusion(drift_current, diffusion_current):
+    '''
+    total electron current density
+
+    - drift_current = J_drift_n
+    - diffusion_current = J_diffusion_n
+    '''
+    return _arr(drift_current) + _arr(diffusion_current)
+
+def J_p_from_drift_and_diffusion(drift_current, diffusion_current):
+    '''
+    total hole current density
+
+    - drift_current = J_drift_p
+    - diffusion_current = J_diffusion_p
+    '''
+    return _arr(drift_current) + _arr(diffusion_current)
+
+def conductivity(mu_n, mu_p):
+    '''
+    calculates conductivity (σ) based on electron and hole mobility (mu_n, mu_p)
+
+    - mu_n = µ_n = electron mobility
+    - mu_p = µ_p = hole mobility
+    '''
+    return cs.q * (_arr(mu_n) + _arr(mu_p))
+
+def resistivity(mu_n, mu_p):
+    '''
+    calculates resistivity (ρ) based on electron and hole mobility (mu_n, mu_p)
+
+    - mu_n = µ_n = electron mobility
+    - mu_p = µ_p = hole mobility
+    '''
+    return 1 / conductivity(mu_n, mu_p)
+
+def resistance(mu_n, mu_p, L, A):
+    '''
+    calculates resistance (R) based on electron and hole mobility (mu_n, mu_p), length (L) and area (A)
+
+    - mu_n = µ_n = electron mobility
+    - mu_p = µ_p = hole mobility
+    - L = length
+    - A = area
+    '''
+    return resistivity(mu_n, mu_p) * _arr(L) / _arr(A)
+
+def resistance_from_resistivity(p, L, A):
+    '''
+    calculates resistance (R) based on resistivity (p), length (L) and area (A)
+
+    - p  = ρ = resistivity
+    - L = length
+    - A = area
+    '''
+    return _arr(p) * _arr(L) / _arr(A)
+
+def debye_length(D, tau):
+    '''
+    calculates the Debye length (L_D) based on diffusion coefficient (D) and relaxation time (tau)
+
+    - D = diffusion coefficient
+    - tau = dielectric relaxation time
+    '''
+    return np.sqrt(_arr(D) * _arr(tau))
@@ -213,6 +213,13 @@ Silicon band gap energy at 0K
 1.17 eV
 '''
 
+phi_m_chi_al_si: float = 0.05045
+'''
+aluminum work function less the silicon electron affinity, φ_m - χ_si
+
+0.05045 V
+'''
+
 electron_sat_vel_300K: float = 1.066e7
 '''
 saturation velocity of electrons in silicon at 300K
@@ -225,4 +232,94 @@ hole_sat_vel_300K: float = 8.29e6
 saturation velocity of holes in silicon at 300K
 
 8.29e6 cm/s
-'''
\ No newline at end of file
+'''
+varshni_alpha_si: float = 4.73e-4
+'''
+Varshni α coefficient of the silicon band gap
+
+Eg(T) = Eg(0) - αT^2/(T + β)
+
+4.73e-4 eV/K
+'''
+
+varshni_beta_si: float = 636
+'''
+Varshni β coefficient of the silicon band gap
+
+636 K
+'''
+
+donor_ionization_energy_si: float = 0.045
+'''
+ionization energy of phosphorus donors in silicon, Ec - Ed
+
+0.045 eV
+'''
+
+acceptor_ionization_energy_si: float = 0.045
+'''
+ionization energy of boron acceptors in silicon, Ea - Ev
+
+0.045 eV
+'''
+
+donor_degeneracy_si: float = 2
+'''
+ground-state degeneracy factor of donors in silicon
+'''
+
+acceptor_degeneracy_si: float = 4
+'''
+ground-state degeneracy factor of acceptors in silicon
+'''
+
+caughey_thomas_beta_n: float = 1.109
+'''
+Caughey-Thomas exponent β of the electron field-dependent mobility at 300K
+
+µ(E) = µ / (1 + (µE/v_sat)^β)^(1/β)
+'''
+
+caughey_thomas_beta_p: float = 1.213
+'''
+Caughey-Thomas exponent β of the hole field-dependent mobility at 300K
+'''
+
+impact_ionization_a_n_si: float = 7.03e5
+'''
+van Overstraeten-de Man electron impact-ionization coefficient prefactor at 300K
+
+α_n = a_n exp(-b_n/|E|)
+
+7.03e5 cm^-1
+'''
+
+impact_ionization_b_n_si: float = 1.231e6
+'''
+van Overstraeten-de Man electron impact-ionization critical field at 300K
+
+1.231e6 V/cm
+'''
+
+impact_ionization_a_p_si: tuple = (1.582e6, 6.71e5)
+'''
+van Overstraeten-de Man hole impact-ionization coefficient prefactors at 300K, below and above E0 = 4e5 V/cm
+
+α_p = a_p exp(-b_p/|E|)
+
+(1.582e6, 6.71e5) cm^-1
+'''
+
+impact_ionization_b_p_si: tuple = (2.036e6, 1.693e6)
+'''
+van Overstraeten-de Man hole impact-ionization critical fields at 300K, below and above E0 = 4e5 V/cm
+
+(2.036e6, 1.693e6) V/cm
+'''
+
+optical_phonon_energy_si: float = 0.063
+'''
+optical phonon energy ħω_op in silicon, which sets the temperature dependence of impact ionization
+
+0.063 eV
+'''
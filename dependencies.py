@@ -0,0 +1,232 @@
+import heapq
+import weakref
+from contextlib import contextmanager
+import numpy as np
+from solvers.numeric import as_numeric
+
+def calculates(*outputs, depends_on=()):
+    '''
+    marks a method as a calculation step of a Calculated class
+
+    - outputs = names of the attributes the step assigns
+    - depends_on = names of the attributes the step reads. A dotted name such as 'mf.gm' reads an attribute of
+      a Calculated object held in an attribute, so the step also reruns when that object recalculates it
+    '''
+    def wrap(fn):
+        fn._outputs = frozenset(outputs)
+        fn._inputs = frozenset(depends_on) | {name.split('.')[0] for name in depends_on}
+        return fn
+    return wrap
+
+def _collect_steps(cls):
+    '''gathers the calculation steps of cls and its bases and orders them so every step runs after the steps it reads from'''
+    steps = []
+    for klass in reversed(cls.__mro__):
+        for value in vars(klass).values():
+            if callable(value) and hasattr(value, '_outputs'):
+                steps.append(value)
+
+    after = [set() for _ in steps]
+    for j, reader in enumerate(steps):
+        needs = reader._inputs - reader._outputs
+        for i, writer in enumerate(steps):
+            if i == j:
+                continue
+            # j reads a value that i writes, or both write the same value and the later declaration wins
+            if writer._outputs & needs or (i < j and writer._outputs & reader._outputs):
+                after[j].add(i)
+
+    ordered = []
+    remaining = [len(a) for a in after]
+    ready = [j for j, count in enumerate(remaining) if count == 0]
+    heapq.heapify(ready)
+    while ready:
+        i = heapq.heappop(ready)
+        ordered.append(steps[i])
+        for j, deps in enumerate(after):
+            if i in deps:
+                remaining[j] -= 1
+                if remaining[j] == 0:
+                    heapq.heappush(ready, j)
+
+    if len(ordered) != len(steps):
+        raise TypeError(f'calculation steps of {cls.__name__} have a dependency cycle')
+    return tuple(ordered)
+
+class _Batch:
+    '''the attributes assigned inside a Calculated.batch() block and their values before the block'''
+    def __init__(self):
+        self.changed = set()
+        self.undo = {}
+
+_MISSING = object()
+
+class Calculated:
+    '''
+    Base class for objects whose derived attributes are recalculated when an attribute is assigned.
+
+    Each calculation step declares the attributes it reads and writes with @calculates, so assigning
+    an attribute only reruns the steps downstream of it. The first assignment after construction
+    runs every step.
+    '''
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._steps = _collect_steps(cls)
+        cls._affected_steps = {}
+        cls._child_inputs = frozenset(name for step in cls._steps for name in step._inputs if '.' in name)
+
+    def lock(self, name):
+        self.value_lock.append(name)
+
+    def set_lock(self, name, value):
+        self.__setattr__(name, value)
+        self.lock(name)
+
+    def unlock(self, name):
+        if name in self.value_lock:
+            self.value_lock.remove(name)
+
+    def __setattr__(self, __name: str, __value) -> None:
+        if 'value_lock' in self.__dict__ and __name in self.value_lock:
+            return
+        if self.__dict__.get('numeric'):
+            __value = as_numeric(__value)
+        assigned = self.__dict__.get('_docalc') and __name != '_docalc'
+        batch = self.__dict__.get('_batch') if assigned else None
+        
+        self.__store(__name, __value, batch)
+        changed = [__name]
+        for alias, value in self._aliases(__name).items():
+            if alias not in self.__dict__.get('value_lock', ()):
+                self.__store(alias, value, batch)
+                changed.append(alias)
+        
+        if assigned:
+            if batch is not None:
+                batch.changed.update(changed)
+            else:
+                self._recalculate(changed)
+    
+    def __store(self, name, value, batch):
+        if batch is not None:
+            batch.undo.setdefault(name, self.__dict__.get(name, _MISSING))
+        self.__dict__[name] = value
+        if isinstance(value, Calculated):
+            parents = value.__dict__.setdefault('_parents', [])
+            if not any(ref() is self and held == name for ref, held in parents):
+                parents.append((weakref.ref(self), name))
+
+    def _aliases(self, name) -> dict:
+        '''attributes that are assigned together with name, mapped to their new values'''
+        return {}
+
+    @classmethod
+    def _affected(cls, names):
+        '''the steps, in run order, that read or write any of names or anything those steps write'''
+        names = frozenset(names)
+        steps = cls._affected_steps.get(names)
+        if steps is None:
+            dirty = set(names)
+            steps = []
+            for step in cls._steps:
+                if (step._inputs | step._outputs) & dirty:
+                    steps.append(step)
+                    dirty |= step._outputs
+            steps = cls._affected_steps[names] = tuple(steps)
+        return steps
+
+    def _calculate(self, cls=None, assigned=()):
+        '''runs every calculation step declared on cls (default: the class of self) and its bases'''
+        cls = cls or type(self)
+        self._run(cls._steps, assigned)
+        if cls._steps == type(self)._steps:
+            self.__dict__['_calculated'] = True
+
+    def _recalculate(self, names):
+        '''reruns the steps affected by the assigned attributes in names'''
+        if not self.__dict__.get('_calculated'):
+            self._calculate(assigned=names)
+        else:
+            self._run(self._affected(names), names)
+
+    def _run(self, steps, assigned=()):
+        docalc = self.__dict__.get('_docalc', True)
+        self._docalc = False
+        self.__dict__['_assigned'] = frozenset(assigned)
+        try:
+            if self.__dict__.get('numeric'):
+                # NaN placeholders and zero biases are expected to give inf/NaN, not warnings
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    for step in steps:
+                        step(self)
+            else:
+                for step in steps:
+                    step(self)
+        finally:
+            self.__dict__['_assigned'] = frozenset()
+            self._docalc = docalc
+        if self.__dict__.get('_parents'):
+            self.__notify(frozenset(assigned).union(*(step._outputs for step in steps)))
+
+    def __notify(self, changed):
+        '''passes the attributes changed by a recalculation on to the Calculated objects that hold this one'''
+        parents = []
+        for ref, name in self.__dict__['_parents']:
+            parent = ref()
+            # dropped once the parent is gone or holds a different object under name
+            if parent is not None and parent.__dict__.get(name) is self:
+                parents.append((ref, name))
+                parent._child_changed(name, changed)
+        self.__dict__['_parents'] = parents
+
+    def _child_changed(self, name, changed):
+        '''recalculates the steps that read the attributes in changed of the Calculated object held in name'''
+        names = type(self)._child_inputs.intersection(f'{name}.{child}' for child in changed)
+        # changes made by this object's own steps, or before its first calculation, are picked up by that run
+        if not names or not self.__dict__.get('_docalc') or not self.__dict__.get('_calculated'):
+            return
+        batch = self.__dict__.get('_batch')
+        if batch is not None:
+            batch.changed.update(names)
+        else:
+            self._recalculate(names)
+
+    def recalculate(self):
+        '''reruns every calculation step'''
+        self._calculate()
+
+    @contextmanager
+    def batch(self):
+        '''
+        defers recalculation to the end of the with block, where the steps affected by every attribute
+        assigned inside the block run once. If the block raises, the assigned attributes are restored.
+        
+        with mosfet.batch():
+            mosfet.Vgs = 2
+            mosfet.Vds = 1
+        '''
+        if self.__dict__.get('_batch') is not None:
+            yield self
+            return
+        
+        batch = self.__dict__['_batch'] = _Batch()
+        try:
+            yield self
+        except BaseException:
+            self.__dict__['_batch'] = None
+            for name, value in batch.undo.items():
+                if value is _MISSING:
+                    self.__dict__.pop(name, None)
+                else:
+                    self.__dict__[name] = value
+            raise
+        
+        self.__dict__['_batch'] = None
+        if batch.changed:
+            self._recalculate(batch.changed)
+
+    def update(self, **params):
+        '''assigns every keyword argument as an attribute and recalculates once'''
+        with self.batch():
+            for name, value in params.items():
+                setattr(self, name, value)
@@ -1,29 +1,35 @@
-from solvers.constants import KbToq, KbT, ni, q, eps_si
-import solvers.constants as cs
-from sympy import ln, sqrt, exp, symbols
+from solvers.constants import q, eps_si
+from solvers import carriers_np as eqs_np
+from solvers.numeric import ln, sqrt, exp, is_number, placeholders
 from solvers.silicon import Silicon
+from solvers.materials import SiliconMaterial, silicon
+from solvers.dependencies import Calculated, calculates
+from solvers.poisson import PNJunctionPoisson, PoissonSolution
+from solvers.driftdiffusion import DriftDiffusionDiode
+from solvers import recovery
+import numpy as np
 
-def Vbi(Na, Nd):
-    '''Returns the built-in voltage of a diode with Na and Nd acceptor / donors concentrations.'''
-    return KbToq * ln(Na*Nd/(ni**2))
+def Vbi(Na, Nd, T=300, material=silicon):
+    '''Returns the built-in voltage of a diode with Na and Nd acceptor / donors concentrations at temperature T.'''
+    return material.KbToq(T) * ln(Na*Nd/(material.ni(T)**2))
 
-def W_depl(Na, Nd, Vpn=0):
+def W_depl(Na, Nd, Vpn=0, T=300, material=silicon):
     '''Returns the width of the depletion region.'''
-    vbi = Vbi(Na, Nd)
+    vbi = Vbi(Na, Nd, T, material)
     part1 = 2*eps_si / q
     part2 = (Na + Nd) / (Na * Nd)
     return sqrt(part1 * part2 * (vbi - Vpn))
 
-def W_depl_p(Na, Nd, Vpn=0):
+def W_depl_p(Na, Nd, Vpn=0, T=300, material=silicon):
     '''Returns the width of the p-side depletion region.'''
-    vbi = Vbi(Na, Nd)
+    vbi = Vbi(Na, Nd, T, material)
     part1 = 2*eps_si / q
     part2 = Nd / (Na * (Na + Nd))
     return sqrt(part1 * part2 * (vbi - Vpn))
 
-def W_depl_n(Na, Nd, Vpn=0):
+def W_depl_n(Na, Nd, Vpn=0, T=300, material=silicon):
     '''Returns the width of the n-side depletion region.'''
-    vbi = Vbi(Na, Nd)
+    vbi = Vbi(Na, Nd, T, material)
     part1 = 2*eps_si / q
     part2 = Na / (Nd * (Na + Nd))
     return sqrt(part1 * part2 * (vbi - Vpn))
@@ -36,16 +42,18 @@ def E_n_depletion(Nd, Wdn, x):
     '''Returns the electric field in the n-side depletion region at x away from center.'''
     return -(q*Nd/eps_si) * (Wdn - x)
 
-def depl_min_conc_at_edge(p_or_n, Vpn=0):
+def depl_min_conc_at_edge(p_or_n, Vpn=0, T=300, material=silicon):
     '''Returns the minority carrier concentration at the edge of the depletion region'''
-    return p_or_n * exp(q*Vpn/KbT)
+    return p_or_n * exp(q*Vpn/material.KbT(T))
     
-def hole_cur_desnsity_at_n_depl_edge(Nd, DpN, LpN, Vpn=0):
+def hole_cur_desnsity_at_n_depl_edge(Nd, DpN, LpN, Vpn=0, T=300, material=silicon):
     '''Returns the hole current density at the edge of the n-side depletion region.'''
+    ni, KbT = material.ni(T), material.KbT(T)
     return ((q*DpN*(ni**2))/(LpN*Nd)) * (exp(q*Vpn/KbT) - 1)
 
-def electron_cur_density_at_p_depl_edge(Na, DnP, LnP, Vpn=0):
+def electron_cur_density_at_p_depl_edge(Na, DnP, LnP, Vpn=0, T=300, material=silicon):
     '''Returns the electron current density at the edge of the p-side depletion region.'''
+    ni, KbT = material.ni(T), material.KbT(T)
     return ((q*DnP*(ni**2))/(LnP*Na)) * (exp(q*Vpn/KbT) - 1)
 
 def v_n_depletion_edge(Nd, Wdp, Vpn=0):
@@ -56,10 +64,121 @@ def v_p_depletion_edge(Na, Wdn, Vpn=0):
     '''Returns the electric potential in the p-side depletion region at x away from center.'''
     return q*Na/(2*eps_si) * Wdn**2
 
-class Diode:
-    def __init__(self):
-        self.p: Silicon = Silicon()
-        self.n: Silicon = Silicon()
+def ionization_integral(Na, Nd, V_R, T=300, material=silicon, points=257):
+    '''
+    electron-initiated impact-ionization integral across the depletion region of an abrupt junction at reverse
+    bias V_R, ∫ α_n exp(-∫(α_n - α_p) dx') dx = 1 - 1/M_n, which reaches 1 at avalanche breakdown.
+    Broadcasts over arrays of Na, Nd and V_R.
+    
+    - Na = p-side acceptor concentration. units = cm^-3
+    - Nd = n-side donor concentration. units = cm^-3
+    - V_R = reverse bias, -Vpn. units = V
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - points = trapezoid-rule points on each side of the field peak
+    '''
+    Na, Nd, V_R = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (Na, Nd, V_R)))
+    gamma = material.ionization_gamma(T)
+    drop = Vbi(Na, Nd, T, material) + V_R
+    N_eff = Na*Nd/(Na + Nd)
+    E_max = np.sqrt(2*q/eps_si * N_eff * drop)
+    w = np.sqrt(2*eps_si/q * drop / N_eff)
+    w_p = w*Nd/(Na + Nd)
+    
+    # the field rises linearly across the p side to its peak at the junction and falls across the n side,
+    # so the mesh puts a node on the peak
+    s = np.linspace(0, 1, points)
+    x = np.concatenate((w_p[..., None]*s, w_p[..., None] + (w - w_p)[..., None]*s[1:]), axis=-1)
+    E = E_max[..., None]*np.concatenate((s, s[-2::-1]))
+    alpha_n = eqs_np.alpha_n_impact(E, gamma)
+    dx = np.diff(x, axis=-1)
+    
+    def cumulative(f):
+        return np.concatenate((np.zeros(f.shape[:-1] + (1,)), np.cumsum((f[..., 1:] + f[..., :-1])/2*dx, axis=-1)), axis=-1)
+    
+    integrand = alpha_n*np.exp(-cumulative(alpha_n - eqs_np.alpha_p_impact(E, gamma)))
+    return cumulative(integrand)[..., -1][()]
+
+def breakdown_voltage(Na, Nd, T=300, material=silicon, points=257, tol=1e-10, iterations=60):
+    '''
+    avalanche breakdown voltage of an abrupt junction, the reverse bias where the ionization integral reaches 1,
+    solved elementwise over arrays of Na and Nd by bracketed secant (Illinois) steps on its logarithm
+    
+    - Na = p-side acceptor concentration. units = cm^-3
+    - Nd = n-side donor concentration. units = cm^-3
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - points = trapezoid-rule points on each side of the field peak
+    - tol = convergence tolerance on ln(vbi + V_R)
+    - iterations = iteration limit, of the bracketing and of the secant steps; RuntimeError if the root is not bracketed
+    '''
+    Na, Nd = np.broadcast_arrays(np.asarray(Na, dtype=np.float64), np.asarray(Nd, dtype=np.float64))
+    shape = Na.shape
+    Na, Nd = Na.ravel(), Nd.ravel()
+    vbi = Vbi(Na, Nd, T, material)
+    
+    def log_integral(v, i):
+        with np.errstate(divide='ignore'):
+            return np.log(ionization_integral(Na[i], Nd[i], np.exp(v) - vbi[i], T, material, points))
+    
+    # bracket the root in v = ln(vbi + V_R), starting from the empirical estimate and stepping by e^0.5
+    empirical = 60 * (material.Eg(T)/1.1242)**(3/2) * (1e16/np.minimum(Na, Nd))**(3/4)
+    low = np.log(vbi + empirical)
+    g_low = log_integral(low, slice(None))
+    high, g_high = low.copy(), g_low.copy()
+    for _ in range(iterations):
+        above, below = g_high <= 0, g_low > 0
+        if not (above.any() or below.any()):
+            break
+        low[above], g_low[above] = high[above], g_high[above]
+        high[above] += 0.5
+        high[below], g_high[below] = low[below], g_low[below]
+        low[below] -= 0.5
+        g_high[above] = log_integral(high[above], above)
+        g_low[below] = log_integral(low[below], below)
+    if (g_high <= 0).any() or (g_low > 0).any():
+        raise RuntimeError(f'breakdown voltage not bracketed within {iterations} steps of e^0.5')
+    
+    # only the elements whose bracket is still wider than tol are evaluated each pass
+    v = (low + high)/2
+    active = np.flatnonzero(high - low > tol)
+    side = np.zeros(len(Na), dtype=np.int8)
+    for _ in range(iterations):
+        if not len(active):
+            break
+        a, b, ga, gb = low[active], high[active], g_low[active], g_high[active]
+        v[active] = b - gb*(b - a)/(gb - ga)
+        g = log_integral(v[active], active)
+        # Illinois: halve the retained end's residual when the same end is kept twice
+        left = g > 0
+        keep = np.where(left, 1, -1)
+        g_low[active] = np.where(~left, g, np.where(side[active] == 1, ga/2, ga))
+        g_high[active] = np.where(left, g, np.where(side[active] == -1, gb/2, gb))
+        low[active] = np.where(left, a, v[active])
+        high[active] = np.where(left, v[active], b)
+        side[active] = keep
+        active = active[(np.abs(g) > tol) & (high[active] - low[active] > tol)]
+    return (np.exp(v) - vbi).reshape(shape)[()]
+
+class Diode(Calculated):
+    '''
+    A p-n junction diode built from a p-type and an n-type Silicon side.
+    Temperature is a single scalar T shared by both sides; sweep T with one Diode per temperature.
+    '''
+    def __init__(self, numeric: bool = False, material: SiliconMaterial = None):
+        self._docalc = False
+        
+        self.numeric = numeric
+        '''numeric-only mode: unset quantities are NaN instead of sympy Symbols and all arithmetic stays in NumPy'''
+        symbols = placeholders(numeric)
+        
+        self.material = silicon if material is None else material
+        '''temperature-dependent silicon parameters (ni, Nc, Nv, Eg, kT/q)'''
+        self.T = 300
+        '''temperature, shared by both sides of the junction; scalar only. units = K'''
+        
+        self.p: Silicon = Silicon(numeric, self.material)
+        self.n: Silicon = Silicon(numeric, self.material)
         
         self.vbi = symbols('vbi')
         '''Built-in voltage'''
@@ -147,56 +266,236 @@ class Diode:
         self.C_pn = 0
         '''small-signal capacitance per unit area'''
         
+        self.value_lock = []
+        
+        self._docalc = True
+        
     def dope_p_and_n(self, Na=0, Nd=0):
-        self.p.Na = Na
-        self.p.Nd = 0
-        self.n.Na = 0
-        self.n.Nd = Nd
-        self.vbi = Vbi(Na, Nd)
-        self.__calculate()
+        with self.batch():
+            self.p.Na = Na
+            self.p.Nd = 0
+            self.n.Na = 0
+            self.n.Nd = Nd
+            self.vbi = Vbi(Na, Nd, self.T, self.material)
 
     def get_potential(self, side, x):
-        '''gets the potential at x away from the center of the depletion region on the side specified by side.'''
-        if x < -self.w_depl_n:
-            return self.v_bias
-        elif x > self.w_depl_p:
-            return 0
+        '''
+        gets the potential at a distance x from the center of the depletion region on the side specified by side,
+        using the depletion approximation with the p-side neutral region at 0 V
+        '''
         if (side == 'n'):
-            return self.v_bias - v_n_depletion_edge(self.n.Nd, self.w_depl, x, self.v_bias)
+            if x > self.w_depl_n:
+                return self.vbi - self.v_bias
+            return self.vbi - self.v_bias - v_n_depletion_edge(self.n.Nd, self.w_depl_n - x, self.v_bias)
         else:
-            return self.v_bias - v_p_depletion_edge(self.p.Na, self.w_depl, x, self.v_bias)
-        
+            if x > self.w_depl_p:
+                return 0
+            return v_p_depletion_edge(self.p.Na, self.w_depl_p - x, self.v_bias)
+    
+    def solve_poisson(self, V=None, points=2001) -> PoissonSolution:
+        '''
+        solves the nonlinear Poisson equation across the junction instead of using the depletion approximation,
+        starting from the previous solution so bias sweeps converge in a few Newton iterations each
+        
+        - V = bias voltage Vpn; the current bias when omitted
+        - points = number of mesh points
+        '''
+        if not (is_number(self.p.Na) and is_number(self.n.Nd)):
+            raise ValueError('dope_p_and_n must be called before solving the junction')
+        key = (self.p.Na, self.n.Nd, self.T, self.material, points)
+        if self.__dict__.get('_poisson_key') != key:
+            self.__dict__['_poisson'] = PNJunctionPoisson(self.p.Na, self.n.Nd, self.T, self.material, points)
+            self.__dict__['_poisson_key'] = key
+        return self._poisson.solve(self.v_bias if V is None else V)
+    
+    def drift_diffusion(self, points=1000) -> DriftDiffusionDiode:
+        '''
+        drift-diffusion simulator of this diode, built from the mobilities and lifetimes of the p and n sides
+        and kept between calls while the doping, temperature and material are unchanged
+        
+        - points = number of mesh nodes
+        '''
+        if not (is_number(self.p.Na) and is_number(self.n.Nd)):
+            raise ValueError('dope_p_and_n must be called before simulating the junction')
+        key = (self.p.Na, self.n.Nd, self.T, self.material, points)
+        if self.__dict__.get('_drift_diffusion_key') != key:
+            self.__dict__['_drift_diffusion'] = DriftDiffusionDiode(self.p, self.n, self.T, self.material, points=points)
+            self.__dict__['_drift_diffusion_key'] = key
+        return self._drift_diffusion
+        
+    def avalanche_breakdown(self, points=257):
+        '''
+        breakdown voltage from the impact-ionization integral over the depletion field, in place of the
+        empirical V_breakdown estimate
+        
+        - points = trapezoid-rule points on each side of the field peak
+        '''
+        if not (is_number(self.p.Na) and is_number(self.n.Nd)):
+            raise ValueError('dope_p_and_n must be called before solving for breakdown')
+        return breakdown_voltage(float(self.p.Na), float(self.n.Nd), self.T, self.material, points)
+    
+    def __charge_control_terms(self):
+        '''I_S, C_j0, vbi and the I_S-weighted stored-charge lifetime, as floats'''
+        if not (is_number(self.p.Na) and is_number(self.n.Nd) and is_number(self.area)):
+            raise ValueError('dope_p_and_n and set_area must be called before simulating switching')
+        Na, Nd, vbi, ni, KbT = self.__sweep_terms()
+        I_S_n = float(self.area * q * self.p.Dn * ni**2 / (self.p.n_diffusion_length * Na))
+        I_S_p = float(self.area * q * self.n.Dp * ni**2 / (self.n.p_diffusion_length * Nd))
+        tau = (I_S_n*float(self.p.rec_life_n) + I_S_p*float(self.n.rec_life_p)) / (I_S_n + I_S_p)
+        C_j0 = float(self.area) * np.sqrt(q*eps_si/2 * Na*Nd/(Na + Nd) / vbi)
+        return I_S_n + I_S_p, C_j0, vbi, tau
+    
+    def switching_transient(self, I_before, I_after, tau=None, R=1e3, t_end=None, samples=2001):
+        '''
+        charge-control transient of the diode driven through R by a source stepping at t = 0, batched over arrays;
+        see recovery.switching_transient
+        
+        - I_before = forward current before the step. units = A
+        - I_after = source level after the step divided by R. units = A
+        - tau = stored-charge lifetime; the saturation-current-weighted lifetime of the two sides when omitted. units = s
+        - R = source resistance. units = Ω
+        - t_end = end time. units = s
+        - samples = number of output times
+        '''
+        I_S, C_j0, vbi, tau_eff = self.__charge_control_terms()
+        return recovery.switching_transient(I_S, C_j0, vbi, I_before, I_after, tau_eff if tau is None else tau, R,
+                                            self.T, self.material, t_end, samples)
+    
+    def reverse_recovery(self, IF, IR, tau=None, R=1e3, t_end=None, samples=2001):
+        '''
+        turn-off transient from forward current IF to a reverse source of -IR·R through R, batched over arrays of IF, IR and tau;
+        see recovery.reverse_recovery for the storage time 't_s' and reverse-recovery time 't_rr'
+        
+        - IF = forward current before turn-off. units = A
+        - IR = magnitude of the reverse source level divided by R; the current during storage is IR + v/R. units = A
+        - tau = stored-charge lifetime; the saturation-current-weighted lifetime of the two sides when omitted. units = s
+        - R = source resistance. units = Ω
+        - t_end = end time. units = s
+        - samples = number of output times
+        '''
+        I_S, C_j0, vbi, tau_eff = self.__charge_control_terms()
+        return recovery.reverse_recovery(I_S, C_j0, vbi, IF, IR, tau_eff if tau is None else tau, R,
+                                         self.T, self.material, t_end, samples)
+    
     def bias(self, Vpn):
         self.v_bias = Vpn
-        self.__calculate()
         
     def set_area(self, A):
         self.area = A
-        self.__calculate()
+    
+    def __sweep_terms(self):
+        '''the bias-independent terms of the diode equations as floats, computed once per sweep'''
+        if not (is_number(self.p.Na) and is_number(self.n.Nd)):
+            raise ValueError('dope_p_and_n must be called before sweeping the bias')
+        ni, KbT = self.material.ni(self.T), self.material.KbT(self.T)
+        return float(self.p.Na), float(self.n.Nd), float(self.vbi), ni, KbT
+    
+    def iv_curve(self, V):
+        '''
+        diode current over an array of bias voltages, without changing the state of the diode
+        
+        returns a dict of arrays with 'J_D', 'w_depl' and, when the area is set, 'I_D'
+        
+        - V = bias voltages Vpn. units = V
+        '''
+        V = np.asarray(V, dtype=np.float64)
+        Na, Nd, vbi, ni, KbT = self.__sweep_terms()
+        J_S_diff = float(self.J_S_diff)
+        t_rec_scr = float(self.t_rec_scr)
+        
+        with np.errstate(invalid='ignore', over='ignore'):
+            w_depl = np.sqrt(2*eps_si/q * (Na + Nd)/(Na*Nd) * (vbi - V))
+            J_S_scr = q*ni*w_depl / (2*t_rec_scr)
+            J_D = J_S_diff * (np.exp(q*V/KbT) - 1) + J_S_scr * (np.exp(q*V/(2*KbT)) - 1)
+        
+        curve = {'J_D': J_D, 'w_depl': w_depl}
+        if is_number(self.area):
+            curve['I_D'] = J_D * self.area
+        return curve
+    
+    def cv_curve(self, V):
+        '''
+        small-signal capacitances over an array of bias voltages, without changing the state of the diode
+        
+        returns a dict of arrays with 'C_pn_dep', 'C_pn_diff', 'C_pn' and 'w_depl', per unit area when the area is not set
+        
+        - V = bias voltages Vpn. units = V
+        '''
+        V = np.asarray(V, dtype=np.float64)
+        Na, Nd, vbi, ni, KbT = self.__sweep_terms()
+        area = self.area if is_number(self.area) else 1
+        L_p = float(self.n.p_diffusion_length)
+        L_n = float(self.p.n_diffusion_length)
+        
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            w_depl = np.sqrt(2*eps_si/q * (Na + Nd)/(Na*Nd) * (vbi - V))
+            C_pn_dep = area * np.sqrt(q*eps_si/2 * Na*Nd/(Na + Nd) / (vbi - V))
+            boltzmann = np.exp(q*V/KbT)
+            C_pn_diff_n = area * (q**2 * ni**2 * L_p / (KbT * Nd)) * boltzmann
+            C_pn_diff_p = area * (q**2 * ni**2 * L_n / (KbT * Na)) * boltzmann
+            C_pn_diff = C_pn_diff_n + C_pn_diff_p
+        
+        return {'C_pn_dep': C_pn_dep, 'C_pn_diff': C_pn_diff, 'C_pn': C_pn_dep + C_pn_diff, 'w_depl': w_depl}
+        
+    @calculates('vbi', 'V_breakdown', depends_on=('p.Na', 'n.Nd', 'T', 'material'))
+    def __calc_junction(self):
+        if not (is_number(self.p.Na) and is_number(self.n.Nd)):
+            return
+        
+        # the sides follow the junction; the steps below read them after this one, as they all depend on vbi
+        for side in (self.p, self.n):
+            if side.material is not self.material or side.T != self.T:
+                side.update(material=self.material, T=self.T)
+        self.vbi = Vbi(self.p.Na, self.n.Nd, self.T, self.material)
+        
+        Nb = min(self.p.Na, self.n.Nd)
+        self.V_breakdown = 60 * (self.material.Eg(self.T)/1.1242)**(3/2) * (1e16/Nb)**(3/4)
+    
+    @calculates('w_depl', 'w_depl_n', 'w_depl_p', 'depl_edge_n_conc', 'depl_edge_p_conc', 'vbi_n', 'vbi_p', 'e_bi_max',
+                depends_on=('vbi', 'v_bias', 'T', 'material', 'p.Na', 'n.Nd', 'p.n', 'n.p'))
+    def __calc_depletion(self):
+        if not (is_number(self.p.Na) and is_number(self.n.Nd)):
+            return
         
-    def __calculate(self):
         self.__get_depl_widths()
         self.__get_edge_potentials()
-        self.__get_cur_densities()
         self.__get_e_bi_max()
+    
+    @calculates('depl_edge_n_J', 'depl_edge_p_J', 't_rec_scr', 't_gen_scr', 'Rmax_rec', 'J_d_scr', 'J_d_scg',
+                'J_S_diff', 'J_S_scr', 'J_D', 'I_D',
+                depends_on=('vbi', 'w_depl', 'v_bias', 'area', 'T', 'material', 'p.Na', 'n.Nd', 'p.Dn', 'n.Dp',
+                            'p.n_diffusion_length', 'n.p_diffusion_length', 'p.rec_life_n', 'n.rec_life_p',
+                            'p.gen_life_n', 'n.gen_life_p'))
+    def __calc_currents(self):
+        if not (is_number(self.p.Na) and is_number(self.n.Nd)):
+            return
         
-        Nb = min(self.p.Na, self.n.Nd)
-        self.V_breakdown = 60 * (cs.Eg_si/1.1242)**(3/2) * (1e16/Nb)**(3/4)
+        self.__get_cur_densities()
+    
+    @calculates('Q_pn_dep', 'Q_pn_diff_n', 'Q_pn_diff_p', 'C_pn_dep', 'C_pn_diff_n', 'C_pn_diff_p', 'C_pn_diff', 'C_pn',
+                depends_on=('vbi', 'w_depl_n', 'v_bias', 'area', 'T', 'material', 'p.Na', 'n.Nd',
+                            'p.n_diffusion_length', 'n.p_diffusion_length'))
+    def __calc_charges(self):
+        if not (is_number(self.p.Na) and is_number(self.n.Nd)):
+            return
+        
+        ni, KbT = self.material.ni(self.T), self.material.KbT(self.T)
         self.Q_pn_dep = q * self.n.Nd * self.w_depl_n
         self.Q_pn_diff_n = (q*ni**2*self.n.p_diffusion_length/self.n.Nd) * (exp(q*self.v_bias/KbT) - 1)
         self.Q_pn_diff_p = -(q*ni**2*self.p.n_diffusion_length/self.p.Na) * (exp(q*self.v_bias/KbT) - 1)
         self.__get_small_signal_capacitance()
     
     def __get_depl_widths(self):
-        self.w_depl = W_depl(self.p.Na, self.n.Nd, self.v_bias)
-        self.w_depl_n = W_depl_n(self.p.Na, self.n.Nd, self.v_bias)
-        self.w_depl_p = W_depl_p(self.p.Na, self.n.Nd, self.v_bias)
-        self.depl_edge_n_conc = depl_min_conc_at_edge(self.p.n, self.v_bias)
-        self.depl_edge_p_conc = depl_min_conc_at_edge(self.n.p, self.v_bias)
+        self.w_depl = W_depl(self.p.Na, self.n.Nd, self.v_bias, self.T, self.material)
+        self.w_depl_n = W_depl_n(self.p.Na, self.n.Nd, self.v_bias, self.T, self.material)
+        self.w_depl_p = W_depl_p(self.p.Na, self.n.Nd, self.v_bias, self.T, self.material)
+        self.depl_edge_n_conc = depl_min_conc_at_edge(self.p.n, self.v_bias, self.T, self.material)
+        self.depl_edge_p_conc = depl_min_conc_at_edge(self.n.p, self.v_bias, self.T, self.material)
         
     def __get_cur_densities(self):
-        self.depl_edge_n_J = electron_cur_density_at_p_depl_edge(self.p.Na, self.p.Dn, self.p.n_diffusion_length, self.v_bias)
-        self.depl_edge_p_J = hole_cur_desnsity_at_n_depl_edge(self.n.Nd, self.n.Dp, self.n.p_diffusion_length, self.v_bias)
+        ni, KbT = self.material.ni(self.T), self.material.KbT(self.T)
+        self.depl_edge_n_J = electron_cur_density_at_p_depl_edge(self.p.Na, self.p.Dn, self.p.n_diffusion_length, self.v_bias, self.T, self.material)
+        self.depl_edge_p_J = hole_cur_desnsity_at_n_depl_edge(self.n.Nd, self.n.Dp, self.n.p_diffusion_length, self.v_bias, self.T, self.material)
         
         self.t_rec_scr = (self.p.rec_life_n + self.n.rec_life_p)/2
         self.t_gen_scr = (self.p.gen_life_n + self.n.gen_life_p)/2
@@ -219,6 +518,7 @@ class Diode:
         self.e_bi_max = E_p_depletion(self.p.Na, self.w_depl_p, 0)
         
     def __get_small_signal_capacitance(self):
+        ni, KbT = self.material.ni(self.T), self.material.KbT(self.T)
         p1 = q*eps_si/2
         p2 = self.p.Na * self.n.Nd / (self.p.Na + self.n.Nd)
         p3 = 1/(self.vbi - self.v_bias)
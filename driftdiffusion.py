@@ -0,0 +1,291 @@
+import numpy as np
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import splu
+from solvers.constants import q, eps_si
+from solvers.materials import SiliconMaterial, silicon
+from solvers.numeric import graded_mesh
+
+def _bernoulli(x):
+    '''B(x) = x/(exp(x) - 1) and dB/dx, using their series near x = 0'''
+    small = np.abs(x) < 1e-4
+    safe = np.where(small, 1.0, x)
+    em1 = np.expm1(safe)
+    B = np.where(small, 1 - x/2 + x*x/12, safe/em1)
+    dB = np.where(small, -0.5 + x/6, (em1 - safe*(em1 + 1))/em1**2)
+    return B, np.nan_to_num(dB)
+
+class DriftDiffusionDiode:
+    '''
+    Scharfetter-Gummel drift-diffusion simulator for an abrupt pn junction with ohmic contacts.
+
+    Poisson's equation and the electron and hole continuity equations are solved together by Newton's
+    method in ψ and the quasi-Fermi potentials φn, φp, with Shockley-Read-Hall recombination. The
+    unknowns of each node are stored together, so the Jacobian is block tridiagonal; its sparse LU
+    factorization is reused across iterations, bias points and time steps until convergence slows.
+
+    All quantities are scaled internally: potentials by kT/q, concentrations by the larger doping,
+    lengths by its Debye length.
+    '''
+    def __init__(self, p, n, T=300, material: SiliconMaterial = silicon, length_p=None, length_n=None, points=1000):
+        '''
+        - p = Silicon of the p side; supplies Na, the mobilities and the minority (electron) lifetime
+        - n = Silicon of the n side; supplies Nd, the mobilities and the minority (hole) lifetime
+        - T = temperature. units = K
+        - material = temperature-dependent silicon parameters
+        - length_p = length of the p side, junction to contact; 5 electron diffusion lengths when omitted. units = cm
+        - length_n = length of the n side, junction to contact; 5 hole diffusion lengths when omitted. units = cm
+        - points = number of mesh nodes
+
+        The majority-carrier lifetime of each side is taken equal to its minority-carrier lifetime.
+        '''
+        Na, Nd = float(p.Na), float(n.Nd)
+        self.Na = Na
+        self.Nd = Nd
+        self.T = T
+        self.Vt = material.KbToq(T)
+        ni = material.ni(T)
+
+        C0 = max(Na, Nd)
+        self.Ld = np.sqrt(eps_si*self.Vt/(q*C0))
+        mu_n = np.array([float(p.mu_n), float(n.mu_n)])
+        mu_p = np.array([float(p.mu_p), float(n.mu_p)])
+        tau = np.array([float(p.rec_life_n), float(n.rec_life_p)])
+        D0 = self.Vt*max(mu_n.max(), mu_p.max())
+        self.t0 = self.Ld**2/D0
+        '''time scale. units = s'''
+        self.J0 = q*D0*C0/self.Ld
+        '''current density scale. units = A/cm^2'''
+        self.C0 = C0
+
+        length_p = 5*float(p.n_diffusion_length) if length_p is None else length_p
+        length_n = 5*float(n.p_diffusion_length) if length_n is None else length_n
+        h0 = self.Ld/2
+        side = points//2
+        x_p = graded_mesh(length_p, side, h0) + h0/2
+        x_n = graded_mesh(length_n, points - side, h0) + h0/2
+        self.x = np.concatenate((-x_p[::-1], x_n))
+        '''mesh positions, p contact at x < 0, metallurgical junction at x = 0. units = cm'''
+
+        x = self.x/self.Ld
+        self._h = np.diff(x)
+        self._volume = np.concatenate(([self._h[0]/2], (self._h[:-1] + self._h[1:])/2, [self._h[-1]/2]))
+        region = (self.x > 0).astype(int)
+        self._doping = np.where(region, Nd, -Na)/C0
+        self._ni = ni/C0
+        self._tau = tau[region]/self.t0
+        edge_region = (region[:-1] + region[1:])/2
+        self._Dn = self.Vt*(mu_n[0]*(1 - edge_region) + mu_n[1]*edge_region)/D0
+        self._Dp = self.Vt*(mu_p[0]*(1 - edge_region) + mu_p[1]*edge_region)/D0
+
+        N = len(self.x)
+        self._rows, self._cols = self.__pattern(N)
+        self._lu = None
+        self._scale = None
+
+        # equilibrium start: local charge neutrality, flat quasi-Fermi levels
+        self.V = 0.0
+        '''bias Vpn of the current solution. units = V'''
+        self._u = np.zeros(3*N)
+        self._u[0::3] = np.arcsinh(self._doping/(2*self._ni))
+        self.__newton(0.0)
+
+    @staticmethod
+    def __pattern(N):
+        '''row and column of every entry of the block-tridiagonal Jacobian, in block order (node, equation, neighbour, unknown)'''
+        node, equation, neighbour, unknown = np.meshgrid(np.arange(N), np.arange(3), np.arange(3), np.arange(3), indexing='ij')
+        rows = 3*node + equation
+        cols = 3*(node + neighbour - 1) + unknown
+        valid = (cols >= 0) & (cols < 3*N)
+        return rows, np.where(valid, cols, 0)
+
+    def __contacts(self, V):
+        '''ψ, φn and φp at the two contacts for bias V, in kT/q'''
+        v = V/self.Vt
+        psi = np.arcsinh(self._doping[[0, -1]]/(2*self._ni)) + np.array([v, 0])
+        return psi, np.array([v, 0])
+
+    def __carriers(self, u):
+        psi, phin, phip = u[0::3], u[1::3], u[2::3]
+        return self._ni*np.exp(psi - phin), self._ni*np.exp(phip - psi)
+
+    def __system(self, u, V, dt=None, old=None, jacobian=True):
+        '''residual of every equation and, when jacobian is set, the Jacobian blocks'''
+        psi, phin, phip = u[0::3], u[1::3], u[2::3]
+        n, p = self.__carriers(u)
+        h, vol, ni, tau = self._h, self._volume, self._ni, self._tau
+        N = len(psi)
+
+        dpsi = np.diff(psi)
+        Bp, dBp = _bernoulli(dpsi)
+        Bm, dBm = _bernoulli(-dpsi)
+        a = self._Dn/h
+        b = self._Dp/h
+        Fn = a*(n[1:]*Bp - n[:-1]*Bm)
+        Fp = b*(p[:-1]*Bp - p[1:]*Bm)
+
+        denominator = tau*(n + ni) + tau*(p + ni)
+        R = (n*p - ni**2)/denominator
+        storage_n = storage_p = 0
+        if dt is not None:
+            storage_n = vol*(n - old[0])/dt
+            storage_p = vol*(p - old[1])/dt
+
+        F = np.empty((N, 3))
+        F[1:-1, 0] = dpsi[1:]/h[1:] - dpsi[:-1]/h[:-1] + vol[1:-1]*(p - n + self._doping)[1:-1]
+        F[1:-1, 1] = Fn[1:] - Fn[:-1] - (vol*R + storage_n)[1:-1]
+        F[1:-1, 2] = Fp[1:] - Fp[:-1] + (vol*R + storage_p)[1:-1]
+        psi_c, phi_c = self.__contacts(V)
+        F[[0, -1], 0] = psi[[0, -1]] - psi_c
+        F[[0, -1], 1] = phin[[0, -1]] - phi_c
+        F[[0, -1], 2] = phip[[0, -1]] - phi_c
+        if not jacobian:
+            return F.ravel(), Fn, Fp, R
+
+        # derivatives of the edge fluxes with respect to the unknowns of their left and right nodes
+        dFn_left = np.stack((a*(-n[1:]*dBp - n[:-1]*Bm - n[:-1]*dBm), a*n[:-1]*Bm, 0*a), axis=-1)
+        dFn_right = np.stack((a*(n[1:]*(Bp + dBp) + n[:-1]*dBm), -a*n[1:]*Bp, 0*a), axis=-1)
+        dFp_left = np.stack((b*(-p[:-1]*(Bp + dBp) - p[1:]*dBm), 0*b, b*p[:-1]*Bp), axis=-1)
+        dFp_right = np.stack((b*(p[:-1]*dBp + p[1:]*Bm + p[1:]*dBm), 0*b, -b*p[1:]*Bm), axis=-1)
+
+        dR_dn = (p*denominator - (n*p - ni**2)*tau)/denominator**2
+        dR_dp = (n*denominator - (n*p - ni**2)*tau)/denominator**2
+        dR = np.stack((dR_dn*n - dR_dp*p, -dR_dn*n, dR_dp*p), axis=-1)*vol[:, None]
+        dstorage_n = np.zeros((N, 3))
+        dstorage_p = np.zeros((N, 3))
+        if dt is not None:
+            dstorage_n[:, 0], dstorage_n[:, 1] = vol*n/dt, -vol*n/dt
+            dstorage_p[:, 0], dstorage_p[:, 2] = -vol*p/dt, vol*p/dt
+
+        # blocks[node, equation, neighbour (left, self, right), unknown]
+        blocks = np.zeros((N, 3, 3, 3))
+        inner = slice(1, -1)
+        blocks[inner, 0, 0, 0] = 1/h[:-1]
+        blocks[inner, 0, 2, 0] = 1/h[1:]
+        blocks[inner, 0, 1, 0] = -(1/h[:-1] + 1/h[1:]) - vol[1:-1]*(p + n)[1:-1]
+        blocks[inner, 0, 1, 1] = vol[1:-1]*n[1:-1]
+        blocks[inner, 0, 1, 2] = vol[1:-1]*p[1:-1]
+
+        blocks[inner, 1, 0] = -dFn_left[:-1]
+        blocks[inner, 1, 1] = dFn_left[1:] - dFn_right[:-1] - dR[inner] - dstorage_n[inner]
+        blocks[inner, 1, 2] = dFn_right[1:]
+        blocks[inner, 2, 0] = -dFp_left[:-1]
+        blocks[inner, 2, 1] = dFp_left[1:] - dFp_right[:-1] + dR[inner] + dstorage_p[inner]
+        blocks[inner, 2, 2] = dFp_right[1:]
+
+        for end in (0, -1):
+            blocks[end, :, 1] = np.eye(3)
+        return F.ravel(), blocks
+
+    def __factor(self, blocks):
+        diagonal = np.abs(blocks[:, :, 1, :][:, [0, 1, 2], [0, 1, 2]]).ravel()
+        self._scale = 1/np.where(diagonal > 0, diagonal, 1)
+        data = blocks*self._scale.reshape(-1, 3)[:, :, None, None]
+        N = blocks.shape[0]
+        matrix = csc_matrix((data.ravel(), (self._rows.ravel(), self._cols.ravel())), shape=(3*N, 3*N))
+        self._lu = splu(matrix)
+
+    def __newton(self, V, dt=None, old=None, tol=1e-9, max_iterations=60):
+        u = self._u.copy()
+        previous = np.inf
+        refactor = self._lu is None
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            for _ in range(max_iterations):
+                if refactor:
+                    F, blocks = self.__system(u, V, dt, old)
+                    self.__factor(blocks)
+                else:
+                    F = self.__system(u, V, dt, old, jacobian=False)[0]
+                delta = -self._lu.solve(self._scale*F)
+                # logarithmic damping of large updates keeps the exponentials in range
+                delta = np.where(np.abs(delta) > 1, np.sign(delta)*(1 + np.log(np.abs(delta))), delta)
+                u += delta
+                size = np.max(np.abs(delta))
+                if size < tol:
+                    self._u = u
+                    self.V = V
+                    return
+                # a stale factorization that no longer contracts quickly is rebuilt
+                refactor = not np.isfinite(size) or size > previous/4
+                previous = size
+        raise RuntimeError(f'drift-diffusion solution did not converge at V = {V}')
+
+    def __step_to(self, V, max_step):
+        steps = max(1, int(np.ceil(abs(V - self.V)/max_step)))
+        for target in np.linspace(self.V, V, steps + 1)[1:]:
+            # carry the p side along with its contact as a starting guess
+            psi = self._u[0::3]
+            weight = (psi[-1] - psi)/(psi[-1] - psi[0])
+            shift = (target - self.V)/self.Vt*weight
+            self._u[0::3] += shift
+            self._u[1::3] += shift
+            self._u[2::3] += shift
+            self.__newton(target)
+
+    def current_density(self):
+        '''
+        total current density of the steady-state solution, J_n at the p contact plus J_p at the n contact plus the
+        recombination in between, which avoids the cancellation of the majority-carrier fluxes. units = A/cm^2
+        '''
+        _, Fn, Fp, R = self.__system(self._u, self.V, jacobian=False)
+        return self.J0*(Fn[0] + Fp[-1] + np.sum((self._volume*R)[1:-1]))
+
+    def solve(self, V, max_step=0.05):
+        '''
+        solves the steady state at bias V, stepping from the current bias in steps of at most max_step
+
+        returns the current density. units = A/cm^2
+
+        - V = bias voltage Vpn. units = V
+        - max_step = largest bias step between Newton solves. units = V
+        '''
+        self.__step_to(V, max_step)
+        return self.current_density()
+
+    def iv_curve(self, V, max_step=0.05):
+        '''
+        steady-state current density at each bias in V, each solve starting from the previous one. units = A/cm^2
+
+        - V = bias voltages Vpn. units = V
+        - max_step = largest bias step between Newton solves. units = V
+        '''
+        return np.array([self.solve(v, max_step) for v in np.atleast_1d(V)])
+
+    def transient(self, t, V):
+        '''
+        backward-Euler transient from the current steady state, with the bias V[k] applied at time t[k]
+
+        returns the total current density, including displacement current, at the p contact at each time. units = A/cm^2
+
+        - t = increasing times, starting at the time of the current solution. units = s
+        - V = bias voltage Vpn at each time. units = V
+        '''
+        t = np.asarray(t, dtype=np.float64)
+        V = np.broadcast_to(np.asarray(V, dtype=np.float64), t.shape)
+        J = np.empty(t.shape)
+        J[0] = self.current_density()
+        for k in range(1, len(t)):
+            dt = (t[k] - t[k - 1])/self.t0
+            old = self.__carriers(self._u)
+            field_old = -(self._u[3] - self._u[0])/self._h[0]
+            self.__newton(V[k], dt, old)
+            _, Fn, Fp, _ = self.__system(self._u, V[k], jacobian=False)
+            field = -(self._u[3] - self._u[0])/self._h[0]
+            # ε dE/dt in the scaled units is (E - E_old)/dt
+            J[k] = self.J0*(Fn[0] + Fp[0] + (field - field_old)/dt)
+        self._lu = None
+        return J
+
+    @property
+    def psi(self):
+        '''electrostatic potential. units = V'''
+        return self._u[0::3]*self.Vt
+
+    @property
+    def n(self):
+        '''electron concentration. units = cm^-3'''
+        return self.__carriers(self._u)[0]*self.C0
+
+    @property
+    def p(self):
+        '''hole concentration. units = cm^-3'''
+        return self.__carriers(self._u)[1]*self.C0
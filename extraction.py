@@ -0,0 +1,333 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+import numpy as np
+from solvers import carriers_np as eqs_np
+from solvers.constants import q, eps_si, eps_ox
+from solvers.materials import SiliconMaterial, silicon
+from solvers.moscap import V_contact, exact_space_charge
+
+PARAMETERS = ('Na', 'Nd', 'area', 'tau_n', 'tau_p')
+'''fitted diode parameters, in the order of the last axis of model Jacobians'''
+
+def diode_model(V, Na, Nd, area, tau_n, tau_p, T=300, material: SiliconMaterial = silicon, curve='iv', jacobian=False):
+    '''
+    current or small-signal capacitance of a long-base abrupt pn diode, the model of Diode.iv_curve and
+    Diode.cv_curve with the lifetimes as free parameters, broadcast over bias points and parameter sets
+
+    returns I (or C), and with jacobian set also d ln|I|/d ln(parameter) (or d ln C/d ln(parameter)) with the
+    parameters along a new last axis in the order of PARAMETERS
+
+    - V = bias voltages Vpn. units = V
+    - Na = p-side acceptor concentration. units = cm^-3
+    - Nd = n-side donor concentration. units = cm^-3
+    - area = junction area. units = cm^2
+    - tau_n = electron recombination lifetime on the p side. units = s
+    - tau_p = hole recombination lifetime on the n side. units = s
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - curve = 'iv' for the current, 'cv' for the capacitance
+    '''
+    V, Na, Nd, area, tau_n, tau_p = (np.asarray(x, dtype=np.float64) for x in (V, Na, Nd, area, tau_n, tau_p))
+    Vt = material.KbToq(T)
+    ni = material.ni(T)
+    mu_n = eqs_np.mu_n_min(Na)
+    mu_p = eqs_np.mu_p_min(Nd)
+    # share of each side in 1/Na + 1/Nd, and the junction potential vbi - V
+    inverse = 1/Na + 1/Nd
+    share_p, share_n = 1/(Na*inverse), 1/(Nd*inverse)
+    drop = Vt*np.log(Na*Nd/ni**2) - V
+
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        # the p-side and n-side diffusion terms, ni^2 L/(N τ) = ni^2 sqrt(D/τ)/N
+        X_n = np.sqrt(Vt*mu_n/tau_n)/Na
+        X_p = np.sqrt(Vt*mu_p/tau_p)/Nd
+        if curve == 'iv':
+            w_depl = np.sqrt(2*eps_si/q * inverse * drop)
+            diffusion = q*ni**2*(X_n + X_p) * np.expm1(V/Vt)
+            generation = q*ni*w_depl/(tau_n + tau_p) * np.expm1(V/(2*Vt))
+            model = area*(diffusion + generation)
+            if not jacobian:
+                return model
+            slope_n = eqs_np.mu_n_min_log_slope(Na)/mu_n
+            slope_p = eqs_np.mu_p_min_log_slope(Nd)/mu_p
+            d_ln_w = (Vt/drop - share_p)/2, (Vt/drop - share_n)/2
+            tau_share = tau_n/(tau_n + tau_p)
+            J = diffusion + generation
+            # d ln I/dθ is the generation and diffusion sensitivities weighted by their share of the current
+            derivatives = (
+                (q*ni**2*X_n*(slope_n/2 - 1)*np.expm1(V/Vt) + generation*d_ln_w[0])/J,
+                (q*ni**2*X_p*(slope_p/2 - 1)*np.expm1(V/Vt) + generation*d_ln_w[1])/J,
+                np.ones_like(J),
+                (-q*ni**2*X_n/2*np.expm1(V/Vt) - generation*tau_share)/J,
+                (-q*ni**2*X_p/2*np.expm1(V/Vt) - generation*(1 - tau_share))/J,
+            )
+        elif curve == 'cv':
+            L_over_N = np.sqrt(Vt*mu_n*tau_n)/Na, np.sqrt(Vt*mu_p*tau_p)/Nd
+            depletion = np.sqrt(q*eps_si/2 / inverse / drop)
+            diffusion = q*ni**2/Vt*(L_over_N[0] + L_over_N[1])*np.exp(V/Vt)
+            model = area*(depletion + diffusion)
+            if not jacobian:
+                return model
+            slope_n = eqs_np.mu_n_min_log_slope(Na)/mu_n
+            slope_p = eqs_np.mu_p_min_log_slope(Nd)/mu_p
+            C = depletion + diffusion
+            scale = q*ni**2/Vt*np.exp(V/Vt)
+            derivatives = (
+                (depletion*(share_p - Vt/drop)/2 + scale*L_over_N[0]*(slope_n/2 - 1))/C,
+                (depletion*(share_n - Vt/drop)/2 + scale*L_over_N[1]*(slope_p/2 - 1))/C,
+                np.ones_like(C),
+                scale*L_over_N[0]/2/C,
+                scale*L_over_N[1]/2/C,
+            )
+        else:
+            raise ValueError(f"curve must be 'iv' or 'cv', not {curve!r}")
+    return model, np.stack(np.broadcast_arrays(*derivatives), axis=-1)
+
+def _residuals(theta, V_iv, I, V_cv, C, T, material):
+    '''log-ratio residuals of every curve point for each row of log parameters, and their Jacobian'''
+    params = [np.exp(theta[:, k:k + 1]) for k in range(len(PARAMETERS))]
+    residuals, jacobians = [], []
+    for V, data, curve in ((V_iv, I, 'iv'), (V_cv, C, 'cv')):
+        if V is None:
+            continue
+        model, jacobian = diode_model(V, *params, T=T, material=material, curve=curve, jacobian=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = np.log(np.abs(model)/np.abs(data))
+        # points the model cannot reach (past the built-in voltage, or of the wrong sign) are left out
+        valid = np.isfinite(r) & np.all(np.isfinite(jacobian), axis=-1) & (np.sign(model) == np.sign(data))
+        residuals.append(np.where(valid, r, 0))
+        jacobians.append(np.where(valid[..., None], jacobian, 0))
+    return np.concatenate(residuals, axis=1), np.concatenate(jacobians, axis=1)
+
+def fit_diode(V_iv=None, I=None, V_cv=None, C=None, guess=None, fixed=None, candidates=32, T=300,
+              material: SiliconMaterial = silicon, iterations=60, seed=0):
+    '''
+    fits Na, Nd, area and the lifetimes of a diode to a measured IV curve, CV curve, or both
+
+    Levenberg-Marquardt on the log parameters, minimizing the squared log ratios of model to data. All
+    candidate starting points are iterated together, each step evaluating the model over every bias point
+    and candidate at once; the best candidate is returned.
+
+    returns a dict of the fitted PARAMETERS and 'cost', the mean squared log ratio
+
+    - V_iv, I = bias voltages and measured currents; points with I = 0 are ignored. units = V, A
+    - V_cv, C = bias voltages and measured capacitances. units = V, F
+    - guess = dict of starting values; missing ones default to 1e16 cm^-3, 1e-4 cm^2, and the lifetime models
+    - fixed = dict of parameters held at the given values
+    - candidates = number of starting points, the guess and random log-normal spreads around it
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - iterations = Levenberg-Marquardt iterations
+    - seed = random seed of the starting points
+    '''
+    if V_iv is None and V_cv is None:
+        raise ValueError('an IV or a CV curve is required')
+    if V_iv is not None:
+        V_iv, I = np.asarray(V_iv, dtype=np.float64), np.asarray(I, dtype=np.float64)
+        V_iv, I = V_iv[I != 0], I[I != 0]
+    if V_cv is not None:
+        V_cv, C = np.asarray(V_cv, dtype=np.float64), np.asarray(C, dtype=np.float64)
+    fixed = fixed or {}
+    start = {'Na': 1e16, 'Nd': 1e16, 'area': 1e-4}
+    start.update(guess or {})
+    start.update(fixed)
+    start.setdefault('tau_n', float(eqs_np.rec_life_p(start['Na'])))
+    start.setdefault('tau_p', float(eqs_np.rec_life_n(start['Nd'])))
+    free = np.array([name not in fixed for name in PARAMETERS])
+
+    # spreads of the random starts in ln units: two decades for the doping, one for the rest
+    spread = np.array([4.6, 4.6, 2.3, 2.3, 2.3])*free
+    rng = np.random.default_rng(seed)
+    theta = np.log([start[name] for name in PARAMETERS]) + rng.normal(size=(candidates, len(PARAMETERS)))*spread
+    theta[0] = np.log([start[name] for name in PARAMETERS])
+    damping = np.full(candidates, 1e-3)
+
+    r, J = _residuals(theta, V_iv, I, V_cv, C, T, material)
+    cost = np.sum(r**2, axis=1)
+    eye = np.diag(free.astype(np.float64))
+    for _ in range(iterations):
+        J = J*free
+        A = np.einsum('kmi,kmj->kij', J, J)
+        g = np.einsum('kmi,km->ki', J, r)
+        # scaled damping on the free parameters, identity on the fixed ones so the systems stay regular
+        diagonal = np.einsum('kii->ki', A)
+        system = A + damping[:, None, None]*diagonal[:, :, None]*eye + np.diag(~free)[None]
+        step = -np.linalg.solve(system, g[..., None])[..., 0]
+        step = np.clip(np.nan_to_num(step), -2.3, 2.3)
+        trial = theta + step
+        r_trial, J_trial = _residuals(trial, V_iv, I, V_cv, C, T, material)
+        cost_trial = np.sum(r_trial**2, axis=1)
+        better = cost_trial < cost
+        theta = np.where(better[:, None], trial, theta)
+        r = np.where(better[:, None], r_trial, r)
+        J = np.where(better[:, None, None], J_trial, J)
+        cost = np.where(better, cost_trial, cost)
+        damping = np.clip(np.where(better, damping/3, damping*4), 1e-9, 1e9)
+
+    best = np.argmin(cost)
+    fit = dict(zip(PARAMETERS, np.exp(theta[best])))
+    fit['cost'] = cost[best]/r.shape[1]
+    return fit
+
+def _fit_curve(curve, options):
+    return fit_diode(**curve, **options)
+
+def fit_diodes(curves, processes=None, **options):
+    '''
+    fits many independent curves, spread across a pool of processes
+
+    returns a list of fit_diode results, in the order of curves
+
+    - curves = sequence of dicts of fit_diode curve arguments (V_iv, I, V_cv, C, and optionally guess and fixed)
+    - processes = number of worker processes; the number of CPUs when omitted, in this process when 1
+    - options = further fit_diode keyword arguments shared by every curve
+    '''
+    work = partial(_fit_curve, options=options)
+    if processes == 1:
+        return [work(curve) for curve in curves]
+    curves = list(curves)
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(work, curves, chunksize=max(1, len(curves)//(4*processes))))
+
+MOSCAP_PARAMETERS = ('Xox', 'Nab', 'Qf')
+'''fitted MOSCAP parameters, in the order of the last axis of the model Jacobian'''
+
+def moscap_model(V, Xox, Nab, Qf, area=1, T=300, material: SiliconMaterial = silicon):
+    '''
+    high-frequency gate capacitance of an AluminumMoscap with the exact surface potential, broadcast over bias
+    points and parameter sets
+
+    - V = gate-to-bulk biases. units = V
+    - Xox = gate-oxide thickness. units = cm
+    - Nab = substrate acceptor concentration. units = cm^-3
+    - Qf = fixed-oxide charge density. units = C/cm^2
+    - area = gate area; 1 for the capacitance per unit area. units = cm^2
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    '''
+    Xox, Nab, Qf = (np.asarray(x, dtype=np.float64) for x in (Xox, Nab, Qf))
+    Cox = eps_ox/Xox
+    VFB = V_contact(Nab, T, material) - Qf/Cox
+    Cscb = exact_space_charge(V, VFB, Cox, Nab, T, material)['Cscb_HF']
+    return area*Cox*Cscb/(Cox + Cscb)
+
+# the fit runs on ln Xox, ln Nab and Qf in units of q 1e11 cm^-2, with these finite-difference steps
+_QF_UNIT = q*1e11
+_MOSCAP_STEPS = np.array([1e-6, 1e-6, 1e-4])
+
+def _moscap_guess(V, C, T, material):
+    '''Xox from the accumulation capacitance, Nab from the inversion minimum and Qf from the flat-band point'''
+    order = np.argsort(V)
+    V, C = V[order], C[order]
+    Cox = C.max()
+    # the depletion width at the minimum sets Nab through w = sqrt(4 eps_si phi_fb/(q Nab))
+    w = eps_si*(1/C.min() - 1/Cox)
+    Nab = 1e16
+    for _ in range(8):
+        Nab = 4*eps_si*material.KbToq(T)*np.log(Nab/material.ni(T))/(q*w**2)
+    debye = np.sqrt(eps_si*material.KbToq(T)/(q*Nab))
+    C_FB = 1/(1/Cox + debye/eps_si)
+    # the high-frequency curve falls with VGB from accumulation to inversion
+    VFB = np.interp(-C_FB, -np.minimum.accumulate(C), V)
+    return {'Xox': eps_ox/Cox, 'Nab': Nab, 'Qf': (float(V_contact(np.float64(Nab), T, material)) - VFB)*Cox}
+
+def fit_moscap(V, C, area=None, guess=None, fixed=None, candidates=8, T=300, material: SiliconMaterial = silicon,
+               iterations=40, seed=0):
+    '''
+    fits Xox, Nab and Qf of an AluminumMoscap to a measured high-frequency C-V curve
+
+    Levenberg-Marquardt minimizing the squared log ratios of model to data, on ln Xox, ln Nab and Qf. All
+    candidate starting points are iterated together, every model evaluation covering all bias points and
+    candidates at once. The finite-difference Jacobian is cached and rebuilt only for candidates whose step
+    was accepted; rejected steps retry with more damping on the cached one.
+
+    returns a dict of the fitted MOSCAP_PARAMETERS and 'cost', the mean squared log ratio
+
+    - V, C = gate-to-bulk biases and measured capacitances. units = V, F
+    - area = gate area; C is per unit area when omitted. units = cm^2
+    - guess = dict of starting values; missing ones are estimated from the accumulation, minimum and flat-band
+      capacitances of the curve
+    - fixed = dict of parameters held at the given values
+    - candidates = number of starting points, the guess and random spreads around it
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - iterations = Levenberg-Marquardt iterations
+    - seed = random seed of the starting points
+    '''
+    V, C = np.asarray(V, dtype=np.float64), np.asarray(C, dtype=np.float64)
+    area = 1 if area is None else area
+    fixed = fixed or {}
+    start = _moscap_guess(V, C/area, T, material)
+    start.update(guess or {})
+    start.update(fixed)
+    free = np.array([name not in fixed for name in MOSCAP_PARAMETERS])
+    log_data = np.log(C)
+
+    def residuals(theta):
+        '''log ratios of model to data for each row of fit parameters'''
+        Xox, Nab, Qf = np.exp(theta[:, :1]), np.exp(theta[:, 1:2]), theta[:, 2:]*_QF_UNIT
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = np.log(moscap_model(V, Xox, Nab, Qf, area, T, material)) - log_data
+        return np.where(np.isfinite(r), r, 1e3)
+
+    def jacobian(theta, r):
+        '''forward differences in every free parameter, for all rows in one model evaluation'''
+        shifted = np.repeat(theta[:, None, :], len(MOSCAP_PARAMETERS), axis=1) + np.diag(_MOSCAP_STEPS)
+        r_shifted = residuals(shifted.reshape(-1, len(MOSCAP_PARAMETERS))).reshape(len(theta), len(MOSCAP_PARAMETERS), -1)
+        return np.swapaxes((r_shifted - r[:, None, :])/_MOSCAP_STEPS[:, None], 1, 2)*free
+
+    # spreads of the random starts: 10 % in Xox, half a decade in Nab, 2e11 cm^-2 in Qf
+    spread = np.array([0.1, 1.15, 2.0])*free
+    rng = np.random.default_rng(seed)
+    theta = np.array([np.log(start['Xox']), np.log(start['Nab']), start['Qf']/_QF_UNIT])
+    theta = theta + rng.normal(size=(candidates, len(MOSCAP_PARAMETERS)))*spread
+    theta[0] = np.log(start['Xox']), np.log(start['Nab']), start['Qf']/_QF_UNIT
+    damping = np.full(candidates, 1e-3)
+
+    r = residuals(theta)
+    J = jacobian(theta, r)
+    cost = np.sum(r**2, axis=1)
+    eye = np.diag(free.astype(np.float64))
+    for _ in range(iterations):
+        A = np.einsum('kmi,kmj->kij', J, J)
+        g = np.einsum('kmi,km->ki', J, r)
+        diagonal = np.einsum('kii->ki', A)
+        system = A + damping[:, None, None]*diagonal[:, :, None]*eye + np.diag(~free)[None]
+        step = -np.linalg.solve(system, g[..., None])[..., 0]
+        step = np.clip(np.nan_to_num(step), -2.3, 2.3)
+        trial = theta + step
+        r_trial = residuals(trial)
+        cost_trial = np.sum(r_trial**2, axis=1)
+        better = cost_trial < cost
+        if better.any():
+            theta[better], r[better], cost[better] = trial[better], r_trial[better], cost_trial[better]
+            J[better] = jacobian(theta[better], r[better])
+        damping = np.clip(np.where(better, damping/3, damping*4), 1e-9, 1e9)
+
+    best = np.argmin(cost)
+    Xox, Nab, Qf = theta[best]
+    return {'Xox': np.exp(Xox), 'Nab': np.exp(Nab), 'Qf': Qf*_QF_UNIT, 'cost': cost[best]/len(V)}
+
+def _fit_moscap_curve(curve, options):
+    return fit_moscap(**curve, **options)
+
+def fit_moscaps(curves, processes=None, **options):
+    '''
+    fits the C-V curves of many capacitors, across a wafer for instance, spread across a pool of processes
+
+    yields the fit_moscap results in the order of curves, each as soon as it and those before it are done
+
+    - curves = iterable of dicts of fit_moscap curve arguments (V, C, and optionally area, guess and fixed)
+    - processes = number of worker processes; the number of CPUs when omitted, in this process when 1
+    - options = further fit_moscap keyword arguments shared by every curve
+    '''
+    work = partial(_fit_moscap_curve, options=options)
+    if processes == 1:
+        yield from map(work, curves)
+        return
+    curves = list(curves)
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(processes) as pool:
+        yield from pool.map(work, curves, chunksize=max(1, len(curves)//(4*processes)))
@@ -0,0 +1,99 @@
+import numpy as np
+from solvers import constants as cs
+from solvers.materials import SiliconMaterial, silicon
+from solvers.quantum import fermi_dirac_half, fermi_dirac_minus_half
+
+def _fermi_half(eta):
+    return fermi_dirac_half(eta), fermi_dirac_minus_half(eta)
+
+def _boltzmann(eta):
+    F = np.exp(eta)
+    return F, F
+
+def _ionized(N, g, x):
+    '''N/(1 + g exp(x)), the ionized part of a dopant concentration, and its derivative with respect to x'''
+    occupied = g*np.exp(x)
+    ionized = N/(1 + occupied)
+    return ionized, -ionized*occupied/(1 + occupied)
+
+def _freeze_out(N, N_minority, N_majority, A):
+    '''
+    solves (N x + N_minority)(1 + A x) = N_majority for x, the Boltzmann factor of the majority carriers
+    when the majority dopants are partially ionized and the minority carriers are neglected
+    '''
+    a = N*A
+    b = N + N_minority*A
+    c = N_minority - N_majority
+    return -2*c/(b + np.sqrt(b**2 - 4*a*c))
+
+def charge_neutrality(Na, Nd, T=300, material: SiliconMaterial = silicon,
+                      incomplete_ionization=True, fermi_dirac=True, iterations=8):
+    '''
+    solves p + Nd+ = n + Na- for the Fermi level of uniformly doped silicon, elementwise over arrays
+
+    Starts from the full-ionization Boltzmann solution and takes a fixed number of bracketed Newton
+    steps on the net charge, so every element converges in the same number of passes.
+
+    returns (EF, n, p), with EF measured from the valence band edge
+
+    - Na = acceptor concentration. units = cm^-3
+    - Nd = donor concentration. units = cm^-3
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - incomplete_ionization = use dopant occupancy statistics instead of Nd+ = Nd and Na- = Na
+    - fermi_dirac = use Fermi-Dirac instead of Boltzmann statistics for n and p
+    - iterations = number of Newton steps
+    '''
+    Na, Nd, T = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (Na, Nd, T)))
+    kT = np.asarray(material.KbToq(T))
+    Ec = np.asarray(material.Eg(T))
+    Nc, Nv = material.Nc(T), material.Nv(T)
+    ni = material.ni(T)
+    F = _fermi_half if fermi_dirac else _boltzmann
+    Ed = Ec - cs.donor_ionization_energy_si
+    Ea = cs.acceptor_ionization_energy_si
+    # the residual is compared on an asinh scale: linear near the root, logarithmic far from it
+    scale = 2*(ni + np.abs(Nd - Na)/2)
+
+    def carriers(EF):
+        n, dn = F((EF - Ec)/kT)
+        p, dp = F(-EF/kT)
+        return Nc*n, Nc*dn/kT, Nv*p, -Nv*dp/kT
+
+    def residual(EF):
+        n, dn, p, dp = carriers(EF)
+        if incomplete_ionization:
+            Ndp, dNdp = _ionized(Nd, cs.donor_degeneracy_si, (EF - Ed)/kT)
+            Nam, dNam = _ionized(Na, cs.acceptor_degeneracy_si, (Ea - EF)/kT)
+            dNdp, dNam = dNdp/kT, -dNam/kT
+        else:
+            Ndp, dNdp, Nam, dNam = Nd, 0, Na, 0
+        charge = (p + Ndp - n - Nam)/scale
+        slope = (dp + dNdp - dn - dNam)/scale
+        return np.arcsinh(charge), slope/np.sqrt(1 + charge**2)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # the residual falls monotonically in EF and changes sign inside this bracket
+        low = np.full(Ec.shape, -1.0)
+        high = Ec + 1.0
+        Ei = Ec/2 + kT/2*np.log(Nv/Nc)
+        EF = np.clip(Ei + kT*np.arcsinh((Nd - Na)/(2*ni)), low, high)
+        if incomplete_ionization:
+            # in freeze-out the full-ionization start is far off; start from whichever guess is closer
+            Ad = cs.donor_degeneracy_si*np.exp(cs.donor_ionization_energy_si/kT)
+            Aa = cs.acceptor_degeneracy_si*np.exp(cs.acceptor_ionization_energy_si/kT)
+            frozen = np.where(Nd > Na, Ec + kT*np.log(_freeze_out(Nc, Na, Nd, Ad)),
+                              -kT*np.log(_freeze_out(Nv, Nd, Na, Aa)))
+            frozen = np.clip(np.nan_to_num(frozen, nan=-1.0), low, high)
+            EF = np.where(np.abs(residual(frozen)[0]) < np.abs(residual(EF)[0]), frozen, EF)
+
+        for _ in range(iterations):
+            g, slope = residual(EF)
+            low = np.where(g > 0, EF, low)
+            high = np.where(g > 0, high, EF)
+            step = EF - g/slope
+            inside = (step >= low) & (step <= high)
+            EF = np.where(inside, step, (low + high)/2)
+
+        n, _, p, _ = carriers(EF)
+    return EF[()], n[()], p[()]
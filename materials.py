@@ -0,0 +1,103 @@
+import numpy as np
+from solvers import constants as cs
+
+class SiliconMaterial:
+    '''
+    Temperature-dependent silicon parameters.
+
+    Every quantity is anchored to its 300K value in constants.py and scaled by its temperature
+    dependence, so T = 300 reproduces the constants exactly. Methods take a scalar temperature or an
+    array of temperatures (K); scalar lookups are memoized and returned as Python floats.
+    '''
+    def __init__(self, Eg_300K=cs.Eg_si, alpha=cs.varshni_alpha_si, beta=cs.varshni_beta_si,
+                 ni_300K=cs.ni, Nc_300K=cs.Nc, Nv_300K=cs.Nv,
+                 vsat_n_300K=cs.electron_sat_vel_300K, vsat_p_300K=cs.hole_sat_vel_300K):
+        self.Eg_300K = Eg_300K
+        '''band gap at 300K. units = eV'''
+        self.alpha = alpha
+        '''Varshni α. units = eV/K'''
+        self.beta = beta
+        '''Varshni β. units = K'''
+        self.ni_300K = ni_300K
+        '''intrinsic carrier concentration at 300K. units = cm^-3'''
+        self.Nc_300K = Nc_300K
+        '''conduction-band effective density of states at 300K. units = cm^-3'''
+        self.Nv_300K = Nv_300K
+        '''valence-band effective density of states at 300K. units = cm^-3'''
+        self.vsat_n_300K = vsat_n_300K
+        '''electron saturation velocity at 300K. units = cm/s'''
+        self.vsat_p_300K = vsat_p_300K
+        '''hole saturation velocity at 300K. units = cm/s'''
+        self._cache = {}
+
+    def _lookup(self, name, T, calc):
+        if np.ndim(T) != 0:
+            return calc(np.asarray(T, dtype=np.float64))
+        key = (name, float(T))
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = float(calc(float(T)))
+        return value
+
+    def KbToq(self, T=300):
+        '''kT/q, the thermal voltage. units = V'''
+        return self._lookup('KbToq', T, lambda T: cs.KbToq * (T/300))
+
+    def KbT(self, T=300):
+        '''kT. units = J'''
+        return self._lookup('KbT', T, lambda T: cs.KbT * (T/300))
+
+    def Eg(self, T=300):
+        '''band gap from the Varshni model, Eg(T) = Eg(0) - αT^2/(T + β). units = eV'''
+        def calc(T):
+            return self.Eg_300K - self.alpha * (T**2/(T + self.beta) - 300**2/(300 + self.beta))
+        return self._lookup('Eg', T, calc)
+
+    @staticmethod
+    def _mass_ratio(T, m_300K, m_400K):
+        # density-of-states effective mass interpolated linearly between its 300K and 400K values
+        return (m_300K + (m_400K - m_300K) * (T - 300)/100) / m_300K
+
+    def Nc(self, T=300):
+        '''conduction-band effective density of states, ∝ (m_ndos T)^(3/2). units = cm^-3'''
+        def calc(T):
+            return self.Nc_300K * (T/300 * self._mass_ratio(T, cs.m_ndos_300K, cs.m_ndos_400K))**1.5
+        return self._lookup('Nc', T, calc)
+
+    def Nv(self, T=300):
+        '''valence-band effective density of states, ∝ (m_pdos T)^(3/2). units = cm^-3'''
+        def calc(T):
+            return self.Nv_300K * (T/300 * self._mass_ratio(T, cs.m_pdos_300K, cs.m_pdos_400K))**1.5
+        return self._lookup('Nv', T, calc)
+
+    def ni(self, T=300):
+        '''intrinsic carrier concentration, sqrt(Nc Nv) exp(-Eg/2kT). units = cm^-3'''
+        def calc(T):
+            dos = np.sqrt((self.Nc(T)/self.Nc_300K) * (self.Nv(T)/self.Nv_300K))
+            boltzmann = np.exp(self.Eg_300K/(2*cs.KbToq) - self.Eg(T)/(2*cs.KbToq*(T/300)))
+            return self.ni_300K * dos * boltzmann
+        return self._lookup('ni', T, calc)
+
+    def vsat_n(self, T=300):
+        '''electron saturation velocity, ∝ 1/(1 + 0.8 exp(T/600)). units = cm/s'''
+        return self._lookup('vsat_n', T, lambda T: self.vsat_n_300K * (1 + 0.8*np.exp(0.5))/(1 + 0.8*np.exp(T/600)))
+
+    def vsat_p(self, T=300):
+        '''hole saturation velocity, ∝ T^-0.52. units = cm/s'''
+        return self._lookup('vsat_p', T, lambda T: self.vsat_p_300K * (T/300)**-0.52)
+
+    def beta_n(self, T=300):
+        '''Caughey-Thomas exponent of the electron field-dependent mobility, ∝ T^0.66'''
+        return self._lookup('beta_n', T, lambda T: cs.caughey_thomas_beta_n * (T/300)**0.66)
+
+    def beta_p(self, T=300):
+        '''Caughey-Thomas exponent of the hole field-dependent mobility, ∝ T^0.17'''
+        return self._lookup('beta_p', T, lambda T: cs.caughey_thomas_beta_p * (T/300)**0.17)
+
+    def ionization_gamma(self, T=300):
+        '''impact-ionization temperature factor γ = tanh(ħω/2kT0)/tanh(ħω/2kT); both a and b of α = a exp(-b/E) scale with it'''
+        phonon = cs.optical_phonon_energy_si/2
+        return self._lookup('ionization_gamma', T, lambda T: np.tanh(phonon/cs.KbToq)/np.tanh(phonon/(cs.KbToq*T/300)))
+
+silicon = SiliconMaterial()
+'''default silicon parameters, matching constants.py at 300K'''
@@ -1,11 +1,14 @@
 from solvers.mosfet import Mosfet
+from solvers.dependencies import Calculated, calculates
 
-class MosAmp:
+class MosAmp(Calculated):
     
-    def __init__(self):
+    def __init__(self, numeric: bool = False):
         self._docalc = False
         
-        self.mf = Mosfet()
+        self.numeric = numeric
+        '''numeric-only mode, passed on to the MOSFET'''
+        self.mf = Mosfet(numeric)
         self.R1 = 1
         self.R2 = 1
         self.RL = 1
@@ -37,37 +40,23 @@ class MosAmp:
         
         self._docalc = True
     
-    def lock(self, name):
-        self.value_lock.append(name)
-        
-    def set_lock(self, name, value):
-        self.__setattr__(name, value)
-        self.lock(name)
-        
-    def unlock(self, name):
-        if name in self.value_lock:
-            self.value_lock.remove(name)
-    
-    def __setattr__(self, __name: str, __value) -> None:
-        if 'value_lock' in self.__dict__ and __name in self.value_lock:
-            return
-        super().__setattr__(__name, __value)
-        self.__dict__[__name] = __value
-        if self._docalc and __name != '_docalc':
-            self._docalc = False
-            self.__calculations()
-            self._docalc = True
-    
-    def __calculations(self):
+    @calculates('Vgg', 'Rin', depends_on=('Vdd', 'R1', 'R2'))
+    def __calc_bias(self):
         self.Vgg = self.Vdd * self.R1 / (self.R1 + self.R2)
         Rg = self.R1 * self.R2 / (self.R1 + self.R2)
         
         self.Rin = Rg
+    
+    @calculates('Av', 'Ai', depends_on=('mf.gm', 'mf.rds_sat', 'R1', 'R2', 'RD', 'RL', 'Rsig'))
+    def __calc_gain(self):
+        Rg = self.R1 * self.R2 / (self.R1 + self.R2)
         
         Rp = 1/(1/self.mf.rds_sat + 1/self.RD + 1/self.RL)
         
         self.Av = -self.mf.gm * Rp * (Rg) / (self.Rsig * Rg)
         
         self.Ai = self.Av * (self.Rsig + Rg) / (self.RL)
-        
+    
+    @calculates('Rout', depends_on=('mf.rds_sat', 'RD'))
+    def __calc_output_resistance(self):
         self.Rout = 1/(1/self.mf.rds_sat + 1/self.RD)
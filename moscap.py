@@ -1,6 +1,13 @@
-from sympy import symbols, solve, ln, sqrt, exp
-from solvers.constants import KbToq, ni, eps_si, q, KbT, eps_ox
+from sympy import symbols, solve, oo
+import numpy as np
+from scipy.special import expit
+from solvers.numeric import ln, sqrt, exp, is_number, placeholders
+from solvers.constants import eps_si, q, eps_ox, phi_m_chi_al_si
 from solvers.silicon import Silicon
+from solvers.materials import silicon
+from solvers.dependencies import calculates
+from solvers.poisson import MoscapPoisson, MoscapPoissonSolution
+from solvers.recovery import rosenbrock
 
 def Vgb(Vox=symbols("Vox"), Vscb=symbols("Vscb"), phi_pm=symbols("phi_pm")):
     '''calculates the gate-to-bulk bias voltage'''
@@ -17,41 +24,277 @@ def gate_charge_density(eox=symbols("ϵ_ox"), Exox=symbols("E_xox")):
     '''calculates Q_G = gate charge density'''
     return eox * Exox
 
-def V_contact(Na_ionized):
-    '''calculates phi_pm = the contact potential difference between the neutral bulk region and the aluminum back-side contact'''
-    return -0.51165 - KbToq * ln(Na_ionized / ni)
+def V_contact(Na_ionized, T=300, material=silicon):
+    '''
+    calculates phi_pm = the contact potential difference between the neutral bulk region and the aluminum back-side contact,
+    φ_m - χ_si - Eg(T)/2 - phi_fb with the intrinsic level at midgap
+    '''
+    return phi_m_chi_al_si - material.Eg(T)/2 - material.KbToq(T) * ln(Na_ionized / material.ni(T))
 
-def fermi_potential(Na_ionized):
+def fermi_potential(Na_ionized, T=300, material=silicon):
     '''calculates phi_fb = the fermi potential in the substrate region'''
-    return KbToq * ln(Na_ionized / ni)
+    return material.KbToq(T) * ln(Na_ionized / material.ni(T))
+
+def threshold_voltage(VFB, phi_fb, Cox, Nab):
+    '''calculates V_TN = the threshold voltage of the MOS capacitor, at the onset of strong inversion'''
+    return VFB + 2*phi_fb + sqrt(4*q*eps_si*Nab*phi_fb)/Cox
 
 def width_at_Vtn(Nab, Vscb):
     frac = 2*eps_si/(q * Nab)
     return sqrt(frac * Vscb)
 
-def substrate_debeye_length(Nab):
+def substrate_debeye_length(Nab, T=300, material=silicon):
     '''calculates the substrate debeye length'''
-    return sqrt(eps_si * KbT / (q**2 * Nab))
+    return sqrt(eps_si * material.KbT(T) / (q**2 * Nab))
 
-def calc_space_charge_density(Vscb, Ldb, nb, pb):
+def calc_space_charge_density(Vscb, Ldb, nb, pb, T=300, material=silicon):
     '''calculates Q_SC,B = the space-charge density in the p-type silicon substrate at the onset of strong inversion'''
-    beta = q/KbT
-    p1 = sqrt(2)*eps_si * KbToq / Ldb
+    beta = q/material.KbT(T)
+    p1 = 2**0.5 * eps_si * material.KbToq(T) / Ldb
     inner_1 = exp(-beta * Vscb) + beta*Vscb - 1
     inner_2 =  exp(beta * Vscb) - beta*Vscb - 1
     return -p1 * sqrt(inner_1 + (nb/pb) * inner_2)
 
+def interface_trap_charge(Vscb, trap_energies, Dit, Nab, T=300, material=silicon):
+    '''
+    charge and capacitance of interface traps distributed in energy, at surface potentials Vscb
+
+    Traps below midgap are donor-like (positive when empty) and traps above it acceptor-like (negative when
+    filled), so the traps are neutral with the Fermi level at midgap. The occupancy of each trap follows the
+    Fermi level at the surface, phi_fb - Vscb below midgap. Broadcasts Vscb against the energy grid on a new
+    last axis and integrates over it by the trapezoidal rule.
+
+    returns Qit, the trap charge, and Cit = -dQit/dVscb, per unit area. units = C/cm^2, F/cm^2
+
+    - Vscb = surface potentials. units = V
+    - trap_energies = increasing grid of trap energies, relative to midgap. units = eV
+    - Dit = interface-trap density at trap_energies. units = cm^-2 eV^-1
+    - Nab = substrate acceptor concentration. units = cm^-3
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    '''
+    E = np.asarray(trap_energies, dtype=np.float64)
+    Dit = np.broadcast_to(np.asarray(Dit, dtype=np.float64), E.shape)
+    Vt = material.KbToq(T)
+    phi_fb = Vt*np.log(Nab/material.ni(T))
+    # trapezoidal weights of the energy grid, times q and the density
+    h = np.diff(E)
+    weight = q*Dit*(np.append(h, 0) + np.insert(h, 0, 0))/2
+    filled = expit((np.asarray(Vscb, dtype=np.float64)[..., None] - phi_fb - E)/Vt)
+    Qit = np.where(E < 0, 1 - filled, -filled) @ weight
+    Cit = filled*(1 - filled) @ weight/Vt
+    return Qit, Cit
+
+def exact_space_charge(VGB, VFB, Cox, Nab, T=300, material=silicon, tol=1e-13, iterations=60, traps=None):
+    '''
+    solves VGB = VFB + Vscb - Qscb(Vscb)/Cox for the surface potential with the exact space-charge density of
+    calc_space_charge_density, by Newton steps safeguarded with bisection, elementwise over arrays of VGB
+
+    With traps the interface-trap charge of interface_trap_charge joins Qscb in the charge balance, which stretches
+    the curves out along VGB; VFB is then the flat-band voltage without it. VFB, Cox and Nab broadcast against
+    VGB, except that Nab must be a single value with traps.
+
+    returns a dict of arrays with 'Vscb', 'Qscb', 'QinvB', 'w_dep', the space-charge capacitances 'Cscb' (low
+    frequency) and 'Cscb_HF' (inversion charge frozen, depletion width held at its value at 2 phi_fb), and the
+    interface-trap charge 'Qit' and capacitance 'Cit' (0 without traps), per unit area
+
+    - VGB = gate-to-bulk bias voltages. units = V
+    - VFB = flat-band voltage. units = V
+    - Cox = gate-oxide capacitance. units = F/cm^2
+    - Nab = substrate acceptor concentration. units = cm^-3
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - tol = convergence tolerance on Vscb. units = V
+    - iterations = iteration limit
+    - traps = (trap_energies, Dit) of interface_trap_charge, or None
+    '''
+    VGB = np.asarray(VGB, dtype=np.float64)
+    Vt = material.KbToq(T)
+    ni = material.ni(T)
+    Nab = np.asarray(Nab, dtype=np.float64)
+    Ldb = substrate_debeye_length(Nab, T, material)
+    ratio = (ni/Nab)**2
+    scale = np.sqrt(2*q*eps_si*Nab*Vt)
+
+    def g(x):
+        '''exp(x) - x - 1 and its derivative, with the series near 0'''
+        small = np.abs(x) < 1e-4
+        return np.where(small, x*x/2 + x**3/6, np.expm1(x) - x), np.expm1(x)
+
+    def charge(psi):
+        '''Qscb and the capacitance -dQscb/dVscb'''
+        x = psi/Vt
+        Q = np.sign(psi)*calc_space_charge_density(psi, Ldb, ni**2/Nab, Nab, T, material)
+        g_minus, dg_minus = g(-x)
+        g_plus, dg_plus = g(x)
+        F = g_minus + ratio*g_plus
+        dF = -dg_minus + ratio*dg_plus
+        with np.errstate(invalid='ignore', divide='ignore'):
+            C = np.where(np.abs(x) < 1e-6, np.sqrt(q*eps_si*Nab*(1 + ratio)/Vt),
+                         np.sign(x)*scale*dF/(2*np.sqrt(F)*Vt))
+        return Q, C
+
+    def trapped(psi):
+        '''the interface-trap charge and capacitance'''
+        if traps is None:
+            return np.zeros_like(psi), np.zeros_like(psi)
+        return interface_trap_charge(psi, *traps, Nab, T, material)
+    
+    # the traps move the flat band by their charge there, and only stretch the curve around it, so the root
+    # lies between 0 and VGB minus the shifted flat band; beyond |Vscb| = 600 kT/q the exponentials would overflow
+    shifted = VFB - float(trapped(np.zeros(1))[0][0])/Cox
+    limit = 600*Vt
+    low = np.clip(np.minimum(VGB - shifted, 0), -limit, 0)
+    high = np.clip(np.maximum(VGB - shifted, 0), 0, limit)
+    # start from the depletion approximation up to 2 phi_fb, and beyond it from the asymptotic inversion and
+    # accumulation solutions, where the mobile charge grows like exp(|Vscb|/2Vt)
+    phi_fb = Vt*np.log(Nab/ni)
+    overdrive = np.maximum(VGB - shifted, 0)
+    body = q*eps_si*Nab
+    depletion = overdrive + body/Cox**2 * (1 - np.sqrt(1 + 2*Cox**2/body * overdrive))
+    threshold = shifted + 2*phi_fb + np.sqrt(2*body*2*phi_fb)/Cox
+    inversion = 2*phi_fb + 2*Vt*np.log1p(Cox*np.maximum(VGB - threshold, 0)/scale)
+    accumulation = -2*Vt*np.log1p(Cox*np.maximum(shifted - VGB, 0)/scale)
+    psi = np.where(VGB < shifted, accumulation, np.where(VGB > threshold, inversion, np.minimum(depletion, 2*phi_fb)))
+    psi = np.clip(psi, low, high)
+    with np.errstate(over='ignore', invalid='ignore'):
+        for _ in range(iterations):
+            Q, C = charge(psi)
+            Qit, Cit = trapped(psi)
+            f = VFB + psi - (Q + Qit)/Cox - VGB
+            low = np.where(f < 0, psi, low)
+            high = np.where(f < 0, high, psi)
+            step = np.where(f == 0, psi, psi - f/(1 + (C + Cit)/Cox))
+            inside = (step >= low) & (step <= high)
+            step = np.where(inside, step, (low + high)/2)
+            converged = np.all(np.abs(step - psi) < tol)
+            psi = step
+            if converged:
+                break
+        Q, C = charge(psi)
+        Qit, Cit = trapped(psi)
+
+        # the majority-carrier (depletion) part of the charge, for w_dep and the high-frequency capacitance
+        x = psi/Vt
+        g_minus, dg_minus = g(-x)
+        Q_dep = np.where(psi > 0, -scale*np.sqrt(g_minus), 0.0)
+        x_HF = np.clip(x, 1e-6, 2*phi_fb/Vt)
+        g_minus, dg_minus = g(-x_HF)
+        C_HF = scale*(-dg_minus)/(2*np.sqrt(g_minus)*Vt)
+    return {'Vscb': psi, 'Qscb': Q, 'QinvB': np.where(psi > 0, Q - Q_dep, 0.0), 'w_dep': -Q_dep/(q*Nab),
+            'Cscb': C, 'Cscb_HF': np.where(psi > 0, C_HF, C), 'Qit': Qit, 'Cit': Cit}
+
+def deep_depletion_transient(VGB, VFB, Cox, Nab, tau_g, s_g=0, T=300, material=silicon, t_end=None, samples=2001,
+                             rtol=1e-6, atol=1e-10):
+    '''
+    high-frequency C-t response of a MOSCAP pulsed at t = 0 from accumulation into inversion
+
+    The inversion layer cannot follow the step, so the substrate first goes into deep depletion, wider than
+    its equilibrium width w_f. Thermal generation then builds the inversion charge up at
+    dQinv/dt = q ni ((w - w_f)/tau_g + s_g) until w has shrunk back to w_f, with w and Qinv tied by the charge
+    balance of the depletion approximation. Every element of the broadcast parameters is an independent run,
+    integrated by a stiff Rosenbrock method with its own step sizes.
+
+    returns a dict with the times 't' and arrays 'C', 'w_dep', 'QinvB' and 'Vscb' with time along the last axis,
+    and 't_F', the time at which C has made 90 % of its recovery. units = s, F/cm^2, cm, C/cm^2, V, s
+
+    - VGB = gate-to-bulk bias after the pulse. units = V
+    - VFB = flat-band voltage. units = V
+    - Cox = gate-oxide capacitance. units = F/cm^2
+    - Nab = substrate acceptor concentration. units = cm^-3
+    - tau_g = generation lifetime. units = s
+    - s_g = surface generation velocity, active while the surface is not inverted. units = cm/s
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - t_end = end time; five final time constants past the bulk-generation recovery time when omitted. units = s
+    - samples = number of output times
+    - rtol, atol = integrator tolerances on the depletion width. units = cm
+    '''
+    arrays = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (VGB, VFB, Cox, Nab, tau_g, s_g)))
+    shape = arrays[0].shape
+    VGB, VFB, Cox, Nab, tau_g, s_g = (x.ravel() for x in arrays)
+    ni = material.ni(T)
+    phi_fb = material.KbToq(T)*np.log(Nab/ni)
+    body = q*Nab
+    # charge balance Cox (VGB - VFB - q Nab w^2/2 eps_si) = q Nab w + Qinv, with Qinv = 0 just after the pulse
+    drive = np.maximum(VGB - VFB, 0)
+    w_0 = eps_si/Cox*(np.sqrt(1 + 2*Cox**2*drive/(body*eps_si)) - 1)
+    w_f = np.minimum(np.sqrt(4*eps_si*phi_fb/body), w_0)
+    
+    def inversion_rate(w, i):
+        return np.where(w > w_f[i], q*ni*((w - w_f[i])/tau_g[i] + s_g[i]), 0.0)
+    
+    def rate(w, i):
+        # dQinv/dw = -q Nab (1 + Cox w/eps_si)
+        return -inversion_rate(w, i)/(body[i]*(1 + Cox[i]*w/eps_si))
+    
+    def slope(w, i):
+        growth = np.where(w > w_f[i], q*ni/tau_g[i], 0.0)
+        stretch = body[i]*(1 + Cox[i]*w/eps_si)
+        return -growth/stretch + inversion_rate(w, i)*body[i]*Cox[i]/eps_si/stretch**2
+    
+    if t_end is None:
+        final_charge = Cox*(drive - q*Nab*w_f**2/(2*eps_si)) - q*Nab*w_f
+        recovery = final_charge*tau_g/(q*ni*np.maximum(w_0 - w_f, 1e-300))
+        time_constant = tau_g*Nab*(1 + Cox*w_f/eps_si)/ni
+        t_end = np.max(np.where(w_0 > w_f, recovery + 5*time_constant, tau_g))
+    capacitance = lambda w: 1/(1/Cox[:, None] + w/eps_si)
+    C_0, C_f = capacitance(w_0[:, None])[:, 0], capacitance(w_f[:, None])[:, 0]
+    level = eps_si*(1/(C_0 + 0.9*(C_f - C_0)) - 1/Cox)
+    t, w, crossings = rosenbrock(rate, slope, w_0.copy(), t_end, samples, rtol, atol, level[:, None])
+    w = np.maximum(w, w_f[:, None])
+    QinvB = -(Cox[:, None]*(drive[:, None] - body[:, None]*w**2/(2*eps_si)) - body[:, None]*w)
+    return {'t': t, 'C': capacitance(w).reshape(shape + (samples,)), 'w_dep': w.reshape(shape + (samples,)),
+            'QinvB': np.minimum(QinvB, 0).reshape(shape + (samples,)),
+            'Vscb': (body[:, None]*w**2/(2*eps_si)).reshape(shape + (samples,)),
+            't_F': np.where(w_0 > w_f, crossings[:, 0], 0.0).reshape(shape)[()]}
+
+def zerbst(t, C, Cox, Nab, C_f=None, T=300, material=silicon):
+    '''
+    Zerbst analysis of a high-frequency C-t recovery, batched over curves along the leading axes
+
+    Plots y = -d(Cox/C)^2/dt against x = C_f/C - 1, which is the line
+    y = 2 ni Cox/(Nab C_f tau_g) x + 2 ni Cox s_g/(eps_si Nab); tau_g and s_g come from a least-squares line
+    through the points with x above 5 % of its range, away from the noisy end of the recovery.
+
+    returns a dict with 'tau_g' and 's_g', and the Zerbst plot 'x' and 'y'. units = s, cm/s
+
+    - t = times, along the last axis. units = s
+    - C = measured capacitances per unit area. units = F/cm^2
+    - Cox = gate-oxide capacitance. units = F/cm^2
+    - Nab = substrate acceptor concentration. units = cm^-3
+    - C_f = final, equilibrium capacitance; the last capacitance of each curve when omitted. units = F/cm^2
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    '''
+    t, C = np.asarray(t, dtype=np.float64), np.asarray(C, dtype=np.float64)
+    Cox, Nab = np.asarray(Cox, dtype=np.float64), np.asarray(Nab, dtype=np.float64)
+    C_f = C[..., -1] if C_f is None else np.asarray(C_f, dtype=np.float64)
+    ni = material.ni(T)
+    x = C_f[..., None]/C - 1
+    y = -np.gradient((Cox[..., None]/C)**2, t, axis=-1)
+    used = x > 0.05*np.max(x, axis=-1, keepdims=True)
+    count = np.sum(used, axis=-1)
+    mean_x = np.sum(x*used, axis=-1)/count
+    mean_y = np.sum(y*used, axis=-1)/count
+    slope = np.sum((x - mean_x[..., None])*(y - mean_y[..., None])*used, axis=-1) \
+        / np.sum((x - mean_x[..., None])**2*used, axis=-1)
+    intercept = mean_y - slope*mean_x
+    return {'tau_g': 2*ni*Cox/(Nab*C_f*slope), 's_g': intercept*eps_si*Nab/(2*ni*Cox), 'x': x, 'y': y}
+
 def calc_e_xox(Qg):
     return Qg / symbols("ϵ_ox")
 
 class AluminumMoscap(Silicon):
     '''
     An aluminum MOSCAP.
+    Temperature is a scalar T, as in Silicon; VGB sweeps go through cv_curve.
     '''
-    def __init__(self):
-        super().__init__()
+    def __init__(self, numeric: bool = False, material=None):
+        super().__init__(numeric, material)
         
         self._docalc = False
+        symbols = placeholders(numeric)
         
         # MOSCAP DESIGN PARAMETERS
         self.Nab = symbols("N_ab")
@@ -70,11 +313,26 @@ class AluminumMoscap(Silicon):
         self.VGB = symbols("V_GB")
         '''V_GB = the gate-to-bulk bias voltage (the applied voltage). units = V'''
         
+        self.exact_surface_potential = False
+        '''solve for Vscb with the exact space-charge density instead of the piecewise depletion approximations'''
+        self.poisson_distributions = False
+        '''fill the distributions below from a numerical Poisson solution across the oxide and substrate at each bias'''
+        
         # BIAS-DEPENDENT VARIABLES
         self.Qg = symbols("Q_g")
         '''the charge density in the metal-gate region. units = C/cm^2'''
         self.Qit = symbols("Q_it")
         '''the interface-trap charge density. units = C/cm^2'''
+        self.trap_energies = None
+        '''energy grid of Dit, relative to midgap. units = eV'''
+        self.Dit = None
+        '''the interface-trap density at trap_energies, or None. When set, the trap charge follows the surface potential
+        through the exact surface-potential solution, stretching out the C-V curve; Qit stays a fixed charge on top of
+        it. units = cm^-2 eV^-1'''
+        self.Q_traps = 0
+        '''the charge density of the Dit traps at the present bias. units = C/cm^2'''
+        self.Cit = 0
+        '''C_it = the interface-trap capacitance of the Dit traps. units = F'''
         self.Qscb = symbols("Q_scb")
         '''the charge density in the substrate space-charge region. units = C/cm^2'''
         self.QinvB = symbols("Q_invB")
@@ -90,6 +348,10 @@ class AluminumMoscap(Silicon):
         '''v_SC,B(V_TN) = the threshold voltage across the substrate space-charge region. units = V'''
         
         # BIAS-DEPENDENT MOS-VARIABLE DISTRIBUTIONS
+        self.x_gate_oxide = symbols("x_ox")
+        '''positions of the gate-oxide distributions, gate at -X_ox, interface at 0. units = cm'''
+        self.x_space_charge = symbols("x_B")
+        '''positions of the substrate distributions, from the interface at 0. units = cm'''
         self.gate_oxide_potential = symbols("phi_ox")
         '''phi_ox, electrostatic-potential distribution in the gate-oxide layer. units = V'''
         self.E_space_charge = symbols("E_x_B")
@@ -136,63 +398,80 @@ class AluminumMoscap(Silicon):
         
         self._docalc = True
     
-    def lock(self, name):
-        self.value_lock.append(name)
-        
-    def set_lock(self, name, value):
-        self.__setattr__(name, value)
-        self.lock(name)
-        
-    def unlock(self, name):
-        if name in self.value_lock:
-            self.value_lock.remove(name)
+    def _aliases(self, name):
+        aliases = super()._aliases(name)
+        if name == 'Nab':
+            aliases.update(Na=self.Nab, Nd=0)
+        return aliases
     
-    def __setattr__(self, __name: str, __value) -> None:
-        if 'value_lock' in self.__dict__ and __name in self.value_lock:
-            return
-        super().__setattr__(__name, __value)
-        self.__dict__[__name] = __value
-        if __name == 'Nab':
-            self.Na = self.Nab
-            self.Nd = 0
-        if self._docalc and __name != '_docalc':
-            self._docalc = False
-            self.__calculations()
-            self._docalc = True
-        
-    def __calculations(self):
-        self.phi_pm = V_contact(self.Nab)
-        self.phi_fb = fermi_potential(self.Nab)
+    @calculates('phi_pm', 'phi_fb', 'Cox', 'VFB', 'Vtn', 'v_space_charge_at_Vtn', 'width_at_Vtn', 'debye_length',
+                depends_on=('Nab', 'Xox', 'Qf', 'Qit', 'T', 'material'))
+    def __calc_process(self):
+        self.phi_pm = V_contact(self.Nab, self.T, self.material)
+        self.phi_fb = fermi_potential(self.Nab, self.T, self.material)
         self.Cox = eps_ox/self.Xox
         self.VFB = self.phi_pm - (self.Qf + self.Qit)/self.Cox
-        self.Vtn = self.VFB + 2*self.phi_fb + sqrt(4*q*eps_si*self.Nab*self.phi_fb)/self.Cox
+        self.Vtn = threshold_voltage(self.VFB, self.phi_fb, self.Cox, self.Nab)
         
         self.v_space_charge_at_Vtn = 2*self.phi_fb
         self.width_at_Vtn = width_at_Vtn(self.Nab, self.v_space_charge_at_Vtn)
-        self.debye_length = substrate_debeye_length(self.Nab)
+        self.debye_length = substrate_debeye_length(self.Nab, self.T, self.material)
+    
+    @calculates('V_gate_oxide', 'E_gate_oxide', 'Qg', 'Qscb', 'Vscb', 'w_dep', 'Cgb', 'Cscb', 'Cgb_HF', 'Cscb_HF',
+                'Vox', 'QinvB', 'Q_traps', 'Cit',
+                depends_on=('VGB', 'Nab', 'Xox', 'Qf', 'Qit', 'area', 'T', 'material', 'numeric',
+                            'exact_surface_potential', 'trap_energies', 'Dit', 'phi_pm', 'phi_fb', 'Cox', 'VFB',
+                            'width_at_Vtn'))
+    def __calc_bias(self):
+        self.Q_traps = 0
+        self.Cit = 0
+        infinity = np.inf if self.numeric else oo
+        # the capacitor's own threshold, which a Mosfet's Vtn replaces with the body-biased one
+        Vtn = threshold_voltage(self.VFB, self.phi_fb, self.Cox, self.Nab)
+        exact = self.exact_surface_potential or self.Dit is not None
+        if exact and all(is_number(x) for x in (self.Nab, self.Xox, self.Qf, self.Qit, self.VGB)):
+            exact = exact_space_charge(self.VGB, float(self.VFB), float(self.Cox), float(self.Nab), self.T, self.material,
+                                       traps=self.__traps())
+            self.Vscb, self.Qscb, self.QinvB, self.w_dep = (float(exact[k]) for k in ('Vscb', 'Qscb', 'QinvB', 'w_dep'))
+            self.Q_traps = float(exact['Qit'])
+            self.Qg = -(self.Qscb + self.Q_traps + self.Qf + self.Qit)
+            self.E_gate_oxide = self.Qg/eps_ox
+            self.V_gate_oxide = self.Xox * self.E_gate_oxide
+            # the traps follow the surface potential at low frequency only
+            Cscb, Cscb_HF, Cit = float(exact['Cscb']), float(exact['Cscb_HF']), float(exact['Cit'])
+            self.Cgb = self.Cox * (Cscb + Cit) / (self.Cox + Cscb + Cit) * self.area
+            self.Cgb_HF = self.Cox * Cscb_HF / (self.Cox + Cscb_HF) * self.area
+            self.Cscb = Cscb * self.area
+            self.Cscb_HF = Cscb_HF * self.area
+            self.Cit = Cit * self.area
         
         # default accumulation range if VGB isn't defined
-        if not self.isnumber(self.VGB) or self.VGB < self.VFB:
+        elif not self.isnumber(self.VGB) or self.VGB < self.VFB:
             self.V_gate_oxide = self.VGB - self.phi_pm
             self.E_gate_oxide = self.V_gate_oxide/self.Xox
             self.Qg = eps_ox * self.E_gate_oxide
-            self.Qscb = -self.Cox
-            self.Vscb = self.VGB - self.phi_pm + (self.Qf + self.Qit)/self.Cox + self.Qscb/self.Cox
+            self.Qscb = -(self.Qg + self.Qf + self.Qit)
+            # the accumulation layer is a sheet at the surface in the depletion approximation
+            self.Vscb = 0
+            self.QinvB = 0
             self.w_dep = 0
-            self.Cgb = self.Cox * self.area
+            self.Cscb = self.Cscb_HF = infinity
+            self.Cgb = self.Cgb_HF = self.Cox * self.area
         
         # at the flat band voltage
         elif self.VGB == self.VFB:
             self.Qscb = 0
             self.Vscb = 0
+            self.QinvB = 0
             self.Qg = -self.Qf - self.Qit
             self.E_gate_oxide = self.Qg/eps_ox
             self.V_gate_oxide = self.Xox * self.E_gate_oxide
             self.w_dep = 0
-            self.Cgb = self.Cox * self.area
+            self.Cscb = self.Cscb_HF = infinity
+            self.Cgb = self.Cgb_HF = self.Cox * self.area
             
         # depletion range
-        elif self.VFB < self.VGB < self.Vtn:
+        elif self.VFB < self.VGB < Vtn:
             # print('in depl range', self.VGB)
             self.Vscb = self.VGB - self.VFB \
                         + q*eps_si*self.Nab/(self.Cox**2) * \
@@ -201,12 +480,12 @@ class AluminumMoscap(Silicon):
             self.V_gate_oxide = self.Xox * self.E_gate_oxide
             self.Qg = sqrt(2*q*eps_si*self.Nab*self.Vscb) - (self.Qf + self.Qit)
             self.Qscb = -(self.Qg + self.Qf + self.Qit)
+            self.QinvB = 0
             self.w_dep = sqrt(2*eps_si/(q*self.Nab) * self.Vscb)
             
-            self.Cscb = eps_si/self.w_dep
-            self.Cgb = self.Cox * self.Cscb / (self.Cox + self.Cscb)
-            self.Cscb *= self.area
-            self.Cgb *= self.area
+            Cscb = eps_si/self.w_dep
+            self.Cscb = self.Cscb_HF = Cscb * self.area
+            self.Cgb = self.Cgb_HF = self.Cox * Cscb / (self.Cox + Cscb) * self.area
             
         
         else: # inversion range
@@ -217,24 +496,140 @@ class AluminumMoscap(Silicon):
             self.V_gate_oxide = self.Xox * self.E_gate_oxide
             self.Qg = self.E_gate_oxide * eps_ox
             self.Qscb = -(self.Qg + self.Qf + self.Qit)
-            self.QinvB = -self.Cox * (self.VGB - self.Vtn)
+            self.QinvB = -self.Cox * (self.VGB - Vtn)
             
-            self.Cscb_HF = eps_si/self.w_dep
-            self.Cgb_HF = self.Cox * self.Cscb / (self.Cox + self.Cscb)
-            self.Cscb_HF *= self.area
-            self.Cgb_HF *= self.area
+            # at low frequency the inversion layer follows the gate, so Cgb returns to Cox
+            Cscb_HF = eps_si/self.w_dep
+            self.Cscb_HF = Cscb_HF * self.area
+            self.Cgb_HF = self.Cox * Cscb_HF / (self.Cox + Cscb_HF) * self.area
             
+            self.Cscb = infinity
             self.Cgb = self.Cox * self.area
-            
+    
+    @calculates('E_space_charge', 'x_gate_oxide', 'gate_oxide_potential', 'x_space_charge', 'n_space_charge',
+                'p_space_charge', 'net_charge_dist_space_charge',
+                depends_on=('Qscb', 'poisson_distributions', 'VGB', 'Nab', 'Xox', 'Qf', 'Qit', 'T', 'material',
+                            'phi_pm'))
+    def __calc_distributions(self):
         self.E_space_charge = -self.Qscb/eps_si
+        
+        if self.poisson_distributions and all(is_number(x) for x in (self.Nab, self.Xox, self.Qf, self.Qit, self.VGB)):
+            solution = self.solve_poisson()
+            k = solution.interface
+            self.x_gate_oxide = solution.x[:k + 1]
+            self.gate_oxide_potential = solution.psi[:k + 1]
+            self.x_space_charge = solution.x[k:]
+            self.E_space_charge = solution.E[k:]
+            self.n_space_charge = solution.n[k:]
+            self.p_space_charge = solution.p[k:]
+            self.net_charge_dist_space_charge = solution.rho[k:]
             
         
     
+    def __traps(self):
+        '''the trap_energies and Dit of exact_space_charge, or None'''
+        if self.Dit is None:
+            return None
+        if self.trap_energies is None:
+            raise ValueError('trap_energies must be set along with Dit')
+        return np.asarray(self.trap_energies, dtype=np.float64), np.asarray(self.Dit, dtype=np.float64)
+    
+    def solve_poisson(self, VGB=None, points=801) -> MoscapPoissonSolution:
+        '''
+        solves the nonlinear Poisson equation across the gate oxide and substrate instead of using the depletion
+        approximation, starting from the previous solution so VGB sweeps converge in a few Newton iterations each
+        
+        - VGB = gate-to-bulk bias voltage; the current bias when omitted
+        - points = number of mesh points
+        '''
+        if not all(is_number(x) for x in (self.Nab, self.Xox, self.Qf, self.Qit)):
+            raise ValueError('Nab, Xox, Qf and Qit must be set before solving the moscap')
+        key = (self.Nab, self.Xox, self.Qf, self.Qit, self.T, self.material, points)
+        if self.__dict__.get('_poisson_key') != key:
+            self.__dict__['_poisson'] = MoscapPoisson(self.Nab, self.Xox, self.phi_pm, self.Qf + self.Qit, self.T,
+                                                      self.material, points)
+            self.__dict__['_poisson_key'] = key
+        return self._poisson.solve(self.VGB if VGB is None else VGB)
+    
+    def deep_depletion(self, VGB=None, tau_g=None, s_g=0, t_end=None, samples=2001):
+        '''
+        pulsed C-t response from accumulation to VGB, deep depletion followed by the thermal build-up of the
+        inversion layer, by deep_depletion_transient; batched over broadcast arrays of VGB and tau_g
+        
+        returns the dict of deep_depletion_transient, with 'C' the gate capacitance, per unit area when the area
+        is not set
+        
+        - VGB = gate-to-bulk bias after the pulse; the current bias when omitted. units = V
+        - tau_g = generation lifetime; the substrate's gen_life_n when omitted. units = s
+        - s_g = surface generation velocity. units = cm/s
+        - t_end = end time; set from the slowest recovery when omitted. units = s
+        - samples = number of output times
+        '''
+        if not all(is_number(x) for x in (self.Nab, self.Xox, self.Qf, self.Qit)):
+            raise ValueError('Nab, Xox, Qf and Qit must be set before simulating the moscap')
+        transient = deep_depletion_transient(self.VGB if VGB is None else VGB, float(self.VFB), float(self.Cox),
+                                             float(self.Nab), float(self.gen_life_n) if tau_g is None else tau_g, s_g,
+                                             self.T, self.material, t_end, samples)
+        transient['C'] = transient['C']*(float(self.area) if is_number(self.area) else 1)
+        return transient
+    
+    def cv_curve(self, VGB):
+        '''
+        gate capacitance and substrate charges over an array of gate-to-bulk biases, without changing the state of
+        the moscap, with the same model as the scalar calculation at each VGB
+        
+        returns a dict of arrays with 'Cgb', 'Cgb_HF', 'Cscb', 'Cscb_HF', 'Qg', 'Qscb', 'QinvB', 'Vscb' and 'w_dep',
+        the capacitances per unit area when the area is not set. With the piecewise model Cscb is inf wherever Cgb
+        equals Cox; with exact_surface_potential or Dit set the curves come from exact_space_charge and are smooth,
+        and also include 'Cit' and 'Q_traps'.
+        
+        - VGB = gate-to-bulk bias voltages. units = V
+        '''
+        if not all(is_number(x) for x in (self.Nab, self.Xox, self.Qf, self.Qit)):
+            raise ValueError('Nab, Xox, Qf and Qit must be set before sweeping the bias')
+        VGB = np.asarray(VGB, dtype=np.float64)
+        Nab, Cox = float(self.Nab), float(self.Cox)
+        Q_ox = float(self.Qf + self.Qit)
+        VFB = float(self.VFB)
+        Vtn = float(threshold_voltage(VFB, float(self.phi_fb), Cox, Nab))
+        phi_fb, phi_pm = float(self.phi_fb), float(self.phi_pm)
+        area = float(self.area) if is_number(self.area) else 1
+        
+        if self.exact_surface_potential or self.Dit is not None:
+            exact = exact_space_charge(VGB, VFB, Cox, Nab, self.T, self.material, traps=self.__traps())
+            Cscb, Cscb_HF, Cit = exact['Cscb'], exact['Cscb_HF'], exact['Cit']
+            return {'Cgb': Cox*(Cscb + Cit)/(Cox + Cscb + Cit)*area, 'Cgb_HF': Cox*Cscb_HF/(Cox + Cscb_HF)*area,
+                    'Cscb': Cscb*area, 'Cscb_HF': Cscb_HF*area, 'Cit': Cit*area,
+                    'Qg': -(exact['Qscb'] + exact['Qit'] + Q_ox), 'Qscb': exact['Qscb'], 'QinvB': exact['QinvB'],
+                    'Q_traps': exact['Qit'], 'Vscb': exact['Vscb'], 'w_dep': exact['w_dep']}
+        
+        accumulation = VGB < VFB
+        inversion = VGB >= Vtn
+        body = q*eps_si*Nab
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # flat band falls in the depletion expressions with Vscb = 0
+            overdrive = np.maximum(VGB - VFB, 0)
+            Vscb = overdrive + body/Cox**2 * (1 - np.sqrt(1 + 2*Cox**2/body * overdrive))
+            Vscb = np.where(accumulation, 0.0, np.where(inversion, 2*phi_fb, Vscb))
+            Qg = np.where(accumulation, Cox*(VGB - phi_pm),
+                          np.where(inversion, Cox*(VGB - 2*phi_fb - phi_pm), np.sqrt(2*body*Vscb) - Q_ox))
+            Qscb = -(Qg + Q_ox)
+            w_dep = np.sqrt(2*eps_si/(q*Nab) * Vscb)
+            Cscb_HF = eps_si/w_dep
+            Cgb_HF = 1/(1/Cox + w_dep/eps_si)
+            # at low frequency the inversion layer follows the gate, so Cgb returns to Cox
+            Cscb = np.where(accumulation | inversion, np.inf, Cscb_HF)
+            Cgb = np.where(inversion, Cox, Cgb_HF)
+        
+        return {'Cgb': Cgb*area, 'Cgb_HF': Cgb_HF*area, 'Cscb': Cscb*area, 'Cscb_HF': Cscb_HF*area,
+                'Qg': Qg, 'Qscb': Qscb, 'QinvB': np.where(inversion, -Cox*(VGB - Vtn), 0.0), 'Vscb': Vscb, 'w_dep': w_dep}
+    
     def isnumber(self, value):
         try:
             if value > 12:
                 pass
-            return True
+            # NaN marks an unset quantity in numeric mode
+            return bool(value == value)
         except:
             return False
         
\ No newline at end of file
@@ -1,14 +1,44 @@
-from sympy import symbols, sqrt, Rational, ln
+from sympy import symbols, Rational
 import sympy as sp
+import numpy as np
+from functools import lru_cache
 from math import pi
 from solvers import moscap
 from solvers import constants as cs
+from solvers.dependencies import calculates
+from solvers.numeric import sqrt, ln, placeholders
+
+_KERNEL_ARGS = symbols("K_n V_GS V_TN V_DS V_DSat lambda_N C_ox_tot mu_n_ch W_ch L_ch C_ox")
+'''arguments of the compiled Level-1 kernels, in order'''
+
+@lru_cache(maxsize=None)
+def _kernel(region):
+    '''
+    the Level-1 I_D, g_m, g_ds, C_gs, C_gd and Q_G of a bias region ('sat' or 'lin'), compiled once from the
+    Mosfet model expressions into a NumPy function of _KERNEL_ARGS, with common subexpressions eliminated
+    '''
+    Kn, Vgs, Vtn, Vds, Vdsat, lambda_n, total_Cox, mu_n_ch, Wch, Lch, Cox = _KERNEL_ARGS
+    Vgd = Vgs - Vds
+    if region == 'sat':
+        current = Mosfet.drain_current_sat_kn(Kn, Vgs, Vtn, lambda_n, Vds, Vdsat)
+        C_gs, C_gd = Rational(2, 3)*total_Cox, sp.S.Zero
+    else:
+        current = Mosfet.drain_current_lin_kn(Kn, Vgs, Vtn, Vds)
+        C_gs = Rational(2, 3)*total_Cox*(1 - (Vgd - Vtn)**2/(Vgs + Vgd - 2*Vtn)**2)
+        C_gd = Rational(2, 3)*total_Cox*(1 - (Vgs - Vtn)**2/(Vgs + Vgd - 2*Vtn)**2)
+    # g_m holds V_DSat fixed, as the symbolic calculation does
+    gm = current.diff(Vgs)
+    gds = mu_n_ch*Cox*Wch/Lch*(Vgs - Vtn)**2*lambda_n
+    Idlin = Mosfet.drain_current_lin_kn(Kn, Vgs, Vtn, Vds)
+    bigQg = Mosfet.gate_charge(mu_n_ch, Wch, Cox, Idlin, Vgs, Vtn, Vds)
+    return sp.lambdify(_KERNEL_ARGS, (current, gm, gds, C_gs, C_gd, bigQg), modules='numpy', cse=True)
 
 class Mosfet(moscap.AluminumMoscap):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, numeric: bool = False, material=None):
+        super().__init__(numeric, material)
         
         self._docalc = False
+        symbols = placeholders(numeric)
         
         self.channel_length = symbols("L_ch")
         '''L_ch, the channel length of the MOSFET. units = cm'''
@@ -94,91 +124,127 @@ class Mosfet(moscap.AluminumMoscap):
         
         self._docalc = True
         
-    def __calculate(self):
-        self._docalc = False
-        
-        self.Q_dep_B = self.depl_charge_density(self.Nab, self.phi_fb, self.Vbs)
+    @calculates('Kn', 'K_N', depends_on=('mu_n_ch', 'Cox', 'channel_width', 'channel_length'))
+    def __calc_gain_factor(self):
         self.Kn = self.mu_n_ch * self.Cox * self.channel_width / (2 * self.channel_length)
         self.K_N = 2*self.Kn
         
         if (self.isnumber(self.K_N) and not self.isnumber(self.Kn)):
             self.Kn = self.K_N / 2
-        
+    
+    @calculates('Q_dep_B', 'Vtn', 'bulk_body_effect_coeff', depends_on=('Nab', 'phi_fb', 'Vbs', 'VFB', 'Cox'))
+    def __calc_threshold(self):
+        self.Q_dep_B = self.depl_charge_density(self.Nab, self.phi_fb, self.Vbs)
         self.Vtn = Mosfet.thresh_voltage(self.VFB, self.phi_fb, self.Cox, self.Nab, self.Vbs)
         self.bulk_body_effect_coeff = sqrt(2*cs.q*cs.eps_si*self.Nab)/self.Cox
+    
+    @calculates('total_Cox', depends_on=('Cox', 'channel_width', 'channel_length'))
+    def __calc_total_cox(self):
+        self.total_Cox = self.Cox * self.channel_width * self.channel_length
+    
+    @calculates('C_gs_overlap', 'C_gd_overlap', depends_on=('channel_width', 'Lgsov', 'Lgdov', 'Xox'))
+    def __calc_overlap_capacitance(self):
+        self.C_gs_overlap = cs.eps_ox*self.channel_width*self.Lgsov/self.Xox
+        self.C_gd_overlap = cs.eps_ox*self.channel_width*self.Lgdov/self.Xox
+    
+    @calculates('ft', depends_on=('mu_n_ch', 'channel_length', 'Vgs', 'Vtn'))
+    def __calc_transit_frequency(self):
+        self.ft = (3*self.mu_n_ch) / (4*pi*self.channel_length**2) * (self.Vgs - self.Vtn)
+    
+    @calculates('Q_inv_B', 'Vdsat', 'Vgd', 'bigQg_lin', 'C_gs', 'C_gd', 'Id', 'gm', 'gds', 'rds_sat', 'bigQg',
+                depends_on=('Cox', 'Vgs', 'Vds', 'Vtn', 'Kn', 'total_Cox', 'ch_len_modulation',
+                            'mu_n_ch', 'channel_width', 'channel_length'))
+    def __calc_drain_current(self):
+        inputs = (self.Kn, self.Vgs, self.Vtn, self.Vds, self.ch_len_modulation, self.total_Cox, self.mu_n_ch,
+                  self.channel_width, self.channel_length, self.Cox)
+        if all(self.isnumber(x) for x in inputs):
+            self.__drain_current_kernel(*(np.float64(x) for x in inputs))
+            return
+        
         self.Q_inv_B = self.inv_charge_density_easy(self.Cox, self.Vgs, self.Vtn)
         self.Vdsat = self.Vgs - self.Vtn
         self.Vgd = self.Vgs - self.Vds
-        self.total_Cox = self.Cox * self.channel_width * self.channel_length
-        self.bigQg_lin = self.lin_gate_charge(self.Cox * self.channel_width * self.channel_length, self.Vgs, self.Vds, self.Vtn)
-        
-        self.__set_vbis()
-        
-        self.ft = (3*self.mu_n_ch) / (4*pi*self.channel_length**2) * (self.Vgs - self.Vtn)
+        self.bigQg_lin = self.lin_gate_charge(self.total_Cox, self.Vgs, self.Vds, self.Vtn)
         
         vgs_sym = symbols("Vgs")
         
         if self.isnumber(self.Vgs) and self.isnumber(self.Vtn) and self.Vgs < self.Vtn:
             current = 0
         elif self.isnumber(self.Vds) and self.isnumber(self.Vdsat) and self.Vds >= self.Vdsat:
-            current = self.drain_current_sat_kn(self.Kn, vgs_sym, self.Vtn, self.ch_len_modulation, self.Vds, self.Vdsat)
+            if self.numeric:
+                current = self.drain_current_sat_kn(self.Kn, self.Vgs, self.Vtn, self.ch_len_modulation, self.Vds, self.Vdsat)
+                gm = self.transconductance_sat_kn(self.Kn, self.Vgs, self.Vtn, self.ch_len_modulation, self.Vds, self.Vdsat)
+            else:
+                current = self.drain_current_sat_kn(self.Kn, vgs_sym, self.Vtn, self.ch_len_modulation, self.Vds, self.Vdsat)
             self.C_gs = (2/3) * self.total_Cox
             self.C_gd = 0
         else:
-            current = self.drain_current_lin_kn(self.Kn, vgs_sym, self.Vtn, self.Vds)
+            if self.numeric:
+                current = self.drain_current_lin_kn(self.Kn, self.Vgs, self.Vtn, self.Vds)
+                gm = self.transconductance_lin_kn(self.Kn, self.Vds)
+            else:
+                current = self.drain_current_lin_kn(self.Kn, vgs_sym, self.Vtn, self.Vds)
             self.C_gs = (2/3) * self.total_Cox * (1 - (self.Vgd - self.Vtn)**2 / (self.Vgs + self.Vgd - 2*self.Vtn)**2 )
             self.C_gd = (2/3) * self.total_Cox * (1 - (self.Vgs - self.Vtn)**2 / (self.Vgs + self.Vgd - 2*self.Vtn)**2 )
         
-        self.C_gs_overlap = cs.eps_ox*self.channel_width*self.Lgsov/self.Xox
-        self.C_gd_overlap = cs.eps_ox*self.channel_width*self.Lgdov/self.Xox
+        if self.numeric:
+            self.Id = current
+            self.gm = 0 if current == 0 else gm
+        else:
+            self.Id = 0 if current == 0 else current.subs(vgs_sym, self.Vgs)
             
-        self.Id = 0 if current == 0 else current.subs(vgs_sym, self.Vgs)
-        
-        id_diff = 0 if current == 0 else current.diff(vgs_sym)
-        self.gm = 0 if current == 0 else id_diff.subs(vgs_sym, self.Vgs)
+            id_diff = 0 if current == 0 else current.diff(vgs_sym)
+            self.gm = 0 if current == 0 else id_diff.subs(vgs_sym, self.Vgs)
         self.gds = 0 if current == 0 else self.mu_n_ch * self.Cox * self.channel_width/self.channel_length * (self.Vgs - self.Vtn)**2 * self.ch_len_modulation
-        self.rds_sat = sp.oo if self.gds == 0 else 1/self.gds
+        self.rds_sat = (np.inf if self.numeric else sp.oo) if self.gds == 0 else 1/self.gds
         
         Idlin = self.drain_current_lin_kn(self.Kn, self.Vgs, self.Vtn, self.Vds)
         self.bigQg = self.gate_charge(self.mu_n_ch, self.channel_width, self.Cox, Idlin, self.Vgs, self.Vtn, self.Vds)
-        
-        self._docalc = True
-        
     
-    def lock(self, name):
-        self.value_lock.append(name)
-        
-    def set_lock(self, name, value):
-        self.__setattr__(name, value)
-        self.lock(name)
-        
-    def unlock(self, name):
-        if name in self.value_lock:
-            self.value_lock.remove(name)
+    def __drain_current_kernel(self, Kn, Vgs, Vtn, Vds, lambda_n, total_Cox, mu_n_ch, Wch, Lch, Cox):
+        '''the drain-current calculation with numeric inputs, by the compiled kernel of the bias region'''
+        Vdsat = Vgs - Vtn
+        arguments = (Kn, Vgs, Vtn, Vds, Vdsat, lambda_n, total_Cox, mu_n_ch, Wch, Lch, Cox)
+        self.Q_inv_B = self.inv_charge_density_easy(Cox, Vgs, Vtn)
+        self.Vdsat = Vdsat
+        self.Vgd = Vgs - Vds
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.bigQg_lin = self.lin_gate_charge(total_Cox, Vgs, Vds, Vtn)
+            if Vgs < Vtn:
+                bigQg = _kernel('lin')(*arguments)[5]
+                self.Id = self.gm = self.gds = 0
+            else:
+                current, gm, gds, self.C_gs, self.C_gd, bigQg = _kernel('sat' if Vds >= Vdsat else 'lin')(*arguments)
+                self.Id = current
+                self.gm = 0 if current == 0 else gm
+                self.gds = 0 if current == 0 else gds
+        self.rds_sat = (np.inf if self.numeric else sp.oo) if self.gds == 0 else 1/self.gds
+        self.bigQg = bigQg
+    
+    def _aliases(self, name):
+        aliases = super()._aliases(name)
+        if name == 'trap_charge_densities':
+            aliases.update(Qf=self.trap_charge_densities, Qit=0)
+        return aliases
         
     def __setattr__(self, __name: str, __value) -> None:
         if 'value_lock' in self.__dict__ and __name in self.value_lock:
             return
         
-        if '_docalc' in self.__dict__ and 'last_modified' in self.__dict__ and not self._docalc and __name == self.last_modified:
+        # values assigned by the user win over the ones calculated from them
+        if '_docalc' in self.__dict__ and not self._docalc and __name in self.__dict__.get('_assigned', ()):
             return
         
-        super().__setattr__(__name, __value)
-        self.__dict__[__name] = __value
+        if self.__dict__.get('_docalc') and __name != '_docalc':
+            self.__dict__['last_modified'] = __name
         
-        if __name == 'trap_charge_densities':
-            self.Qf = self.trap_charge_densities
-            self.Qit = 0
-        
-        if self._docalc and __name != '_docalc':
-            self._docalc = False
-            self.last_modified = __name
-            self.__calculate()
-            self._docalc = True
+        super().__setattr__(__name, __value)
     
+    @calculates('vbis', depends_on=('Nab', 'Na', 'Nd', 'T', 'material'))
     def __set_vbis(self):
-        vbi1 = cs.KbToq * ln(self.Nab * self.Nd/cs.ni**2)
-        vbi2 = cs.KbToq * ln(self.Na * self.Na/cs.ni**2)
+        KbToq, ni = self.material.KbToq(self.T), self.material.ni(self.T)
+        vbi1 = KbToq * ln(self.Nab * self.Nd/ni**2)
+        vbi2 = KbToq * ln(self.Na * self.Na/ni**2)
         self.vbis = [vbi1, vbi2, vbi2, vbi2, vbi1]
             
     @staticmethod
@@ -211,6 +277,16 @@ class Mosfet(moscap.AluminumMoscap):
     def drain_current_sat_kn(Kn, Vgs, Vtn, lambda_n=0, Vds=0, Vdsat=0):
         return Kn * (Vgs - Vtn)**2 * (1 + lambda_n * (Vds - Vdsat))
     
+    @staticmethod
+    def transconductance_sat_kn(Kn, Vgs, Vtn, lambda_n=0, Vds=0, Vdsat=0):
+        '''dI_D/dV_GS of drain_current_sat_kn, holding V_DSat fixed'''
+        return 2 * Kn * (Vgs - Vtn) * (1 + lambda_n * (Vds - Vdsat))
+    
+    @staticmethod
+    def transconductance_lin_kn(Kn, Vds):
+        '''dI_D/dV_GS of drain_current_lin_kn'''
+        return 2 * Kn * Vds
+    
     @staticmethod
     def drain_current_lin(Kn, Vgs, Vtn, Vds):
         return 2*Kn * ( (Vgs - Vtn)*Vds - 0.5*Vds**2 )
@@ -234,6 +310,7 @@ class Mosfet(moscap.AluminumMoscap):
         try:
             if value > 12:
                 pass
-            return True
+            # NaN marks an unset quantity in numeric mode
+            return bool(value == value)
         except:
             return False
@@ -0,0 +1,65 @@
+import numpy as np
+import sympy
+
+_NUMPY_TYPES = (np.ndarray, np.generic)
+
+def sqrt(x):
+    '''square root of x, computed by NumPy for NumPy values and by sympy otherwise'''
+    if isinstance(x, _NUMPY_TYPES):
+        return np.sqrt(x)
+    return sympy.sqrt(x)
+
+def ln(x):
+    '''natural log of x, computed by NumPy for NumPy values and by sympy otherwise'''
+    if isinstance(x, _NUMPY_TYPES):
+        return np.log(x)
+    return sympy.ln(x)
+
+def exp(x):
+    '''e^x, computed by NumPy for NumPy values and by sympy otherwise'''
+    if isinstance(x, _NUMPY_TYPES):
+        return np.exp(x)
+    return sympy.exp(x)
+
+def is_number(value) -> bool:
+    '''True for a known real number: an int or float (Python or NumPy) that is not NaN'''
+    if isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating)):
+        return False
+    return value == value
+
+def as_numeric(value):
+    '''converts Python ints and floats to float64 so arithmetic on them stays in NumPy'''
+    if type(value) in (int, float):
+        return np.float64(value)
+    return value
+
+def graded_mesh(length, points, h0):
+    '''
+    points distances from 0 to length, spaced about h0 near 0 and growing like sinh away from it
+
+    - length = mesh length
+    - points = number of mesh points
+    - h0 = first spacing, in the units of length
+    '''
+    s = np.linspace(0, 1, points)
+    if length/(points - 1) <= h0:
+        return length*s
+    low, high = 1e-9, 200.0
+    for _ in range(100):
+        a = (low + high)/2
+        if length*np.sinh(a/(points - 1))/np.sinh(a) > h0:
+            low = a
+        else:
+            high = a
+    return length*np.sinh(a*s)/np.sinh(a)
+
+def _nan_symbol(name):
+    return np.float64(np.nan)
+
+def placeholders(numeric: bool):
+    '''
+    the function the device classes create their unset quantities with
+
+    - numeric = use NaN instead of sympy Symbols
+    '''
+    return _nan_symbol if numeric else sympy.symbols
@@ -0,0 +1,281 @@
+import numpy as np
+from scipy.linalg import solve_banded
+from solvers.constants import q, eps_si, eps_ox
+from solvers.materials import SiliconMaterial, silicon
+from solvers.numeric import graded_mesh
+
+class PoissonSolution:
+    '''potential, field and carrier profiles of a pn junction at one bias'''
+    def __init__(self, x, psi, n, p, net_doping, V, iterations):
+        self.x = x
+        '''mesh positions, p-side contact at x < 0, metallurgical junction at x = 0. units = cm'''
+        self.psi = psi
+        '''electrostatic potential, referenced to the electron quasi-Fermi level of the n side. units = V'''
+        self.E = -np.gradient(psi, x)
+        '''electric field. units = V/cm'''
+        self.n = n
+        '''electron concentration. units = cm^-3'''
+        self.p = p
+        '''hole concentration. units = cm^-3'''
+        self.rho = q*(p - n + net_doping)
+        '''space-charge density. units = C/cm^3'''
+        self.V = V
+        '''applied bias Vpn. units = V'''
+        self.iterations = iterations
+        '''Newton iterations taken'''
+
+    @property
+    def potential_drop(self):
+        '''ψ(n contact) - ψ(p contact), equal to vbi - Vpn. units = V'''
+        return self.psi[-1] - self.psi[0]
+
+    @property
+    def w_depl(self):
+        '''depletion width, between the points where the majority carriers fall to half the doping. units = cm'''
+        doping = self.rho/q - self.p + self.n
+        p_edge = np.interp(0.5, (self.p/-doping)[self.x < 0][::-1], self.x[self.x < 0][::-1])
+        n_edge = np.interp(0.5, (self.n/doping)[self.x > 0], self.x[self.x > 0])
+        return n_edge - p_edge
+
+class PNJunctionPoisson:
+    '''
+    Nonlinear Poisson solver for an abrupt pn junction on a uniform 1D mesh.
+
+    Solves d²ψ/dx² = -q/ε (p - n + Nd - Na) by Newton iteration with a tridiagonal Jacobian, with the
+    quasi-Fermi levels held flat at Vpn (holes) and 0 (electrons) across the junction. Each solve starts
+    from the previous solution, so neighbouring bias points converge in a few iterations.
+    '''
+    def __init__(self, Na, Nd, T=300, material: SiliconMaterial = silicon, points=2001, V_min=-5):
+        '''
+        - Na = p-side acceptor concentration. units = cm^-3
+        - Nd = n-side donor concentration. units = cm^-3
+        - T = temperature. units = K
+        - material = temperature-dependent silicon parameters
+        - points = number of mesh points
+        - V_min = most negative bias the mesh is sized for; more negative biases enlarge the mesh
+        '''
+        self.Na = float(Na)
+        self.Nd = float(Nd)
+        self.T = T
+        self.material = material
+        self.points = points
+        self.Vt = material.KbToq(T)
+        self.ni = material.ni(T)
+        self.psi = None
+        self.__mesh(V_min)
+
+    def __mesh(self, V):
+        Na, Nd = self.Na, self.Nd
+        vbi = self.Vt*np.log(Na*Nd/self.ni**2)
+        reach = max(vbi - V, vbi)
+        w_p = np.sqrt(2*eps_si/q * Nd/(Na*(Na + Nd)) * reach)
+        w_n = np.sqrt(2*eps_si/q * Na/(Nd*(Na + Nd)) * reach)
+        debye_p = np.sqrt(eps_si*self.Vt/(q*Na))
+        debye_n = np.sqrt(eps_si*self.Vt/(q*Nd))
+        old_x, old_psi = getattr(self, 'x', None), self.psi
+
+        self.V_min = V
+        self.x = np.linspace(-(1.5*w_p + 10*debye_p), 1.5*w_n + 10*debye_n, self.points)
+        '''mesh positions. units = cm'''
+        self.h = self.x[1] - self.x[0]
+        self.net_doping = np.where(self.x < 0, -Na, Nd)
+        if old_psi is not None:
+            self.psi = np.interp(self.x, old_x, old_psi)
+
+    def __neutral(self, V):
+        '''potential at which the flat-quasi-Fermi-level carriers neutralize the doping'''
+        return V/2 + self.Vt*np.arcsinh(self.net_doping/(2*self.ni*np.exp(V/(2*self.Vt))))
+
+    def solve(self, V=0, tol=1e-12, max_iterations=100) -> PoissonSolution:
+        '''
+        solves the junction at bias V, starting from the last solution
+
+        - V = bias voltage Vpn. units = V
+        - tol = convergence tolerance on the Newton update. units = V
+        - max_iterations = iteration limit
+        '''
+        if V < self.V_min:
+            self.__mesh(V)
+        Vt, ni, h = self.Vt, self.ni, self.h
+        neutral = self.__neutral(V)
+        if self.psi is None:
+            psi = neutral.copy()
+        else:
+            # move the contacts to the new bias and carry the old profile along between them
+            psi = self.psi.copy()
+            weight = (psi[-1] - psi)/(psi[-1] - psi[0])
+            psi += (neutral[0] - psi[0])*weight + (neutral[-1] - psi[-1])*(1 - weight)
+        psi[0], psi[-1] = neutral[0], neutral[-1]
+
+        def residual(psi):
+            n = ni*np.exp(psi/Vt)
+            p = ni*np.exp((V - psi)/Vt)
+            F = (psi[:-2] - 2*psi[1:-1] + psi[2:])/h**2 + q/eps_si*(p - n + self.net_doping)[1:-1]
+            diagonal = -2/h**2 - q/eps_si*(p + n)[1:-1]/Vt
+            return F, diagonal
+
+        ab = np.empty((3, len(psi) - 2))
+        ab[0, :] = ab[2, :] = 1/h**2
+        iterations = 0
+        with np.errstate(over='ignore', invalid='ignore'):
+            F, ab[1, :] = residual(psi)
+            # the residual scaled by the Jacobian diagonal is in volts, comparable across the mesh
+            error = np.max(np.abs(F/ab[1, :]))
+            while iterations < max_iterations:
+                delta = solve_banded((1, 1), ab, -F)
+                iterations += 1
+                # limit the first step to 1 V, then halve it until the scaled residual falls
+                step = min(1.0, 1/np.max(np.abs(delta)))
+                while True:
+                    trial = psi.copy()
+                    trial[1:-1] += step*delta
+                    F_trial, diagonal = residual(trial)
+                    trial_error = np.max(np.abs(F_trial/diagonal))
+                    if trial_error < error or step < 1e-3:
+                        break
+                    step /= 2
+                psi, F, ab[1, :], error = trial, F_trial, diagonal, trial_error
+                if np.max(np.abs(step*delta)) < tol:
+                    break
+
+        self.psi = psi
+        n = ni*np.exp(psi/Vt)
+        p = ni*np.exp((V - psi)/Vt)
+        return PoissonSolution(self.x, psi.copy(), n, p, self.net_doping, V, iterations)
+
+class MoscapPoissonSolution:
+    '''potential, field and carrier profiles across the gate oxide and substrate of a MOS capacitor at one bias'''
+    def __init__(self, x, psi, n, p, Nab, Q_ox, interface, VGB, iterations):
+        self.x = x
+        '''mesh positions, gate at x = -Xox, oxide-silicon interface at x = 0. units = cm'''
+        self.psi = psi
+        '''electrostatic potential, referenced to the neutral substrate. units = V'''
+        self.interface = interface
+        '''index of the oxide-silicon interface in the mesh'''
+        self.Q_ox = Q_ox
+        '''fixed-oxide plus interface-trap charge at the interface. units = C/cm^2'''
+        self.n = n
+        '''electron concentration, 0 in the oxide. units = cm^-3'''
+        self.p = p
+        '''hole concentration, 0 in the oxide. units = cm^-3'''
+        self.rho = q*(p - n - np.where(x < 0, 0, Nab))
+        '''space-charge density, 0 in the oxide. units = C/cm^3'''
+        # the field of each mesh interval, carried to the nodes through the charge of half a box as in the
+        # discretized Gauss law; it is discontinuous at the interface, which holds the silicon-side value
+        h = np.diff(x)
+        interval = -np.diff(psi)/h
+        half_box = -self.rho[interface:]*np.append(h[interface:], -h[-1])/(2*eps_si)
+        self.E = np.concatenate((interval[:interface], np.append(interval[interface:], interval[-1]) + half_box))
+        '''electric field. units = V/cm'''
+        self.VGB = VGB
+        '''gate-to-bulk bias. units = V'''
+        self.iterations = iterations
+        '''Newton iterations taken'''
+
+    @property
+    def Vscb(self):
+        '''surface potential, the voltage across the substrate space-charge region. units = V'''
+        return self.psi[self.interface]
+
+    @property
+    def Qscb(self):
+        '''charge in the substrate per unit area, balancing the gate and oxide charges. units = C/cm^2'''
+        Qg = eps_ox*(self.psi[0] - self.psi[self.interface])/(self.x[self.interface] - self.x[0])
+        return -(Qg + self.Q_ox)
+
+class MoscapPoisson:
+    '''
+    Nonlinear Poisson solver across the gate oxide and substrate of a MOS capacitor on a graded 1D mesh.
+
+    The oxide is charge-free apart from the fixed and interface-trap charge, held as a sheet at the interface;
+    the substrate holds ionized acceptors and Boltzmann electrons and holes in equilibrium with the bulk.
+    Box integration with the permittivity of each mesh interval keeps the displacement continuous across the
+    interface. The substrate mesh is finest at the interface, where accumulation and inversion layers are a
+    few nm thick. Each solve starts from the previous solution, so a VGB sweep converges in a few iterations
+    per point.
+    '''
+    def __init__(self, Nab, Xox, phi_pm, Q_ox=0, T=300, material: SiliconMaterial = silicon, points=801,
+                 oxide_points=21):
+        '''
+        - Nab = substrate acceptor concentration. units = cm^-3
+        - Xox = gate-oxide thickness. units = cm
+        - phi_pm = contact potential of the gate to the substrate. units = V
+        - Q_ox = fixed-oxide plus interface-trap charge. units = C/cm^2
+        - T = temperature. units = K
+        - material = temperature-dependent silicon parameters
+        - points = number of mesh points, oxide included
+        - oxide_points = number of those in the oxide, interface included
+        '''
+        self.Nab = float(Nab)
+        self.Xox = float(Xox)
+        self.phi_pm = float(phi_pm)
+        self.Q_ox = float(Q_ox)
+        self.T = T
+        self.Vt = material.KbToq(T)
+        self.ratio = (material.ni(T)/self.Nab)**2
+        self.psi = None
+
+        # deep enough for the widest depletion region, at the onset of strong inversion, and its tail
+        debye = np.sqrt(eps_si*self.Vt/(q*self.Nab))
+        phi_fb = self.Vt*np.log(self.Nab/material.ni(T))
+        depth = 1.5*np.sqrt(4*eps_si*phi_fb/(q*self.Nab)) + 10*debye
+        x_si = graded_mesh(depth, points - oxide_points + 1, debye/200)
+        self.x = np.concatenate((np.linspace(-self.Xox, 0, oxide_points)[:-1], x_si))
+        '''mesh positions. units = cm'''
+        self.interface = oxide_points - 1
+        h = np.diff(self.x)
+        silicon_interval = self.x[1:] > 0
+        self.coupling = np.where(silicon_interval, eps_si, eps_ox)/h
+        # the silicon share of each node's box, and the interface sheet charge
+        self.box = np.zeros(points)
+        self.box[:-1] += silicon_interval*h/2
+        self.box[1:] += silicon_interval*h/2
+        self.sheet = np.zeros(points)
+        self.sheet[self.interface] = self.Q_ox
+
+    def solve(self, VGB, tol=1e-12, max_iterations=100) -> MoscapPoissonSolution:
+        '''
+        solves the capacitor at bias VGB, starting from the last solution
+
+        - VGB = gate-to-bulk bias voltage. units = V
+        - tol = convergence tolerance on the Newton update. units = V
+        - max_iterations = iteration limit, past which RuntimeError is raised and the last solution is kept
+        '''
+        Vt, Nab, ratio = self.Vt, self.Nab, self.ratio
+        gate = VGB - self.phi_pm
+        k = self.interface
+        if self.psi is None:
+            psi = np.zeros(len(self.x))
+        else:
+            psi = self.psi.copy()
+        # move the gate to the new bias, with the oxide potential linear up to the interface
+        psi[:k + 1] = gate + (psi[k] - gate)*(self.x[:k + 1] + self.Xox)/self.Xox
+        psi[-1] = 0
+        c = self.coupling
+
+        def residual(psi):
+            u = psi/Vt
+            F = c[1:]*(psi[2:] - psi[1:-1]) - c[:-1]*(psi[1:-1] - psi[:-2]) \
+                + (q*Nab*(np.exp(-u) - ratio*np.exp(u) - 1)*self.box + self.sheet)[1:-1]
+            diagonal = -c[1:] - c[:-1] - (q*Nab/Vt*(np.exp(-u) + ratio*np.exp(u))*self.box)[1:-1]
+            return F, diagonal
+
+        ab = np.empty((3, len(psi) - 2))
+        ab[0, 1:] = ab[2, :-1] = c[1:-1]
+        with np.errstate(over='ignore', invalid='ignore'):
+            for iterations in range(1, max_iterations + 1):
+                F, ab[1, :] = residual(psi)
+                delta = solve_banded((1, 1), ab, -F)/Vt
+                # logarithmic damping of updates beyond kT/q keeps the exponentials in range
+                delta = np.where(np.abs(delta) > 1, np.sign(delta)*(1 + np.log(np.abs(delta))), delta)
+                psi[1:-1] += Vt*delta
+                if Vt*np.max(np.abs(delta)) < tol:
+                    break
+            else:
+                raise RuntimeError(f'MOS capacitor Poisson solution did not converge at VGB = {VGB}')
+
+        self.psi = psi
+        silicon_node = self.x >= 0
+        n = np.where(silicon_node, Nab*ratio*np.exp(psi/Vt), 0)
+        p = np.where(silicon_node, Nab*np.exp(-psi/Vt), 0)
+        return MoscapPoissonSolution(self.x, psi.copy(), n, p, Nab, self.Q_ox, k, VGB, iterations)
@@ -0,0 +1,220 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+import numpy as np
+from scipy.special import erfc, erfcinv
+from solvers import carriers_np as eqs_np
+from solvers import constants as cs
+
+_NODES, _WEIGHTS = np.polynomial.legendre.leggauss(64)
+
+def _majority_mobility(dopant_type, N):
+    return eqs_np.mu_n_maj(N) if dopant_type == 'n' else eqs_np.mu_p_maj(N)
+
+def _sheet_resistance(profile_cls, dopant_type, background, *params):
+    '''
+    1/∫ q µ(N + Nb) (N - Nb) dx over the layer where the profile dopant dominates the background,
+    by 64-point Gauss-Legendre quadrature vectorized over arrays of profile parameters
+    '''
+    arrays = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64) for p in (background,) + params))
+    background, params = arrays[0], arrays[1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x0, x1 = profile_cls._layer(background, *params)
+        half = ((x1 - x0)/2)[..., None]
+        x = (x0 + x1)[..., None]/2 + half*_NODES
+        N = profile_cls._concentration(x, *(p[..., None] for p in params))
+        Nb = background[..., None]
+        sigma = cs.q * _majority_mobility(dopant_type, N + Nb) * np.maximum(N - Nb, 0)
+        Rs = 1/np.sum(sigma*half*_WEIGHTS, axis=-1)
+    return np.where(x1 > x0, Rs, np.inf)[()]
+
+@lru_cache(maxsize=4096)
+def _cached_sheet_resistance(profile_cls, dopant_type, background, *params):
+    return float(_sheet_resistance(profile_cls, dopant_type, background, *params))
+
+class DopingProfile(ABC):
+    '''
+    Base class for a 1D doping profile N(x) of one dopant diffused or implanted into a uniformly doped
+    substrate of the opposite type. x is the depth below the surface in cm.
+
+    Profile parameters may be arrays; every method then broadcasts over them, so a whole process
+    sweep is evaluated in one call. Sheet resistances of scalar profiles are cached per parameter set.
+    '''
+    def __init__(self, dopant_type='n', background=0):
+        if dopant_type not in ('n', 'p'):
+            raise ValueError(f"dopant_type must be 'n' or 'p', not {dopant_type!r}")
+        self.dopant_type = dopant_type
+        ''''n' for a donor profile, 'p' for an acceptor profile'''
+        self.background = background
+        '''substrate doping of the opposite type. units = cm^-3'''
+
+    @abstractmethod
+    def _params(self):
+        '''the profile parameters passed to _concentration and _layer'''
+
+    @staticmethod
+    @abstractmethod
+    def _concentration(x, *params):
+        '''dopant concentration at depths x'''
+
+    @staticmethod
+    @abstractmethod
+    def _layer(background, *params):
+        '''depths (x0, x1) between which the profile is above the background, or above 1e-12 of its peak with no background'''
+
+    def concentration(self, x):
+        '''
+        dopant concentration at depth x. units = cm^-3
+
+        - x = depth below the surface. units = cm
+        '''
+        return self._concentration(np.asarray(x, dtype=np.float64), *self._params())
+
+    def net_doping(self, x):
+        '''
+        profile concentration minus the background doping at depth x. units = cm^-3
+
+        - x = depth below the surface. units = cm
+        '''
+        return self.concentration(x) - self.background
+
+    def conductivity(self, x):
+        '''
+        σ at depth x from the majority-carrier mobility models, 0 past the junction. units = S/cm
+
+        - x = depth below the surface. units = cm
+        '''
+        N = self.concentration(x)
+        return cs.q * _majority_mobility(self.dopant_type, N + self.background) * np.maximum(N - self.background, 0)
+
+    def junction_depth(self):
+        '''metallurgical junction depth x_j, where N(x_j) equals the background doping, inf with no background. units = cm'''
+        background = np.asarray(self.background, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(background > 0, self._layer(background, *self._params())[1], np.inf)[()]
+
+    def sheet_resistance(self):
+        '''R_s = 1/∫ σ(x) dx over the doped layer. units = Ω/□'''
+        params = self._params()
+        if all(np.ndim(p) == 0 for p in (self.background,) + params):
+            return _cached_sheet_resistance(type(self), self.dopant_type, float(self.background), *map(float, params))
+        return _sheet_resistance(type(self), self.dopant_type, self.background, *params)
+
+    def resistance(self, length, width):
+        '''
+        resistance of a resistor of this layer
+
+        - length = resistor length. units = cm
+        - width = resistor width. units = cm
+        '''
+        return self.sheet_resistance() * length / width
+
+class GaussianProfile(DopingProfile):
+    '''ion-implanted profile, N(x) = dose/(sqrt(2π) ΔRp) exp(-(x - Rp)^2/(2ΔRp^2))'''
+    def __init__(self, dose, Rp, dRp, dopant_type='n', background=0):
+        '''
+        - dose = implanted dose. units = cm^-2
+        - Rp = projected range. units = cm
+        - dRp = ΔRp = straggle. units = cm
+        - dopant_type = 'n' for donors, 'p' for acceptors
+        - background = substrate doping of the opposite type. units = cm^-3
+        '''
+        super().__init__(dopant_type, background)
+        self.dose = dose
+        self.Rp = Rp
+        self.dRp = dRp
+
+    def _params(self):
+        return (self.dose, self.Rp, self.dRp)
+
+    @staticmethod
+    def _concentration(x, dose, Rp, dRp):
+        return dose/(np.sqrt(2*np.pi)*dRp) * np.exp(-(x - Rp)**2/(2*dRp**2))
+
+    @staticmethod
+    def _layer(background, dose, Rp, dRp):
+        # x_j = Rp + ΔRp sqrt(2 ln(N_peak/N_B))
+        peak = dose/(np.sqrt(2*np.pi)*dRp)
+        floor = np.where(background > 0, background, 1e-12*peak)
+        reach = dRp*np.sqrt(2*np.log(peak/floor))
+        return np.maximum(Rp - reach, 0), Rp + reach
+
+class ErfcProfile(DopingProfile):
+    '''constant-source diffusion profile, N(x) = Ns erfc(x/(2 sqrt(Dt)))'''
+    def __init__(self, Ns, Dt, dopant_type='n', background=0):
+        '''
+        - Ns = surface concentration. units = cm^-3
+        - Dt = diffusivity-time product. units = cm^2
+        - dopant_type = 'n' for donors, 'p' for acceptors
+        - background = substrate doping of the opposite type. units = cm^-3
+        '''
+        super().__init__(dopant_type, background)
+        self.Ns = Ns
+        self.Dt = Dt
+
+    def _params(self):
+        return (self.Ns, self.Dt)
+
+    @staticmethod
+    def _concentration(x, Ns, Dt):
+        return Ns * erfc(x/(2*np.sqrt(Dt)))
+
+    @staticmethod
+    def _layer(background, Ns, Dt):
+        floor = np.where(background > 0, background, 1e-12*Ns)
+        depth = 2*np.sqrt(Dt)*erfcinv(floor/Ns)
+        return np.zeros_like(depth), depth
+
+class TabulatedProfile(DopingProfile):
+    '''measured or simulated profile, interpolated linearly in log N between tabulated depths'''
+    def __init__(self, x, N, dopant_type='n', background=0):
+        '''
+        - x = increasing depths. units = cm
+        - N = dopant concentration at each depth. units = cm^-3
+        - dopant_type = 'n' for donors, 'p' for acceptors
+        - background = substrate doping of the opposite type. units = cm^-3
+        '''
+        super().__init__(dopant_type, background)
+        self.x = np.array(x, dtype=np.float64)
+        self.N = np.array(N, dtype=np.float64)
+        self.x.flags.writeable = False
+        self.N.flags.writeable = False
+        self._log_N = np.log(self.N)
+
+    def _params(self):
+        return (self.x, self._log_N)
+
+    @staticmethod
+    def _concentration(x, x_table, log_N):
+        return np.exp(np.interp(x, x_table, log_N))
+
+    @staticmethod
+    def _layer(background, x, log_N):
+        '''
+        the first tabulated depth and the last crossing of N(x) below the background, or the last tabulated depth
+        if N(x) ends above it. The layer is empty, x0 == x1, if N(x) never rises above the background.
+        '''
+        above = np.exp(log_N) > background
+        if not above.any():
+            return x[0], x[0]
+        if above[-1]:
+            return x[0], x[-1]
+        i = np.flatnonzero(above)[-1]
+        # log-linear interpolation between the last point above and the first point below
+        s = (np.log(background) - log_N[i])/(log_N[i + 1] - log_N[i])
+        return x[0], x[i] + s*(x[i + 1] - x[i])
+
+    def junction_depth(self):
+        '''depth of the last crossing of N(x) below the background, inf if it never crosses and nan if N(x) is never above it. units = cm'''
+        x0, x1 = self._layer(self.background, *self._params())
+        if x1 == x0:
+            return np.nan
+        return np.inf if self.N[-1] > self.background else x1
+
+    def sheet_resistance(self):
+        '''R_s = 1/∫ σ(x) dx over the tabulated depths, by the trapezoid rule, inf if N(x) is never above the background. units = Ω/□'''
+        x0, x1 = self._layer(self.background, *self._params())
+        if x1 == x0:
+            return np.inf
+        x = np.append(self.x[self.x < x1], x1)
+        sigma = self.conductivity(x)
+        return 1/np.sum((sigma[1:] + sigma[:-1])*np.diff(x))*2
@@ -1,5 +1,8 @@
 from solvers import constants as cs
+from solvers.materials import SiliconMaterial, silicon
 from sympy import exp, symbols, pi, sqrt
+import numpy as np
+import math
 
 def fermiDirac(E=symbols("E"), EF=symbols("EF"), KbT=symbols("KbT"), numerical=False):
     '''
@@ -47,6 +50,119 @@ def gv(E=symbols("E"), Ev=symbols("Ev"), mpdos=symbols("mpdos"), numerical=False
     p2 = (2*mpdos/(cs.hbar**2))**(3/2)
     p3 = sqrt(Ev - E)
     return p1 * p2 * p3
+
+_FD_TABLE_START = -10.0
+_FD_TABLE_STOP = 50.0
+_FD_TABLE_STEP = 0.02
+_fd_table = None
+
+def _fermi_dirac_table():
+    '''
+    F_1/2, F_-1/2 and F_-3/2 on a uniform η grid, built on first use
+
+    The integrals are taken over t = sqrt(x) with composite 8-point Gauss-Legendre, which is smooth for all
+    three orders, and are accurate to about 1e-14.
+    '''
+    global _fd_table
+    if _fd_table is not None:
+        return _fd_table
+
+    eta = np.arange(_FD_TABLE_START, _FD_TABLE_STOP + _FD_TABLE_STEP/2, _FD_TABLE_STEP)
+    nodes, weights = np.polynomial.legendre.leggauss(8)
+    edges = np.linspace(0, math.sqrt(_FD_TABLE_STOP + 40), 200)
+    half = np.diff(edges)/2
+    t = ((edges[:-1] + half)[:, None] + half[:, None]*nodes).ravel()
+    w = (half[:, None]*weights).ravel()
+
+    table = np.empty((3, eta.size))
+    for start in range(0, eta.size, 256):
+        u = t**2 - eta[start:start + 256, None]
+        occupancy = 0.5*(1 - np.tanh(u/2))
+        table[0, start:start + 256] = (4/math.sqrt(math.pi))*((t**2*occupancy) @ w)
+        table[1, start:start + 256] = (2/math.sqrt(math.pi))*(occupancy @ w)
+        table[2, start:start + 256] = (0.5/math.sqrt(math.pi))*((1/np.cosh(u/2)**2) @ w)
+    _fd_table = table
+    return table
+
+def _fermi_dirac(eta, order):
+    '''interpolates F_j, j = 1/2 (order 0) or -1/2 (order 1), with cubic Hermite splines through F_j and F_j' = F_j-1'''
+    eta = np.asarray(eta, dtype=np.float64)
+    table = _fermi_dirac_table()
+    j = 0.5 - order
+    out = np.empty(eta.shape)
+
+    low = eta < _FD_TABLE_START
+    high = eta > _FD_TABLE_STOP
+    undefined = np.isnan(eta)
+    inside = ~(low | high | undefined)
+    out[undefined] = np.nan
+
+    # nondegenerate tail: F_j(η) = Σ (-1)^(k+1) e^(kη) / k^(j+1)
+    e = np.exp(eta[low])
+    out[low] = e*(1 - e/2**(j + 1) + e**2/3**(j + 1) - e**3/4**(j + 1))
+
+    # degenerate tail: Sommerfeld expansion
+    x = eta[high]
+    coefficients = (1, math.pi**2/6, 7*math.pi**4/360, 31*math.pi**6/15120)
+    total = np.zeros(x.shape)
+    falling = 1.0
+    for k, c in enumerate(coefficients):
+        total += c*falling*x**(-2*k)
+        falling *= (j + 1 - 2*k)*(j - 2*k)
+    out[high] = x**(j + 1)/math.gamma(j + 2)*total
+
+    position = (eta[inside] - _FD_TABLE_START)/_FD_TABLE_STEP
+    i = np.minimum(position.astype(np.intp), table.shape[1] - 2)
+    s = position - i
+    f0, f1 = table[order, i], table[order, i + 1]
+    d0, d1 = table[order + 1, i]*_FD_TABLE_STEP, table[order + 1, i + 1]*_FD_TABLE_STEP
+    s2 = s*s
+    s3 = s2*s
+    out[inside] = (2*s3 - 3*s2 + 1)*f0 + (s3 - 2*s2 + s)*d0 + (3*s2 - 2*s3)*f1 + (s3 - s2)*d1
+    return out[()]
+
+def fermi_dirac_half(eta):
+    '''
+    Fermi-Dirac integral F_1/2(η) = (2/√π) ∫ sqrt(x)/(1 + exp(x - η)) dx from 0 to ∞, vectorized over η
+
+    normalized so F_1/2(η) -> exp(η) in the nondegenerate limit, which makes n = Nc F_1/2((EF - Ec)/kT).
+    Relative error is below 1e-9 for all η.
+
+    - eta = η = reduced Fermi level, (EF - Ec)/kT for electrons or (Ev - EF)/kT for holes
+    '''
+    return _fermi_dirac(eta, 0)
+
+def fermi_dirac_minus_half(eta):
+    '''
+    Fermi-Dirac integral F_-1/2(η) = (1/√π) ∫ x^(-1/2)/(1 + exp(x - η)) dx from 0 to ∞, vectorized over η
+
+    F_-1/2 is the derivative of F_1/2 with respect to η
+
+    - eta = η = reduced Fermi level
+    '''
+    return _fermi_dirac(eta, 1)
+
+def n_fermi_dirac(Ec, EF, T=300, material: SiliconMaterial = silicon):
+    '''
+    electron concentration n◦ at thermal equilibrium with Fermi-Dirac statistics, Nc F_1/2((EF - Ec)/kT)
+
+    - Ec = conduction band energy
+    - EF = Fermi energy
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    '''
+    return material.Nc(T) * fermi_dirac_half((np.asarray(EF) - Ec)/material.KbToq(T))
+
+def p_fermi_dirac(EF, Ev, T=300, material: SiliconMaterial = silicon):
+    '''
+    hole concentration p◦ at thermal equilibrium with Fermi-Dirac statistics, Nv F_1/2((Ev - EF)/kT)
+
+    - EF = Fermi energy
+    - Ev = valence band energy
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    '''
+    return material.Nv(T) * fermi_dirac_half((np.asarray(Ev) - EF)/material.KbToq(T))
     
     
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+import numpy as np
+from solvers.materials import SiliconMaterial, silicon
+
+FC = 0.5
+'''fraction of vbi above which the depletion capacitance is extended linearly, as in SPICE'''
+
+_GAMMA = 1 + 1/np.sqrt(2)
+
+def _hermite(s, step, y0, f0, y1, f1):
+    '''cubic Hermite interpolant at fraction s of a step'''
+    return (1 + 2*s)*(1 - s)**2*y0 + s*(1 - s)**2*step*f0 + s**2*(3 - 2*s)*y1 - s**2*(1 - s)*step*f1
+
+def rosenbrock(rate, slope, y, t_end, samples, rtol, atol, levels):
+    '''
+    integrates independent scalar ODEs dy/dt = rate(y, i) from 0 to t_end with the L-stable two-stage
+    Rosenbrock method ROS2, each element with its own adaptive step size
+
+    returns the output times, y at those times, by cubic Hermite interpolation within the steps, and the
+    first times y falls below each of its levels, located on the same interpolant (nan if it never does)
+
+    - rate, slope = f(y, i) and df/dy(y, i) for the elements of index array i
+    - y = initial values, one per element; advanced in place to the values at t_end
+    - t_end = end time
+    - samples = number of equally spaced output times
+    - rtol, atol = relative and absolute error tolerances on y
+    - levels = (elements, number of levels) array of crossing levels
+    '''
+    K = len(y)
+    t_out = np.linspace(0, t_end, samples)
+    out = np.empty((K, samples))
+    out[:, 0] = y
+    crossings = np.full(levels.shape, np.nan)
+    t = np.zeros(K)
+    f = rate(y, np.arange(K))
+    h = np.full(K, t_end*1e-9)
+    following = np.ones(K, dtype=int)
+    active = np.arange(K)
+    while len(active):
+        ya, fa, ha = y[active], f[active], h[active]
+        denominator = 1 - _GAMMA*ha*slope(ya, active)
+        k1 = fa/denominator
+        k2 = (rate(ya + ha*k1, active) - 2*k1)/denominator
+        y_new = ya + ha*(1.5*k1 + 0.5*k2)
+        # the embedded first-order solution is ya + ha k1
+        error = np.abs(0.5*ha*(k1 + k2))/(atol + rtol*np.maximum(np.abs(ya), np.abs(y_new)))
+        error = np.where(np.isfinite(error), error, np.inf)
+        accept = error <= 1
+
+        done = active[accept]
+        if len(done):
+            t0, t1 = t[done], t[done] + h[done]
+            y0, y1, f0 = y[done], y_new[accept], f[done]
+            f1 = rate(y1, done)
+            step = t1 - t0
+            # fill every output time this step passed, for all accepted elements at once
+            last = np.searchsorted(t_out, t1, side='right')
+            first = following[done]
+            count = np.maximum(last - first, 0)
+            if count.any():
+                j = np.repeat(np.arange(len(done)), count)
+                index = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count) + first[j]
+                s = (t_out[index] - t0[j])/step[j]
+                out[done[j], index] = _hermite(s, step[j], y0[j], f0[j], y1[j], f1[j])
+                following[done] = np.maximum(first, last)
+            # bisect the interpolant for levels crossed during this step
+            row, column = np.nonzero((y0[:, None] >= levels[done]) & (y1[:, None] < levels[done])
+                                     & np.isnan(crossings[done]))
+            if len(row):
+                level = levels[done[row], column]
+                low, high = np.zeros(len(row)), np.ones(len(row))
+                for _ in range(40):
+                    middle = (low + high)/2
+                    above = _hermite(middle, step[row], y0[row], f0[row], y1[row], f1[row]) >= level
+                    low, high = np.where(above, middle, low), np.where(above, high, middle)
+                crossings[done[row], column] = t0[row] + step[row]*(low + high)/2
+            t[done], y[done], f[done] = t1, y1, f1
+
+        factor = np.clip(0.9/np.sqrt(np.maximum(error, 1e-10)), 0.2, 5)
+        h[active] = ha*factor
+        active = active[t[active] < t_end*(1 - 1e-12)]
+        h[active] = np.minimum(h[active], t_end - t[active])
+    return t_out, out, crossings
+
+def _charge_control(I_S, C_j0, vbi, I_before, I_after, tau, R, T, material, t_end, samples, rtol, atol, levels):
+    '''switching_transient, also returning the first times the junction voltage falls below each of levels'''
+    arrays = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (I_S, C_j0, vbi, I_before, I_after, tau, R)))
+    shape = arrays[0].shape
+    I_S, C_j0, vbi, I_before, I_after, tau, R = (x.ravel() for x in arrays)
+    levels = np.broadcast_to(levels, shape + levels.shape[-1:]).reshape(I_S.size, levels.shape[-1])
+    Vt = material.KbToq(T)
+
+    v0 = Vt*np.log1p(I_before/I_S)
+    v_source = I_after*R
+    if t_end is None:
+        storage = tau*np.log1p(np.maximum(I_before, 0)/np.maximum(np.abs(I_after), 1e-300))
+        t_end = np.max(storage + 3*tau + 10*R*C_j0)
+    edge = FC*vbi
+    linear = C_j0/(1 - FC)**1.5
+
+    def capacitance(v, i):
+        '''total junction capacitance and its derivative'''
+        below = v < edge[i]
+        depletion = np.where(below, C_j0[i]/np.sqrt(np.abs(1 - v/vbi[i])), linear[i]*(1 - 1.5*FC + 0.5*v/vbi[i]))
+        d_depletion = np.where(below, C_j0[i]/(2*vbi[i])/np.abs(1 - v/vbi[i])**1.5, linear[i]*0.5/vbi[i])
+        diffusion = tau[i]*I_S[i]/Vt*np.exp(v/Vt)
+        return depletion + diffusion, d_depletion + diffusion/Vt
+
+    def current(v, i):
+        return (v_source[i] - v)/R[i] - I_S[i]*np.expm1(v/Vt)
+
+    def rate(v, i):
+        return current(v, i)/capacitance(v, i)[0]
+
+    def slope(v, i):
+        C, dC = capacitance(v, i)
+        d_current = -1/R[i] - I_S[i]/Vt*np.exp(v/Vt)
+        return (d_current*C - current(v, i)*dC)/C**2
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        t, v, crossings = rosenbrock(rate, slope, v0, t_end, samples, rtol, atol, levels)
+    i = (v_source[:, None] - v)/R[:, None]
+    transient = {'t': t, 'i': i.reshape(shape + (samples,)), 'v': v.reshape(shape + (samples,))}
+    return transient, crossings.reshape(shape + levels.shape[-1:])
+
+def switching_transient(I_S, C_j0, vbi, I_before, I_after, tau, R=1e3, T=300, material: SiliconMaterial = silicon,
+                        t_end=None, samples=2001, rtol=1e-5, atol=1e-7):
+    '''
+    charge-control transient of a diode driven through a resistor R by a source that steps at t = 0
+
+    The stored diffusion charge follows the junction voltage v, Q = τ I_S (exp(v/Vt) - 1), so
+    i = dQ/dt + Q/τ + C_dep(v) dv/dt with i = (v_source - v)/R. The diode starts in steady state at I_before and
+    the source then steps to R I_after, so the current after the step is close to I_after when R |I_after| is
+    large against the junction voltage, as in the textbook treatment. Every element of the broadcast
+    parameters is one independent circuit, integrated by a stiff Rosenbrock method with its own step sizes.
+
+    returns a dict with the times 't' and arrays 'i' and 'v' of the current and junction voltage, with time
+    along the last axis. units = s, A, V
+
+    - I_S = diffusion saturation current. units = A
+    - C_j0 = zero-bias depletion capacitance. units = F
+    - vbi = built-in voltage. units = V
+    - I_before = forward current before the step, 0 or more. units = A
+    - I_after = source level after the step divided by R, negative for turn-off. units = A
+    - tau = stored-charge lifetime. units = s
+    - R = source resistance. units = Ω
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - t_end = end time; a few lifetimes past the charge-control storage time when omitted. units = s
+    - samples = number of output times
+    - rtol, atol = integrator tolerances on v. units = V
+    '''
+    return _charge_control(I_S, C_j0, vbi, I_before, I_after, tau, R, T, material, t_end, samples, rtol, atol,
+                           np.empty(0))[0]
+
+def reverse_recovery(I_S, C_j0, vbi, IF, IR, tau, R=1e3, T=300, material: SiliconMaterial = silicon,
+                     t_end=None, samples=2001, rtol=1e-5, atol=1e-7):
+    '''
+    turn-off transient of a diode switched from forward current IF to a reverse source of -IR·R through R
+    at t = 0, batched over broadcast arrays of the parameters
+
+    While charge is stored, the reverse current is IR + v/R, not IR: the forward junction voltage v adds to
+    the source. The charge is therefore removed faster than in the ideal charge-control picture.
+
+    returns the dict of switching_transient with also
+    - 't_s' = storage time, until the junction voltage reaches 0; this includes the junction-voltage
+      correction, so it is shorter than τ·ln(1 + IF/IR). units = s
+    - 't_rr' = reverse-recovery time, until the reverse current has decayed to 0.1 IR. units = s
+
+    - I_S = diffusion saturation current. units = A
+    - C_j0 = zero-bias depletion capacitance. units = F
+    - vbi = built-in voltage. units = V
+    - IF = forward current before turn-off. units = A
+    - IR = magnitude of the reverse source level divided by R. units = A
+    - tau = stored-charge lifetime. units = s
+    - R = source resistance. units = Ω
+    - T = temperature. units = K
+    - material = temperature-dependent silicon parameters
+    - t_end = end time; a few lifetimes past the charge-control storage time when omitted. units = s
+    - samples = number of output times
+    - rtol, atol = integrator tolerances on v. units = V
+    '''
+    # the reverse current has decayed to 0.1 IR where v = v_source + 0.1 IR R = -0.9 IR R
+    IR = np.asarray(IR, dtype=np.float64)
+    levels = np.stack(np.broadcast_arrays(0.0, -0.9*IR*np.asarray(R, dtype=np.float64)), axis=-1)
+    transient, crossings = _charge_control(I_S, C_j0, vbi, IF, -IR, tau, R, T, material, t_end, samples,
+                                           rtol, atol, levels)
+    transient['t_s'] = crossings[..., 0][()]
+    transient['t_rr'] = crossings[..., 1][()]
+    return transient
@@ -1,11 +1,29 @@
 from solvers import carriers as eqs
+from solvers import carriers_np as eqs_np
 from solvers import constants as cs
-from sympy import sqrt, symbols
+from solvers.dependencies import Calculated, calculates
+from solvers.fermi import charge_neutrality
+from solvers.materials import SiliconMaterial, silicon
+from solvers.numeric import sqrt, ln, is_number, placeholders
+import numpy as np
 
-class Silicon:
-    def __init__(self):
+class Silicon(Calculated):
+    '''
+    A uniformly doped silicon sample.
+    Temperature is a scalar T; use SiliconArray for batches over doping and temperature.
+    '''
+    def __init__(self, numeric: bool = False, material: SiliconMaterial = None):
         self._docalc = False
         
+        self.numeric = numeric
+        '''numeric-only mode: unset quantities are NaN instead of sympy Symbols and all arithmetic stays in NumPy'''
+        symbols = placeholders(numeric)
+        
+        self.material = silicon if material is None else material
+        '''temperature-dependent silicon parameters (ni, Nc, Nv, Eg, kT/q)'''
+        self.T = 300
+        '''temperature; scalar only. units = K'''
+        
         self.ATOM_CONCENTRATION = 5e22
         '''5e22 atoms/cm^3' in a silicon crystal'''
         self.UNIT_CELL_VOLUME = 5.43095**3
@@ -28,6 +46,12 @@ class Silicon:
         
         self.compensation_threshold = 5
         
+        self.solve_neutrality = False
+        '''solve charge neutrality with incomplete ionization and Fermi-Dirac statistics instead of using the closed forms'''
+        
+        self.EF = symbols("E_F")
+        '''Fermi level, measured from the valence band edge. units = eV'''
+        
         self.n = symbols("n") 
         '''electron concentration. units = cm^-3'''
         self.p = symbols("p") 
@@ -41,6 +65,9 @@ class Silicon:
         self.e_field = 0
         '''electric field strength units = V/cm'''
         
+        self.velocity_saturation = False
+        '''use the Caughey-Thomas field-dependent mobility for drift velocities and currents'''
+        
         self.rec_life_n = symbols("τ_rec_N") 
         '''τ_rec,P = τ_n,P - electron recombination lifetime. units = s'''
         self.rec_life_p = symbols("τ_rec_P") 
@@ -109,57 +136,20 @@ class Silicon:
         
         self._docalc = True
         
-        self.__calculate()
+        self._calculate(Silicon)
     
-    def lock(self, name):
-        self.value_lock.append(name)
-        
-    def set_lock(self, name, value):
-        self.__setattr__(name, value)
-        self.lock(name)
-        
-    def unlock(self, name):
-        if name in self.value_lock:
-            self.value_lock.remove(name)
-            
-    def __setattr__(self, __name: str, __value) -> None:
-        if 'value_lock' in self.__dict__ and __name in self.value_lock:
+    @calculates('v_n_drift', 'v_p_drift', 'J_n_drift', 'J_p_drift', 'J_x_drift',
+                depends_on=('mu_n', 'mu_p', 'n', 'p', 'e_field', 'conductivity', 'velocity_saturation', 'T', 'material'))
+    def __calc_v_j_drift(self):
+        if self.velocity_saturation:
+            vsat_n, beta_n, vsat_p, beta_p = self.__saturation()
+            self.v_n_drift = eqs.v_drift_n_high_field(self.mu_n, self.e_field, vsat_n, beta_n)
+            self.v_p_drift = eqs.v_drift_p_high_field(self.mu_p, self.e_field, vsat_p, beta_p)
+            self.J_n_drift = eqs.J_drift_n_high_field(self.mu_n, self.n, self.e_field, vsat_n, beta_n)
+            self.J_p_drift = eqs.J_drift_p_high_field(self.mu_p, self.p, self.e_field, vsat_p, beta_p)
+            self.J_x_drift = self.J_n_drift + self.J_p_drift
             return
-        self.__dict__[__name] = __value
-        if self._docalc and __name != '_docalc':
-            self._docalc = False
-            self.__calculate()
-            self._docalc = True
-    
-    def __calculate(self):
-        # print('calculating from silicon')
-        self._docalc = False
-        
-        if  (type(self.Na) in [int, float] and type(self.Nd) in [int, float]):
-        
-            self.n = self.Nd
-            self.p = self.Na
-                
-            if self.Na > self.Nd:
-                self.is_p_type = True
-                self.is_n_type = False
-            elif self.Nd > self.Na:
-                self.is_n_type = True
-                self.is_p_type = False
-            
-        self.__calc_n_p()
-        self.__calc_mobilty()
-        self.__calc_rec_gen()
-        self.__calc_diffusivity()
-        self.__calc_diff_length()
-        self.__calc_conductivity_resistivity()
-        self.__calc_debye_length()
-        self.__calc_v_j_drift()
-        self.__calc_diff_length()
-        
-        self._docalc = True
         
-    def __calc_v_j_drift(self):
         self.v_n_drift = eqs.v_drift_n(self.mu_n, self.e_field)
         self.v_p_drift = eqs.v_drift_p(self.mu_p, self.e_field)
         
@@ -171,31 +161,81 @@ class Silicon:
         else:
             self.J_x_drift = self.J_n_drift + self.J_p_drift
     
+    def __saturation(self):
+        m, T = self.material, self.T
+        return m.vsat_n(T), m.beta_n(T), m.vsat_p(T), m.beta_p(T)
+    
+    def drift_velocity(self, E):
+        '''
+        electron and hole drift velocities with velocity saturation, vectorized over field strengths
+        
+        returns (v_n, v_p). units = cm/s
+        
+        - E = electric field strengths. units = V/cm
+        '''
+        vsat_n, beta_n, vsat_p, beta_p = self.__saturation()
+        return (eqs_np.v_drift_n_high_field(self.mu_n, E, vsat_n, beta_n),
+                eqs_np.v_drift_p_high_field(self.mu_p, E, vsat_p, beta_p))
+    
+    def drift_current(self, E):
+        '''
+        electron and hole drift current densities with velocity saturation, vectorized over field strengths
+        
+        returns (J_n, J_p). units = A/cm^2
+        
+        - E = electric field strengths. units = V/cm
+        '''
+        vsat_n, beta_n, vsat_p, beta_p = self.__saturation()
+        return (eqs_np.J_drift_n_high_field(self.mu_n, self.n, E, vsat_n, beta_n),
+                eqs_np.J_drift_p_high_field(self.mu_p, self.p, E, vsat_p, beta_p))
+    
+    @calculates('n', 'p', 'EF', 'is_n_type', 'is_p_type', 'is_degenerate',
+                depends_on=('Na', 'Nd', 'compensation_threshold', 'solve_neutrality', 'T', 'material'))
     def __calc_n_p(self):
-        if not (type(self.Na) in [int, float] and type(self.Nd) in [int, float]):
+        if not (is_number(self.Na) and is_number(self.Nd)):
             return
+        ni = self.material.ni(self.T)
+        
+        self.n = self.Nd
+        self.p = self.Na
+        
+        if self.Na > self.Nd:
+            self.is_p_type = True
+            self.is_n_type = False
+        elif self.Nd > self.Na:
+            self.is_n_type = True
+            self.is_p_type = False
+        
+        if self.solve_neutrality:
+            EF, n, p = charge_neutrality(self.Na, self.Nd, self.T, self.material)
+            self.EF, self.n, self.p = float(EF), float(n), float(p)
         # if compensated silicon
-        if self.Na > 0 and self.Nd > 0:
+        elif self.Na > 0 and self.Nd > 0:
             rel = self.Na/self.Nd
             if rel > (1/self.compensation_threshold) and rel < self.compensation_threshold:
                 if self.is_p_type:
-                    self.p = (1/2) * ((self.Na - self.Nd) + sqrt((self.Na - self.Nd)**2 + 4*cs.ni**2))
-                    self.n = cs.ni**2/self.p
+                    self.p = (1/2) * ((self.Na - self.Nd) + sqrt((self.Na - self.Nd)**2 + 4*ni**2))
+                    self.n = ni**2/self.p
                 elif self.is_n_type:
-                    self.n = (1/2) * ((self.Nd - self.Na) + sqrt((self.Nd - self.Na)**2 + 4*cs.ni**2))
-                    self.p = cs.ni**2/self.n
+                    self.n = (1/2) * ((self.Nd - self.Na) + sqrt((self.Nd - self.Na)**2 + 4*ni**2))
+                    self.p = ni**2/self.n
         elif self.Na > self.Nd:
             self.p = self.Na
-            self.n = cs.ni**2/self.Na
+            self.n = ni**2/self.Na
         elif self.Na < self.Nd:
             self.n = self.Nd
-            self.p = cs.ni**2/self.Nd
+            self.p = ni**2/self.Nd
         else: # Nd == Na
-            self.p = cs.ni
-            self.n = cs.ni
+            self.p = ni
+            self.n = ni
+        
+        if not self.solve_neutrality:
+            self.EF = self.material.KbToq(self.T) * ln(self.material.Nv(self.T)/self.p)
         
-        self.is_degenerate = (self.is_n_type and self.n > cs.Nc) or (self.is_p_type and self.p > cs.Nv)
+        self.is_degenerate = (self.is_n_type and self.n > self.material.Nc(self.T)) or (self.is_p_type and self.p > self.material.Nv(self.T))
     
+    @calculates('rec_life_n', 'rec_life_p', 'gen_life_n', 'gen_life_p',
+                depends_on=('Na', 'Nd', 'is_n_type', 'is_p_type'))
     def __calc_rec_gen(self):
         
         if not (self.is_n_type or self.is_p_type):
@@ -215,6 +255,8 @@ class Silicon:
             self.rec_life_p = eqs.rec_life_n(self.Nd)
             self.gen_life_p = eqs.gen_life_n(self.Nd)
         
+    @calculates('n_diffusion_length', 'p_diffusion_length',
+                depends_on=('Dn', 'Dp', 'rec_life_n', 'rec_life_p', 'is_n_type', 'is_p_type'))
     def __calc_diff_length(self):
         '''
         this is wrong, look at equation
@@ -229,6 +271,7 @@ class Silicon:
         elif self.is_p_type:
             self.n_diffusion_length = eqs.diffusion_length(self.Dn, self.rec_life_n)
         
+    @calculates('mu_n', 'mu_p', depends_on=('Na', 'Nd', 'is_n_type', 'is_p_type'))
     def __calc_mobilty(self):
         if not (self.is_n_type or self.is_p_type):
             return
@@ -240,9 +283,13 @@ class Silicon:
             self.mu_n = eqs.mu_n_min(self.Na)
             self.mu_p = eqs.mu_p_maj(self.Na)
     
+    @calculates('Dn', 'Dp', 'rec_len_n', 'rec_len_p', 'gen_len_n', 'gen_len_p',
+                depends_on=('mu_n', 'mu_p', 'rec_life_n', 'rec_life_p', 'gen_life_n', 'gen_life_p',
+                            'is_n_type', 'is_p_type', 'T', 'material'))
     def __calc_diffusivity(self):
-        self.Dn = eqs.diffusivity(self.mu_n)
-        self.Dp = eqs.diffusivity(self.mu_p)
+        KbToq = self.material.KbToq(self.T)
+        self.Dn = eqs.diffusivity(self.mu_n, KbToq)
+        self.Dp = eqs.diffusivity(self.mu_p, KbToq)
         
         if not (self.is_n_type or self.is_p_type):
             return
@@ -254,13 +301,16 @@ class Silicon:
             self.rec_len_n = sqrt(self.Dn * self.rec_life_n)
             self.gen_len_n = sqrt(self.Dn * self.gen_life_n)
     
+    @calculates('conductivity', 'resistivity', 'resistance', 'dielectric_relxation_time',
+                depends_on=('mu_n', 'mu_p', 'length', 'area'))
     def __calc_conductivity_resistivity(self):
         self.conductivity = eqs.conductivity(self.mu_n, self.mu_p)
         self.resistivity = 1/self.conductivity
         self.resistance = eqs.resistance_from_resistivity(self.resistivity, self.length, self.area)
         self.dielectric_relxation_time = cs.eps_si / self.conductivity
-        self.__calc_debye_length()
     
+    @calculates('n_debye_length', 'p_debye_length',
+                depends_on=('Dn', 'Dp', 'dielectric_relxation_time', 'is_n_type', 'is_p_type'))
     def __calc_debye_length(self):
         if not (self.is_n_type or self.is_p_type):
             return
@@ -272,4 +322,187 @@ class Silicon:
             self.n_debye_length = eqs.debye_length(self.Dn, self.dielectric_relxation_time)
         elif self.is_p_type:
             self.p_debye_length = eqs.debye_length(self.Dp, self.dielectric_relxation_time)
-    
\ No newline at end of file
+    
+
+class SiliconArray:
+    '''
+    Struct-of-arrays counterpart to Silicon.
+
+    Holds the doping-dependent quantities of many silicon samples as contiguous float64 arrays,
+    all computed in one vectorized pass. Quantities that Silicon leaves unset for a sample
+    (e.g. the hole lifetime of a p-type sample) are NaN.
+    '''
+    FIELDS = (
+        'Na', 'Nd', 'T', 'EF', 'n', 'p', 'mu_n', 'mu_p',
+        'rec_life_n', 'rec_life_p', 'gen_life_n', 'gen_life_p',
+        'Dn', 'Dp', 'n_diffusion_length', 'p_diffusion_length',
+        'conductivity', 'resistivity', 'resistance', 'dielectric_relxation_time',
+        'n_debye_length', 'p_debye_length',
+        'is_n_type', 'is_p_type', 'is_degenerate',
+    )
+
+    def __init__(self, Na, Nd, compensation_threshold=5, length=1, area=1, T=300, material: SiliconMaterial = None,
+                 solve_neutrality=False):
+        '''
+        - Na = acceptor doping concentrations. units = cm^-3
+        - Nd = donor doping concentrations. units = cm^-3
+        - compensation_threshold = Na/Nd ratio inside which the compensated closed form is used
+        - length = length of the samples. units = cm
+        - area = area of the samples. units = cm^2
+        - T = temperatures, broadcast against Na and Nd. units = K
+        - material = temperature-dependent silicon parameters
+        - solve_neutrality = solve charge neutrality with incomplete ionization and Fermi-Dirac statistics instead of using the closed forms
+        '''
+        Na, Nd, T = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (Na, Nd, T)))
+        self.Na = np.ascontiguousarray(Na)
+        '''acceptor doping concentration. units = cm^-3'''
+        self.Nd = np.ascontiguousarray(Nd)
+        '''donor doping concentration. units = cm^-3'''
+        self.T = np.ascontiguousarray(T)
+        '''temperature. units = K'''
+        self.material = silicon if material is None else material
+        '''temperature-dependent silicon parameters (ni, Nc, Nv, Eg, kT/q)'''
+        self.compensation_threshold = compensation_threshold
+        self.solve_neutrality = solve_neutrality
+        self.length = length
+        '''length of the samples. units = cm'''
+        self.area = area
+        '''area of the samples. units = cm^2'''
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.__calculate()
+
+    def __calculate(self):
+        Na, Nd = self.Na, self.Nd
+
+        self.is_p_type = Na > Nd
+        self.is_n_type = Nd > Na
+        self.__calc_n_p()
+        self.__calc_mobility()
+        self.__calc_rec_gen()
+
+        KbToq = self.material.KbToq(self.T)
+        self.Dn = eqs_np.diffusivity(self.mu_n, KbToq)
+        self.Dp = eqs_np.diffusivity(self.mu_p, KbToq)
+        self.n_diffusion_length = eqs_np.diffusion_length(self.Dn, self.rec_life_n)
+        self.p_diffusion_length = eqs_np.diffusion_length(self.Dp, self.rec_life_p)
+
+        self.conductivity = eqs_np.conductivity(self.mu_n, self.mu_p)
+        self.resistivity = 1/self.conductivity
+        self.resistance = eqs_np.resistance_from_resistivity(self.resistivity, self.length, self.area)
+        self.dielectric_relxation_time = cs.eps_si / self.conductivity
+
+        nan = np.full(Na.shape, np.nan)
+        self.n_debye_length = np.where(self.is_n_type, eqs_np.debye_length(self.Dn, self.dielectric_relxation_time), nan)
+        self.p_debye_length = np.where(self.is_p_type, eqs_np.debye_length(self.Dp, self.dielectric_relxation_time), nan)
+
+    def __calc_n_p(self):
+        Na, Nd = self.Na, self.Nd
+        if self.solve_neutrality:
+            EF, n, p = charge_neutrality(Na, Nd, self.T, self.material)
+            self.__set_n_p(np.asarray(EF), np.asarray(n), np.asarray(p))
+            return
+        
+        ni = self.material.ni(self.T)
+        ni2 = ni**2
+
+        n = Nd.copy()
+        p = Na.copy()
+
+        # compensated silicon, same closed forms as Silicon
+        compensated = (Na > 0) & (Nd > 0)
+        rel = Na/Nd
+        window = compensated & (rel > 1/self.compensation_threshold) & (rel < self.compensation_threshold)
+        root = np.sqrt((Na - Nd)**2 + 4*ni2)
+        comp_p = window & self.is_p_type
+        comp_n = window & self.is_n_type
+        p = np.where(comp_p, 0.5*((Na - Nd) + root), p)
+        n = np.where(comp_p, ni2/p, n)
+        n = np.where(comp_n, 0.5*((Nd - Na) + root), n)
+        p = np.where(comp_n, ni2/n, p)
+
+        # uncompensated silicon
+        only_p = ~compensated & (Na > Nd)
+        only_n = ~compensated & (Na < Nd)
+        intrinsic = ~compensated & (Na == Nd)
+        n = np.where(only_p, ni2/Na, n)
+        p = np.where(only_n, ni2/Nd, p)
+        n = np.where(intrinsic, ni, n)
+        p = np.where(intrinsic, ni, p)
+
+        EF = self.material.KbToq(self.T) * np.log(self.material.Nv(self.T)/p)
+        self.__set_n_p(EF, n, p)
+
+    def __set_n_p(self, EF, n, p):
+        self.EF = EF
+        '''Fermi level, measured from the valence band edge. units = eV'''
+        self.n = n
+        '''electron concentration. units = cm^-3'''
+        self.p = p
+        '''hole concentration. units = cm^-3'''
+        self.is_degenerate = (self.is_n_type & (n > self.material.Nc(self.T))) | (self.is_p_type & (p > self.material.Nv(self.T)))
+
+    def __calc_mobility(self):
+        nan = np.nan
+        self.mu_n = np.where(self.is_n_type, eqs_np.mu_n_maj(self.Nd), np.where(self.is_p_type, eqs_np.mu_n_min(self.Na), nan))
+        '''μ_n, electron mobility units = cm^2/V⋅s'''
+        self.mu_p = np.where(self.is_n_type, eqs_np.mu_p_min(self.Nd), np.where(self.is_p_type, eqs_np.mu_p_maj(self.Na), nan))
+        '''μ_p, hole mobility. units = cm^2/V⋅s'''
+
+    def __calc_rec_gen(self):
+        nan = np.nan
+        self.rec_life_n = np.where(self.is_p_type, eqs_np.rec_life_p(self.Na), nan)
+        '''τ_rec,P = τ_n,P - electron recombination lifetime. units = s'''
+        self.gen_life_n = np.where(self.is_p_type, eqs_np.gen_life_p(self.Na), nan)
+        '''τ_gen,P = τ_n,P - minority electron generation lifetime. units = s'''
+        self.rec_life_p = np.where(self.is_n_type, eqs_np.rec_life_n(self.Nd), nan)
+        '''τ_rec,N = τ_p,N - hole recombination lifetime. units = s'''
+        self.gen_life_p = np.where(self.is_n_type, eqs_np.gen_life_n(self.Nd), nan)
+        '''τ_gen,N = τ_p,N - minority hole generation lifetime. units = s'''
+
+    @property
+    def shape(self):
+        return self.Na.shape
+
+    def __len__(self):
+        return len(self.Na)
+
+    def __getitem__(self, key):
+        '''indexes or slices every field at once, returning a SiliconArray (views for basic slices)'''
+        out = SiliconArray.__new__(SiliconArray)
+        out.compensation_threshold = self.compensation_threshold
+        out.solve_neutrality = self.solve_neutrality
+        out.material = self.material
+        out.length = self.length if np.ndim(self.length) == 0 else np.broadcast_to(self.length, self.shape)[key]
+        out.area = self.area if np.ndim(self.area) == 0 else np.broadcast_to(self.area, self.shape)[key]
+        for name in SiliconArray.FIELDS:
+            out.__dict__[name] = np.asarray(getattr(self, name)[key])
+        return out
+
+    def __repr__(self):
+        return f'SiliconArray(shape={self.shape})'
+
+    def to_silicon(self, index=None) -> Silicon:
+        '''
+        builds the scalar Silicon for one sample
+
+        - index = index of the sample; may be omitted when the array holds a single sample
+        '''
+        if index is None:
+            index = ()
+        Na = np.asarray(self.Na[index])
+        if Na.size != 1:
+            raise ValueError('to_silicon needs an index that selects a single sample')
+        Nd = np.asarray(self.Nd[index])
+        length = np.broadcast_to(self.length, self.shape)[index]
+        area = np.broadcast_to(self.area, self.shape)[index]
+
+        si = Silicon(material=self.material)
+        si.T = self.T[index].item()
+        si.compensation_threshold = self.compensation_threshold
+        si.solve_neutrality = self.solve_neutrality
+        si.length = np.asarray(length).item()
+        si.area = np.asarray(area).item()
+        si.Na = Na.item()
+        si.Nd = Nd.item()
+        return si
@@ -0,0 +1,233 @@
+import hashlib
+import math
+import os
+import tempfile
+import numpy as np
+from solvers.constants import q, eps_si, eps_ox
+from solvers.materials import SiliconMaterial, silicon
+from solvers.moscap import V_contact, fermi_potential, exact_space_charge
+
+_FORMAT = 3
+'''version of the table layout and model, part of every cache key'''
+
+def _multilinear(table, position):
+    '''
+    interpolates table, with the quantities along its first axis, at fractional grid indices
+
+    - table = (quantities, n_0, n_1, ...) C-contiguous array, possibly memory-mapped
+    - position = one broadcastable array of fractional indices per grid axis
+    '''
+    shape = table.shape[1:]
+    flat = table.reshape(len(table), -1)
+    strides = np.cumprod((1,) + shape[:0:-1])[::-1]
+    base = 0
+    fraction = []
+    for u, n, stride in zip(np.broadcast_arrays(*position), shape, strides):
+        i = np.clip(np.floor(u).astype(np.intp), 0, n - 2)
+        base = base + i*stride
+        fraction.append(u - i)
+    result = 0
+    for corner in range(2**len(shape)):
+        weight, offset = 1, 0
+        for axis, (f, stride) in enumerate(zip(fraction, strides)):
+            upper = corner >> axis & 1
+            weight = weight*(f if upper else 1 - f)
+            offset += upper*stride
+        result = result + weight*flat[:, base + offset]
+    return result
+
+def _bilinear(row, base, s0, f0, s1, f1):
+    '''bilinear interpolation in a flat table row, from the cell at base with strides s0, s1 and fractions f0, f1'''
+    return (row[base]*(1 - f1) + row[base + s1]*f1)*(1 - f0) + (row[base + s0]*(1 - f1) + row[base + s0 + s1]*f1)*f0
+
+def _trilinear(row, base, s0, f0, s1, f1, s2, f2):
+    '''trilinear interpolation in a flat table row, as _bilinear with a third axis'''
+    return _bilinear(row, base, s1, f1, s2, f2)*(1 - f0) + _bilinear(row, base + s0, s1, f1, s2, f2)*f0
+
+_SCALARS = (int, float, np.integer, np.floating)
+
+def _process(Nab, Xox, Q_ox, T, material):
+    '''Vtn and VFB of broadcast arrays of Nab and Xox'''
+    Cox = eps_ox/Xox
+    phi_fb = fermi_potential(Nab, T, material)
+    VFB = V_contact(Nab, T, material) - Q_ox/Cox
+    Vtn = VFB + 2*phi_fb + np.sqrt(4*q*eps_si*Nab*phi_fb)/Cox
+    return np.stack(np.broadcast_arrays(Vtn, VFB))
+
+def _bias(Nab, Xox, VGB, VFB, T, material):
+    '''low-frequency Cgb per unit area and w_dep of the exact surface-potential model on broadcast arrays'''
+    Cox = eps_ox/Xox
+    exact = exact_space_charge(VGB, VFB, Cox, Nab, T, material)
+    Cscb = exact['Cscb']
+    with np.errstate(invalid='ignore'):
+        Cgb = np.where(np.isinf(Cscb), Cox, Cox*Cscb/(Cox + Cscb))
+    return np.stack(np.broadcast_arrays(Cgb, exact['w_dep']))
+
+_BIAS_SCALE = 0.1
+'''VGB - VFB below which the bias axis is about uniform; beyond it the spacing grows in proportion. units = V'''
+
+class MoscapTable:
+    '''
+    Lookup table of an AluminumMoscap's Vtn, VFB, Cgb and w_dep over (Nab, Xox, VGB), for fixed Qf, Qit, T and
+    material, with the exact surface potential (exact_surface_potential set).
+
+    The grid is uniform in log Nab and log Xox. Along the bias it is uniform in asinh((VGB - VFB)/_BIAS_SCALE),
+    which follows the flat band of each capacitor and is densest where the C-V curve turns. Every axis is
+    refined until multilinear interpolation at the midpoints along it is within rtol/3 of the span of every
+    quantity, so that anywhere inside a cell it is within rtol. The table is stored as .npy files named by a
+    hash of the constants, the material, the ranges and rtol, and memory-mapped on later use, so other
+    processes start with the table already built. Queries broadcast over arrays; scalar queries interpolate in
+    plain floats, without NumPy overhead.
+    '''
+    PROCESS = ('Vtn', 'VFB')
+    '''quantities that depend on Nab and Xox only'''
+    BIAS = ('Cgb', 'w_dep')
+    '''quantities that also depend on VGB'''
+
+    def __init__(self, Nab=(1e14, 1e18), Xox=(1e-7, 1e-5), VGB=(-5, 5), Qf=0, Qit=0, T=300,
+                 material: SiliconMaterial = silicon, rtol=1e-2, directory=None, max_points=1025):
+        '''
+        - Nab = (lowest, highest) substrate acceptor concentration. units = cm^-3
+        - Xox = (thinnest, thickest) gate oxide. units = cm
+        - VGB = (lowest, highest) gate-to-bulk bias. units = V
+        - Qf = fixed-oxide charge density. units = C/cm^2
+        - Qit = interface-trap charge density. units = C/cm^2
+        - T = temperature. units = K
+        - material = temperature-dependent silicon parameters
+        - rtol = interpolation accuracy target, relative to the span of each quantity over the table
+        - directory = where the table files are kept; ~/.cache/solvers when omitted
+        - max_points = most grid points along one axis
+        '''
+        self.Q_ox = float(Qf + Qit)
+        self.T = T
+        self.material = material
+        self.VGB = (float(VGB[0]), float(VGB[1]))
+        '''the bias range. units = V'''
+        # VFB is monotonic in Nab and Xox, so its extremes over the table are at the corners
+        VFB = _process(np.array(Nab, dtype=np.float64)[:, None], np.array(Xox, dtype=np.float64), self.Q_ox, T,
+                       material)[1]
+        bias = np.arcsinh((self.VGB[0] - VFB.max())/_BIAS_SCALE), np.arcsinh((self.VGB[1] - VFB.min())/_BIAS_SCALE)
+        self.ranges = np.array([np.log10(Nab), np.log10(Xox), bias], dtype=np.float64)
+        '''grid ranges of log10 Nab, log10 Xox and the bias coordinate'''
+        directory = directory or os.path.join(os.path.expanduser('~'), '.cache', 'solvers')
+        constants = (_FORMAT, _BIAS_SCALE, q, eps_si, eps_ox, material.KbToq(T), material.ni(T), material.Eg(T), self.Q_ox,
+                     rtol, max_points, *self.ranges.ravel())
+        key = hashlib.sha1(repr(constants).encode()).hexdigest()[:16]
+        self.paths = {part: os.path.join(directory, f'moscap-{key}-{part}.npy') for part in ('process', 'bias')}
+        '''the table files'''
+        if not all(os.path.exists(path) for path in self.paths.values()):
+            os.makedirs(directory, exist_ok=True)
+            for part, values in zip(('process', 'bias'), self.__build(rtol, max_points)):
+                # written under a temporary name first, so a concurrent reader never sees part of a table
+                handle, temporary = tempfile.mkstemp(dir=directory, suffix='.npy')
+                with os.fdopen(handle, 'wb') as file:
+                    np.save(file, values)
+                os.replace(temporary, self.paths[part])
+        # plain ndarray views of the mapped files; the np.memmap subclass costs more than the interpolation
+        self.process = np.load(self.paths['process'], mmap_mode='r').view(np.ndarray)
+        self.bias = np.load(self.paths['bias'], mmap_mode='r').view(np.ndarray)
+        shape = self.bias.shape[1:]
+        self.__axes = [(float(low), float(high), (n - 1)/(high - low), n - 2)
+                       for (low, high), n in zip(self.ranges, shape)]
+        self.__rows = {name: memoryview(table[k].ravel()) for table, names in ((self.process, self.PROCESS), (self.bias, self.BIAS))
+                       for k, name in enumerate(names)}
+        self.__strides = shape[1], shape[1]*shape[2], shape[2]
+
+    def __grid(self, axes):
+        '''the table values on the tensor grid of axes, in log10 Nab, log10 Xox and the bias coordinate'''
+        Nab, Xox, s = np.ix_(*axes)
+        Nab, Xox = 10**Nab, 10**Xox
+        process = _process(Nab, Xox, self.Q_ox, self.T, self.material)
+        VFB = process[1]
+        return process[..., 0], _bias(Nab, Xox, VFB + _BIAS_SCALE*np.sinh(s), VFB, self.T, self.material)
+
+    def __build(self, rtol, max_points):
+        sizes = [5, 5, 33]
+        while True:
+            axes = [np.linspace(low, high, n) for (low, high), n in zip(self.ranges, sizes)]
+            process, bias = self.__grid(axes)
+            span = [np.ptp(values.reshape(len(values), -1), axis=1)[:, None] + 1e-300 for values in (process, bias)]
+            refine = []
+            for axis in range(3):
+                if sizes[axis] >= max_points:
+                    continue
+                midpoints = list(axes)
+                midpoints[axis] = (axes[axis][1:] + axes[axis][:-1])/2
+                exact = self.__grid(midpoints)
+                error = 0
+                for values, mid, scale in zip((process, bias), exact, span):
+                    if axis + 1 >= values.ndim:
+                        continue
+                    upper = np.take(values, range(1, values.shape[axis + 1]), axis=axis + 1)
+                    lower = np.take(values, range(values.shape[axis + 1] - 1), axis=axis + 1)
+                    error = max(error, np.max(np.abs((upper + lower)/2 - mid).reshape(len(mid), -1)/scale))
+                # the error inside a cell is about the sum of the errors along its three axes
+                if error > rtol/3:
+                    refine.append(axis)
+            if not refine:
+                return process, bias
+            for axis in refine:
+                sizes[axis] = min(2*sizes[axis] - 1, max_points)
+
+    def __position(self, values):
+        '''fractional grid indices of values of the grid coordinates'''
+        return [(value - low)/(high - low)*(n - 1) for value, (low, high), n in zip(values, self.ranges, self.bias.shape[1:])]
+
+    def __call__(self, name, Nab, Xox, VGB=None):
+        '''
+        interpolates one quantity of the table
+
+        - name = 'Vtn', 'VFB', 'Cgb' (low frequency, per unit area) or 'w_dep'
+        - Nab = substrate acceptor concentrations. units = cm^-3
+        - Xox = gate-oxide thicknesses. units = cm
+        - VGB = gate-to-bulk biases, for the bias-dependent quantities. units = V
+        '''
+        if isinstance(Nab, _SCALARS) and isinstance(Xox, _SCALARS) and (VGB is None or isinstance(VGB, _SCALARS)):
+            return self.__scalar(name, Nab, Xox, VGB)
+        Nab, Xox = np.log10(np.asarray(Nab, dtype=np.float64)), np.log10(np.asarray(Xox, dtype=np.float64))
+        for value, (low, high), quantity in zip((Nab, Xox), self.ranges, ('Nab', 'Xox')):
+            if np.any((value < low - 1e-12) | (value > high + 1e-12)):
+                raise ValueError(f'{quantity} outside the table range')
+        position = self.__position((Nab, Xox))
+        if name in self.PROCESS:
+            k = self.PROCESS.index(name)
+            return _multilinear(self.process[k:k + 1], position)[0][()]
+        if name not in self.BIAS:
+            raise ValueError(f'the table has no {name!r}; it has {self.PROCESS + self.BIAS}')
+        if VGB is None:
+            raise ValueError(f'{name} depends on VGB')
+        VGB = np.asarray(VGB, dtype=np.float64)
+        if np.any((VGB < self.VGB[0] - 1e-12) | (VGB > self.VGB[1] + 1e-12)):
+            raise ValueError('VGB outside the table range')
+        VFB = _multilinear(self.process[1:], position)[0]
+        position = self.__position((Nab, Xox, np.arcsinh((VGB - VFB)/_BIAS_SCALE)))
+        k = self.BIAS.index(name)
+        return _multilinear(self.bias[k:k + 1], position)[0][()]
+
+    def __cell(self, axis, value, quantity=None):
+        '''the grid cell (index, fraction) of a scalar grid coordinate, checked against the range of quantity'''
+        low, high, scale, last = self.__axes[axis]
+        if quantity and not low - 1e-12 <= value <= high + 1e-12:
+            raise ValueError(f'{quantity} outside the table range')
+        u = (value - low)*scale
+        i = min(max(math.floor(u), 0), last)
+        return i, u - i
+
+    def __scalar(self, name, Nab, Xox, VGB):
+        '''__call__ for one capacitor and bias, in plain floats without the broadcasting of the array path'''
+        row = self.__rows.get(name)
+        if row is None:
+            raise ValueError(f'the table has no {name!r}; it has {self.PROCESS + self.BIAS}')
+        i, f = self.__cell(0, math.log10(Nab), 'Nab')
+        j, g = self.__cell(1, math.log10(Xox), 'Xox')
+        # the process table is laid out (Nab, Xox), the bias table (Nab, Xox, bias)
+        n, s0, s1 = self.__strides
+        if name in self.PROCESS:
+            return _bilinear(row, i*n + j, n, f, 1, g)
+        if VGB is None:
+            raise ValueError(f'{name} depends on VGB')
+        if not self.VGB[0] - 1e-12 <= VGB <= self.VGB[1] + 1e-12:
+            raise ValueError('VGB outside the table range')
+        VFB = _bilinear(self.__rows['VFB'], i*n + j, n, f, 1, g)
+        k, h = self.__cell(2, math.asinh((VGB - VFB)/_BIAS_SCALE))
+        return _trilinear(row, i*s0 + j*s1 + k, s0, f, s1, g, 1, h)
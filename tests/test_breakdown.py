@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+from solvers.diodes import breakdown_voltage, ionization_integral
+
+# one-sided abrupt silicon junctions at 300 K, read off Sze's breakdown-voltage curve; that curve comes from
+# other ionization coefficients, so the comparison is to within 25%
+SZE = {1e15: 300, 1e16: 60, 1e17: 12}
+
+def test_one_sided_matches_textbook():
+    N = np.array(list(SZE))
+    np.testing.assert_allclose(breakdown_voltage(1e20, N), list(SZE.values()), rtol=0.25)
+    np.testing.assert_allclose(breakdown_voltage(N, 1e20), list(SZE.values()), rtol=0.25)
+
+def test_integral_reaches_one():
+    N = np.array([3e14, 1e16, 2e17])
+    BV = breakdown_voltage(1e19, N)
+    assert np.all(np.diff(BV) < 0)
+    np.testing.assert_allclose(ionization_integral(1e19, N, BV), 1, rtol=1e-8)
+
+def test_scalar():
+    assert breakdown_voltage(1e20, 1e16) == pytest.approx(breakdown_voltage(1e20, [1e16])[0], rel=1e-12)
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from solvers.carriers_np import J_profile
+
+x = np.linspace(0, 1e-4, 1001)
+n = 1e16*np.exp(-x/2e-5)
+p = 1e15 + 0*x
+E = 1e3*np.sin(x/1e-5)
+
+def test_chunks_match_whole_profile():
+    whole = J_profile(x, n, p, E, 1350, 480)
+    chunked = J_profile(x, n, p, E, 1350, 480, chunk_size=37)
+    np.testing.assert_array_equal(whole[0], chunked[0])
+    np.testing.assert_array_equal(whole[1], chunked[1])
+
+def test_empty_profile():
+    J_n, J_p = J_profile(1e-7, [], [], [], 1350, 480)
+    assert J_n.size == J_p.size == 0
+
+def test_one_point_profile():
+    with pytest.raises(ValueError):
+        J_profile(1e-7, [1e16], [1e4], [0.0], 1350, 480)
@@ -0,0 +1,87 @@
+import itertools
+import numpy as np
+import pytest
+from solvers.mosfet import Mosfet
+from solvers.mosamp import MosAmp
+from solvers.inverter import MosInverter
+from solvers.moscap import AluminumMoscap
+from solvers.diodes import Diode
+
+PROCESS = dict(Nab=1e17, Vbs=0, Xox=1e-6, Qf=0, Qit=0, channel_width=1e-4, channel_length=1e-5,
+               ch_len_modulation=0.05, mu_n_ch=400)
+OUTPUTS = ('Vtn', 'K_N', 'Vdsat', 'Q_inv_B', 'Id', 'gm', 'gds', 'rds_sat', 'C_gs', 'C_gd', 'bigQg', 'ft')
+
+def fresh(numeric, **params):
+    mosfet = Mosfet(numeric)
+    with mosfet.batch():
+        for name, value in {**PROCESS, **params}.items():
+            setattr(mosfet, name, value)
+    return mosfet
+
+def assert_same(incremental, reference, names):
+    for name in names:
+        assert float(getattr(incremental, name)) == pytest.approx(float(getattr(reference, name)), rel=1e-12), name
+
+@pytest.mark.parametrize('numeric', [True, False])
+def test_incremental_mosfet_matches_batch(numeric):
+    mosfet = fresh(numeric, Vgs=0.2, Vds=0.1)
+    for Nab, Vgs, Vds in itertools.product((1e16, 1e17), (0.2, 1.5, 3.0), (0.1, 2.0)):
+        mosfet.Nab = Nab
+        mosfet.Vgs = Vgs
+        mosfet.Vds = Vds
+        reference = fresh(numeric, Nab=Nab, Vgs=Vgs, Vds=Vds)
+        # cutoff leaves C_gs and C_gd as they were
+        names = OUTPUTS if Vgs > reference.Vtn else tuple(n for n in OUTPUTS if n not in ('C_gs', 'C_gd'))
+        assert_same(mosfet, reference, names)
+
+@pytest.mark.parametrize('numeric', [True, False])
+def test_wrappers_follow_their_mosfet(numeric):
+    amp, inverter = MosAmp(numeric), MosInverter(numeric)
+    amp.mf = inverter.mf = fresh(numeric, Vgs=2, Vds=3)
+    amp.Vdd = 5
+    inverter.update(VDD=5, Vin=3)
+    
+    amp.mf.Vgs = 3
+    amp.mf.Nab = 1e16
+    reference = MosAmp(numeric)
+    reference.mf = fresh(numeric, Nab=1e16, Vgs=3, Vds=3)
+    reference.Vdd = 5
+    assert_same(amp, reference, ('Av', 'Ai', 'Rout'))
+    
+    reference = MosInverter(numeric)
+    reference.mf = amp.mf
+    reference.update(VDD=5, Vin=3)
+    assert_same(inverter, reference, ('Vout', 'Id'))
+    assert np.isfinite(float(inverter.Vout))
+
+@pytest.mark.parametrize('numeric', [True, False])
+def test_incremental_moscap_matches_batch(numeric):
+    names = ('VFB', 'Vtn', 'Qg', 'Qscb', 'Vscb', 'w_dep', 'Cgb', 'Cgb_HF', 'E_space_charge')
+    process = dict(Nab=1e16, Xox=5e-6, Qf=1e-8, Qit=0, area=1e-3)
+    moscap = AluminumMoscap(numeric)
+    moscap.update(VGB=0, **process)
+    for Nab, VGB in itertools.product((1e16, 1e17), (-2, 0.5, 3)):
+        moscap.Nab = Nab
+        moscap.VGB = VGB
+        reference = AluminumMoscap(numeric)
+        reference.update(**{**process, 'Nab': Nab, 'VGB': VGB})
+        assert_same(moscap, reference, names)
+
+def test_bias_steps_skip_the_process():
+    for cls in (AluminumMoscap, Mosfet):
+        outputs = set().union(*(step._outputs for step in cls._affected(['VGB'])))
+        assert 'Vscb' in outputs and not outputs & {'phi_pm', 'Cox', 'VFB', 'Vtn'}
+    outputs = set().union(*(step._outputs for step in Diode._affected(['v_bias'])))
+    assert 'J_D' in outputs and not outputs & {'vbi', 'V_breakdown'}
+
+@pytest.mark.parametrize('numeric', [True, False])
+def test_diode_follows_its_sides(numeric):
+    names = ('vbi', 'w_depl', 'J_D', 'C_pn')
+    diode = Diode(numeric)
+    diode.dope_p_and_n(1e16, 1e17)
+    diode.update(area=1e-4, v_bias=0.3)
+    diode.p.Na = 1e15
+    reference = Diode(numeric)
+    reference.dope_p_and_n(1e15, 1e17)
+    reference.update(area=1e-4, v_bias=0.3)
+    assert_same(diode, reference, names)
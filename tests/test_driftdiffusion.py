@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from solvers.constants import q
+from solvers.diodes import Diode
+from solvers.materials import silicon
+
+Na, Nd = 1e17, 1e16
+
+@pytest.fixture(scope='module')
+def diode():
+    diode = Diode(True)
+    diode.dope_p_and_n(Na, Nd)
+    return diode
+
+def test_equilibrium_current(diode):
+    assert abs(diode.drift_diffusion().solve(0.0)) < 1e-12
+
+@pytest.mark.parametrize('V', (0.45, 0.5, 0.55))
+def test_forward_current_matches_long_diode(diode, V):
+    # between space-charge recombination at low bias and high injection at high bias,
+    # the simulated current follows the long-diode law J_D = q ni^2 (Dn/(Ln Na) + Dp/(Lp Nd)) (e^(V/Vt) - 1)
+    p, n = diode.p, diode.n
+    ni, Vt = silicon.ni(300), silicon.KbToq(300)
+    J_S = q*ni**2*(p.Dn/(p.n_diffusion_length*Na) + n.Dp/(n.p_diffusion_length*Nd))
+    assert diode.drift_diffusion().solve(V) == pytest.approx(J_S*np.expm1(V/Vt), rel=0.02)
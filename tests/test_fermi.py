@@ -0,0 +1,22 @@
+import numpy as np
+from solvers.fermi import charge_neutrality
+from solvers.materials import silicon
+
+Na, Nd, T = np.meshgrid([0, 1e13, 1e15, 1e17, 1e19], [0, 1e14, 1e16, 1e18], [250, 300, 400], indexing='ij')
+
+def test_full_ionization_matches_closed_form():
+    EF, n, p = charge_neutrality(Na, Nd, T, incomplete_ionization=False, fermi_dirac=False)
+    kT = silicon.KbToq(T)
+    # ni of the band model the solver uses, n = Nc exp((EF - Ec)/kT) and p = Nv exp(-EF/kT)
+    ni = np.sqrt(silicon.Nc(T)*silicon.Nv(T))*np.exp(-silicon.Eg(T)/(2*kT))
+    half = (Nd - Na)/2
+    # the root of n - ni^2/n = Nd - Na, in the form without cancellation for either sign
+    majority = np.abs(half) + np.sqrt(half**2 + ni**2)
+    n_ref = np.where(half >= 0, majority, ni**2/majority)
+    np.testing.assert_allclose(n, n_ref, rtol=1e-9)
+    np.testing.assert_allclose(p, ni**2/n_ref, rtol=1e-9)
+    np.testing.assert_allclose(EF, silicon.Eg(T) - kT*np.log(silicon.Nc(T)/n_ref), rtol=0, atol=1e-9)
+
+def test_nan_propagates():
+    EF, n, p = charge_neutrality(np.array([1e16, np.nan]), 0.0)
+    assert np.isfinite(EF[0]) and np.isnan(EF[1]) and np.isnan(n[1]) and np.isnan(p[1])
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from solvers.materials import silicon
+from solvers.moscap import (AluminumMoscap, calc_space_charge_density, exact_space_charge, interface_trap_charge,
+                            substrate_debeye_length)
+
+KEYS = ('Cgb', 'Cgb_HF', 'Cscb', 'Cscb_HF', 'Qg', 'Qscb', 'QinvB', 'Vscb', 'w_dep')
+
+def moscap(numeric, **flags):
+    m = AluminumMoscap(numeric)
+    m.update(Nab=1e16, Xox=5e-6, Qf=1e-8, Qit=0, area=1e-3, VGB=0, **flags)
+    return m
+
+@pytest.mark.parametrize('numeric', [True, False])
+@pytest.mark.parametrize('exact', [False, True])
+def test_cv_curve_matches_scalar_calculation(numeric, exact):
+    m = moscap(numeric, exact_surface_potential=exact)
+    VGB = np.concatenate((np.linspace(-4, 4, 17), [float(m.VFB), float(m.Vtn)]))
+    curve = m.cv_curve(VGB)
+    # the exact solutions agree to the Newton tolerance, relative to the largest value of each quantity
+    scale = {key: np.max(np.abs(curve[key][np.isfinite(curve[key])])) for key in KEYS}
+    for i, v in enumerate(VGB):
+        m.VGB = v
+        for key in KEYS:
+            assert float(getattr(m, key)) == pytest.approx(curve[key][i], rel=1e-9, abs=1e-9*scale[key]), (v, key)
+
+VGB = np.linspace(-3, 5, 161)
+# NumPy scalars, so the moscap helpers stay in NumPy
+VFB, Cox, Nab = -0.9, 6.9e-8, np.float64(1e16)
+
+@pytest.mark.parametrize('traps', [None, (np.linspace(-0.5, 0.5, 41), 1e11)])
+def test_exact_surface_potential_residual(traps):
+    solved = exact_space_charge(VGB, VFB, Cox, Nab, traps=traps)
+    Vscb = solved['Vscb']
+    # an independent evaluation of the charge balance at the solved surface potential
+    Q = np.sign(Vscb)*calc_space_charge_density(Vscb, substrate_debeye_length(Nab), silicon.ni(300)**2/Nab, Nab)
+    Qit = 0 if traps is None else interface_trap_charge(Vscb, *traps, Nab)[0]
+    np.testing.assert_allclose(solved['Qscb'], Q, rtol=1e-12, atol=1e-22)
+    np.testing.assert_allclose(VFB + Vscb - (Q + Qit)/Cox, VGB, rtol=0, atol=1e-10)
+
+def test_exact_capacitance_is_the_charge_derivative():
+    solved = exact_space_charge(VGB, VFB, Cox, Nab)
+    Vscb, h = solved['Vscb'], 1e-6
+    charge = lambda psi: np.sign(psi)*calc_space_charge_density(psi, substrate_debeye_length(Nab), silicon.ni(300)**2/Nab, Nab)
+    slope = -(charge(Vscb + h) - charge(Vscb - h))/(2*h)
+    away = np.abs(Vscb) > 10*h
+    np.testing.assert_allclose(solved['Cscb'][away], slope[away], rtol=1e-5)
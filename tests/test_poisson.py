@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from solvers.constants import q, eps_si
+from solvers.poisson import PNJunctionPoisson
+
+Na, Nd = 1e17, 1e16
+BIASES = (0.4, 0.0, -1.0, -3.0, -8.0)
+
+@pytest.fixture(scope='module')
+def solutions():
+    solver = PNJunctionPoisson(Na, Nd)
+    vbi = solver.Vt*np.log(Na*Nd/solver.ni**2)
+    return solver, vbi, {V: solver.solve(V) for V in BIASES}
+
+@pytest.mark.parametrize('V', BIASES)
+def test_potential_drop(solutions, V):
+    solver, vbi, solved = solutions
+    assert solved[V].potential_drop == pytest.approx(vbi - V, abs=1e-6)
+
+@pytest.mark.parametrize('V', BIASES)
+def test_depletion_width_and_neutrality(solutions, V):
+    solver, vbi, solved = solutions
+    solution = solved[V]
+    # depletion approximation, with the 2kT/q majority-carrier tail correction
+    w = np.sqrt(2*eps_si/q*(Na + Nd)/(Na*Nd)*(vbi - V - 2*solver.Vt))
+    assert solution.w_depl == pytest.approx(w, rel=0.05)
+    assert abs(np.trapezoid(solution.rho, solution.x)) < 1e-6*q*Nd*w
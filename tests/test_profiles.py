@@ -0,0 +1,30 @@
+import warnings
+import numpy as np
+import pytest
+from solvers.profiles import DopingProfile, ErfcProfile, TabulatedProfile
+
+x = np.linspace(0, 1e-4, 401)
+N = 1e20*np.exp(-x/1e-5)
+
+def test_doping_profile_is_abstract():
+    with pytest.raises(TypeError):
+        DopingProfile()
+
+def test_tabulated_matches_analytic():
+    profile = ErfcProfile(1e20, 1e-10, 'n', 1e16)
+    table = TabulatedProfile(x, profile.concentration(x), 'n', 1e16)
+    assert table.junction_depth() == pytest.approx(profile.junction_depth(), rel=1e-3)
+    assert table.sheet_resistance() == pytest.approx(profile.sheet_resistance(), rel=1e-2)
+
+def test_tabulated_follows_background():
+    profile = TabulatedProfile(x, N, 'n', 1e15)
+    profile.sheet_resistance()
+    profile.background = 1e18
+    assert profile.sheet_resistance() == TabulatedProfile(x, N, 'n', 1e18).sheet_resistance()
+
+def test_tabulated_below_background():
+    profile = TabulatedProfile(x, N, 'n', 1e21)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert np.isnan(profile.junction_depth())
+        assert profile.sheet_resistance() == np.inf
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from solvers.quantum import fermi_dirac_half, fermi_dirac_minus_half
+
+mpmath = pytest.importorskip('mpmath')
+
+# both tails and the tabulated range, including the seams at the table edges
+eta = np.concatenate([np.linspace(-30, 80, 551), [-10.0, -10.0 - 1e-12, 50.0, 50.0 + 1e-12, 0.013]])
+
+def polylog_reference(s, eta):
+    '''complete Fermi-Dirac integral F_j(η) = -Li_(j+1)(-e^η)'''
+    return np.array([float(mpmath.re(-mpmath.polylog(s, -mpmath.exp(e)))) for e in eta])
+
+def test_half_matches_polylog():
+    np.testing.assert_allclose(fermi_dirac_half(eta), polylog_reference(1.5, eta), rtol=1e-9, atol=0)
+
+def test_minus_half_matches_polylog():
+    np.testing.assert_allclose(fermi_dirac_minus_half(eta), polylog_reference(0.5, eta), rtol=1e-9, atol=0)
+
+def test_nan_propagates():
+    assert np.isnan(fermi_dirac_half(np.nan))
+    np.testing.assert_array_equal(np.isnan(fermi_dirac_half([np.nan, 0.0])), [True, False])
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from solvers.tables import MoscapTable, _bias, _process
+
+RANGES = dict(Nab=(1e15, 1e16), Xox=(2e-6, 5e-6), VGB=(-2, 2), rtol=0.05)
+
+@pytest.fixture(scope='module')
+def directory(tmp_path_factory):
+    return tmp_path_factory.mktemp('tables')
+
+@pytest.fixture(scope='module')
+def table(directory):
+    return MoscapTable(**RANGES, directory=directory)
+
+def test_interpolation_within_rtol(table):
+    rng = np.random.default_rng(0)
+    Nab = 10**rng.uniform(*table.ranges[0], 2000)
+    Xox = 10**rng.uniform(*table.ranges[1], 2000)
+    VGB = rng.uniform(*table.VGB, 2000)
+    exact = dict(zip(MoscapTable.PROCESS, _process(Nab, Xox, 0.0, 300, table.material)))
+    exact.update(zip(MoscapTable.BIAS, _bias(Nab, Xox, VGB, exact['VFB'], 300, table.material)))
+    for name, values in exact.items():
+        span = np.ptp(values)
+        assert np.max(np.abs(table(name, Nab, Xox, VGB) - values)) <= RANGES['rtol']*span, name
+        # the scalar path interpolates the same cells
+        scalar = [table(name, *point) for point in zip(Nab[:50], Xox[:50], VGB[:50])]
+        np.testing.assert_allclose(scalar, table(name, Nab[:50], Xox[:50], VGB[:50]), rtol=1e-12)
+
+def test_warm_start_does_not_rebuild(table, directory, monkeypatch):
+    def build(*args):
+        raise AssertionError('table rebuilt')
+    monkeypatch.setattr(MoscapTable, '_MoscapTable__build', build)
+    warm = MoscapTable(**RANGES, directory=directory)
+    assert warm.paths == table.paths
+    np.testing.assert_array_equal(warm.bias, table.bias)
+    with pytest.raises(AssertionError):
+        MoscapTable(**{**RANGES, 'rtol': 0.04}, directory=directory)